@@ -0,0 +1,17 @@
+{{
+    config(
+        materialized='incremental',
+        unique_key='image_path',
+        incremental_strategy='delete+insert'
+    )
+}}
+
+-- The loader replaces all detections of an image at once, so the image path is the
+-- replacement key: every reprocessed image swaps its full set of boxes
+
+select *
+from {{ ref('stg_message_detections') }}
+
+{% if is_incremental() %}
+where processed_date > (select coalesce(max(processed_date), '1900-01-01'::timestamp) from {{ this }})
+{% endif %}
@@ -0,0 +1,19 @@
+{{
+    config(
+        materialized='incremental',
+        unique_key=['channel', 'message_id'],
+        on_schema_change='append_new_columns'
+    )
+}}
+
+select *
+from {{ ref('stg_messages') }}
+
+{% if is_incremental() %}
+-- Re-scraped messages keep their original date, so a lookback window picks up
+-- edits to recent messages; unique_key replaces the rows that already exist
+where date >= (
+    select coalesce(max(date), '1900-01-01'::timestamp) - interval '{{ var("message_lookback_days", 3) }} days'
+    from {{ this }}
+)
+{% endif %}
@@ -0,0 +1,13 @@
+select
+    channel,
+    message_id,
+    image_path,
+    class_id,
+    class_name,
+    confidence,
+    bbox_x1,
+    bbox_y1,
+    bbox_x2,
+    bbox_y2,
+    processed_date
+from {{ source('raw', 'message_detections') }}
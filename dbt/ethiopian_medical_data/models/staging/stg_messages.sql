@@ -0,0 +1,11 @@
+select
+    message_id,
+    channel,
+    date,
+    text,
+    has_media,
+    media_path,
+    word_count,
+    contains_url,
+    language
+from {{ source('raw', 'cleaned_messages') }}
@@ -0,0 +1,190 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import asyncio
+import threading
+from collections import OrderedDict
+from datetime import timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import text
+from .metrics import CACHE_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+class LRUCache:
+    """In-process LRU cache with a per-entry time to live"""
+    def __init__(self, maxsize=1024, ttl=300.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires, value = item
+            if expires < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    async def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    async def clear(self):
+        with self._lock:
+            self._data.clear()
+
+class RedisCache:
+    """Shared cache backend for running several API workers against one Redis"""
+    def __init__(self, url, ttl=300.0, prefix="api-cache:"):
+        import redis.asyncio
+
+        self.client = redis.asyncio.Redis.from_url(url)
+        self.ttl = ttl
+        self.prefix = prefix
+
+    async def get(self, key):
+        value = await self.client.get(self.prefix + key)
+        return json.loads(value) if value is not None else None
+
+    async def set(self, key, value):
+        await self.client.set(self.prefix + key, json.dumps(value), ex=int(self.ttl))
+
+    async def clear(self):
+        async for key in self.client.scan_iter(self.prefix + "*"):
+            await self.client.delete(key)
+
+class DataVersionTracker:
+    """
+    Reads the data_versions counters that loaders bump after writing new rows.
+
+    Counters are re-read at most every check_interval seconds, so a burst of
+    requests costs a single primary-key lookup.
+    """
+    def __init__(self, session_factory, check_interval=1.0):
+        self.session_factory = session_factory
+        self.check_interval = check_interval
+        self._versions = {}
+        self._checked_at = 0.0
+        self._lock = asyncio.Lock()
+
+    async def current(self, names):
+        """Return ({name: version}, last modified datetime in UTC) for the given data sets"""
+        async with self._lock:
+            if time.monotonic() - self._checked_at >= self.check_interval:
+                self._versions = await self._load()
+                self._checked_at = time.monotonic()
+            versions = {name: self._versions.get(name, (0, None)) for name in names}
+
+        modified = [updated for _, updated in versions.values() if updated is not None]
+        last_modified = max(modified) if modified else None
+        return {name: version for name, (version, _) in versions.items()}, last_modified
+
+    async def _load(self):
+        try:
+            async with self.session_factory() as db:
+                result = await db.execute(text("SELECT name, version, updated_at FROM data_versions"))
+                rows = result.all()
+        except Exception as e:
+            logger.warning(f"Could not read data versions: {str(e)}")
+            return self._versions
+        return {
+            name: (version, updated_at.replace(tzinfo=timezone.utc) if updated_at else None)
+            for name, version, updated_at in rows
+        }
+
+class ResponseCache:
+    """
+    Caches encoded JSON responses keyed on endpoint, normalized query parameters and
+    the versions of the data sets the endpoint reads. Loaders invalidate entries by
+    bumping a data version, never by touching the cache itself.
+    """
+    def __init__(self, backend, versions):
+        self.backend = backend
+        self.versions = versions
+
+    async def respond(self, request: Request, data_sets, params, load):
+        """
+        Return a cached or freshly loaded response for the request.
+
+        load() is a coroutine function returning (payload, headers) and is only
+        awaited on a cache miss. The payload is either already encoded JSON (bytes)
+        or an object that is encoded with FastAPI's jsonable_encoder.
+        Conditional requests whose ETag or date still matches get a 304 without
+        touching the cache or the database.
+        """
+        versions, last_modified = await self.versions.current(data_sets)
+        normalized = sorted((k, str(v)) for k, v in params.items() if v is not None)
+        key_source = json.dumps([request.url.path, normalized, sorted(versions.items())])
+        key = hashlib.sha1(key_source.encode()).hexdigest()
+        etag = f'"{key}"'
+
+        headers = {'ETag': etag, 'Cache-Control': 'no-cache'}
+        if last_modified is not None:
+            headers['Last-Modified'] = format_datetime(last_modified.replace(microsecond=0), usegmt=True)
+
+        if self._not_modified(request, etag, last_modified):
+            CACHE_REQUESTS.inc(result='not_modified')
+            return Response(status_code=304, headers=headers)
+
+        entry = await self.backend.get(key)
+        CACHE_REQUESTS.inc(result='miss' if entry is None else 'hit')
+        if entry is None:
+            payload, extra_headers = await load()
+            if isinstance(payload, bytes):
+                body = payload.decode('utf-8')
+            else:
+                body = json.dumps(jsonable_encoder(payload))
+            entry = {
+                'body': body,
+                'headers': extra_headers,
+            }
+            await self.backend.set(key, entry)
+
+        headers.update(entry['headers'])
+        return Response(content=entry['body'], media_type="application/json", headers=headers)
+
+    def _not_modified(self, request, etag, last_modified):
+        if_none_match = request.headers.get('if-none-match')
+        if if_none_match is not None:
+            return etag in [tag.strip() for tag in if_none_match.split(',')] or if_none_match.strip() == '*'
+
+        if_modified_since = request.headers.get('if-modified-since')
+        if if_modified_since and last_modified is not None:
+            try:
+                since = parsedate_to_datetime(if_modified_since)
+            except (TypeError, ValueError):
+                return False
+            if since.tzinfo is None:
+                since = since.replace(tzinfo=timezone.utc)
+            return last_modified.replace(microsecond=0) <= since
+        return False
+
+def build_response_cache(session_factory):
+    """Create the response cache configured through API_CACHE_* environment variables"""
+    ttl = float(os.getenv('API_CACHE_TTL', '300'))
+    backend_name = os.getenv('API_CACHE_BACKEND', 'memory')
+
+    if backend_name == 'redis':
+        backend = RedisCache(os.getenv('REDIS_URL', 'redis://localhost:6379/0'), ttl=ttl)
+    else:
+        backend = LRUCache(maxsize=int(os.getenv('API_CACHE_SIZE', '1024')), ttl=ttl)
+
+    versions = DataVersionTracker(
+        session_factory,
+        check_interval=float(os.getenv('API_CACHE_VERSION_CHECK_INTERVAL', '1'))
+    )
+    logger.info(f"Response cache: backend={backend_name}, ttl={ttl}s")
+    return ResponseCache(backend, versions)
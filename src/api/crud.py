@@ -1,33 +1,93 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, tuple_, select, or_, literal, literal_column, Row
 from . import models, schemas
-from typing import List, Dict
+from typing import List, Dict, Optional
+from datetime import datetime, date, timedelta
+import base64
+import json
 import logging
 
-# Set up logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def get_messages(
-    db: Session, 
+class InvalidCursor(ValueError):
+    """A cursor the client sent that no page of this API produced"""
+
+def encode_cursor(values: list) -> str:
+    """Encode the sort key of the last row of a page as an opaque cursor"""
+    raw = json.dumps(values, default=lambda v: v.isoformat()).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_cursor(cursor: str) -> list:
+    """Decode a cursor produced by encode_cursor"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list):
+            raise ValueError
+        return values
+    except Exception:
+        raise InvalidCursor(f"Invalid cursor: {cursor}")
+
+def _message_key(cursor: str) -> tuple:
+    """Parse a message cursor into its (date, channel, message_id) sort key"""
+    try:
+        last_date, last_channel, message_id = decode_cursor(cursor)
+        # Rows without a date have no position in the keyset, so neither do their cursors
+        return datetime.fromisoformat(last_date), last_channel, message_id
+    except (TypeError, ValueError):
+        raise InvalidCursor(f"Invalid cursor: {cursor}")
+
+def _detection_key(cursor: str) -> int:
+    try:
+        (last_id,) = decode_cursor(cursor)
+        return int(last_id)
+    except (TypeError, ValueError):
+        raise InvalidCursor(f"Invalid cursor: {cursor}")
+
+def message_cursor(message) -> str:
+    return encode_cursor([message.date, message.channel, message.message_id])
+
+def detection_cursor(detection) -> str:
+    return encode_cursor([detection.id])
+
+async def get_messages(
+    db: AsyncSession, 
     skip: int = 0, 
     limit: int = 100,
     channel: str = None,
-    language: str = None
-) -> List[models.Message]:
+    language: str = None,
+    cursor: Optional[str] = None,
+    class_name: str = None,
+    min_confidence: float = None
+) -> List[Row]:
+    """
+    Fetch a page of messages as plain rows (no ORM instances or identity map).
+    
+    class_name and min_confidence restrict the page to messages whose images
+    contain a matching detection.
+    """
     try:
         logger.info("Attempting to fetch messages from database")
-        query = db.query(models.Message)
+        query = select(*models.Message.__table__.columns)
         
         if channel:
-            query = query.filter(models.Message.channel == channel)
+            query = query.where(models.Message.channel == channel)
         if language:
-            query = query.filter(models.Message.language == language)
+            query = query.where(models.Message.language == language)
+        if class_name or min_confidence:
+            query = query.where(_detected(class_name, min_confidence))
         
-        # Log the SQL query
-        logger.info(f"SQL Query: {query}")
+        # Keyset pagination: seek past the last row of the previous page using the
+        # (date, channel, message_id) index instead of scanning and discarding rows
+        sort_key = (models.Message.date, models.Message.channel, models.Message.message_id)
+        if cursor:
+            query = query.where(tuple_(*sort_key) > tuple_(*_message_key(cursor)))
+        query = query.order_by(*sort_key)
         
-        messages = query.offset(skip).limit(limit).all()
+        if not cursor:
+            query = query.offset(skip)
+        result = await db.execute(query.limit(limit))
+        messages = result.all()
         logger.info(f"Successfully fetched {len(messages)} messages")
         return messages
         
@@ -35,29 +95,252 @@ def get_messages(
         logger.error(f"Error fetching messages: {str(e)}")
         raise
 
-def get_detections(
-    db: Session, 
+def _detected(class_name: str = None, min_confidence: float = None):
+    """EXISTS clause matching messages with a linked detection of the given class and confidence"""
+    link = models.MessageDetection
+    clause = select(literal(1)).where(
+        link.channel == models.Message.channel,
+        link.message_id == models.Message.message_id
+    )
+    if class_name:
+        clause = clause.where(link.class_name == class_name)
+    if min_confidence:
+        clause = clause.where(link.confidence >= min_confidence)
+    return clause.exists()
+
+async def get_message_detections(
+    db: AsyncSession,
+    message_keys: List[tuple],
+    class_name: str = None,
+    min_confidence: float = None
+) -> Dict[tuple, List[Row]]:
+    """Fetch linked detections for (channel, message_id) keys, grouped by key"""
+    try:
+        if not message_keys:
+            return {}
+        
+        link = models.MessageDetection
+        query = (
+            select(*link.__table__.columns)
+            .where(tuple_(link.channel, link.message_id).in_(message_keys))
+            .order_by(link.channel, link.message_id, link.confidence.desc())
+        )
+        if class_name:
+            query = query.where(link.class_name == class_name)
+        if min_confidence:
+            query = query.where(link.confidence >= min_confidence)
+        
+        result = await db.execute(query)
+        detections = {}
+        for row in result.all():
+            detections.setdefault((row.channel, row.message_id), []).append(row)
+        logger.info(f"Successfully fetched detections for {len(detections)} messages")
+        return detections
+        
+    except Exception as e:
+        logger.error(f"Error fetching message detections: {str(e)}")
+        raise
+
+async def search_messages(
+    db: AsyncSession,
+    q: str,
+    channel: str = None,
+    start_day: date = None,
+    end_day: date = None,
+    skip: int = 0,
+    limit: int = 100
+) -> List[Row]:
+    """
+    Search message text and return message rows with a rank column, best match first.
+    
+    English text is matched through the full-text index, any text (including Amharic,
+    which has no stemming dictionary) through the trigram index. Both expressions must
+    stay identical to the index definitions on models.Message to be used by the planner.
+    """
+    try:
+        logger.info("Attempting to search messages in database")
+        english = literal_column("'english'")
+        vector = func.to_tsvector(english, func.coalesce(models.Message.text, literal_column("''")))
+        ts_query = func.websearch_to_tsquery(english, q)
+        pattern = "%" + q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        rank = func.coalesce(
+            func.ts_rank(vector, ts_query) + func.word_similarity(q, models.Message.text), 0.0
+        ).label("rank")
+        
+        query = select(*models.Message.__table__.columns, rank).where(
+            or_(vector.op("@@")(ts_query), models.Message.text.ilike(pattern))
+        )
+        
+        if channel:
+            query = query.where(models.Message.channel == channel)
+        if start_day:
+            query = query.where(models.Message.date >= start_day)
+        if end_day:
+            query = query.where(models.Message.date < end_day + timedelta(days=1))
+        
+        query = query.order_by(rank.desc(), models.Message.date.desc()).offset(skip).limit(limit)
+        
+        result = await db.execute(query)
+        matches = result.all()
+        logger.info(f"Successfully found {len(matches)} matching messages")
+        return matches
+        
+    except Exception as e:
+        logger.error(f"Error searching messages: {str(e)}")
+        raise
+
+async def get_detections(
+    db: AsyncSession, 
     skip: int = 0, 
     limit: int = 100,
     class_name: str = None,
-    min_confidence: float = None
-) -> List[models.ObjectDetection]:
+    min_confidence: float = None,
+    cursor: Optional[str] = None
+) -> List[Row]:
+    """Fetch a page of detections as plain rows (no ORM instances or identity map)"""
     try:
         logger.info("Attempting to fetch detections from database")
-        query = db.query(models.ObjectDetection)
+        query = select(*models.ObjectDetection.__table__.columns)
         
         if class_name:
-            query = query.filter(models.ObjectDetection.class_name == class_name)
+            query = query.where(models.ObjectDetection.class_name == class_name)
         if min_confidence:
-            query = query.filter(models.ObjectDetection.confidence >= min_confidence)
+            query = query.where(models.ObjectDetection.confidence >= min_confidence)
         
-        # Log the SQL query
-        logger.info(f"SQL Query: {query}")
+        if cursor:
+            query = query.where(models.ObjectDetection.id > _detection_key(cursor))
+        query = query.order_by(models.ObjectDetection.id)
         
-        detections = query.offset(skip).limit(limit).all()
+        if not cursor:
+            query = query.offset(skip)
+        result = await db.execute(query.limit(limit))
+        detections = result.all()
         logger.info(f"Successfully fetched {len(detections)} detections")
         return detections
         
     except Exception as e:
         logger.error(f"Error fetching detections: {str(e)}")
+        raise
+
+def messages_export_query(
+    channel: str = None,
+    start_day: date = None,
+    end_day: date = None,
+    class_name: str = None,
+    min_confidence: float = None
+):
+    """Build a plain-column query over messages for streaming export"""
+    query = select(*models.Message.__table__.columns)
+    
+    if channel:
+        query = query.where(models.Message.channel == channel)
+    if class_name or min_confidence:
+        query = query.where(_detected(class_name, min_confidence))
+    if start_day:
+        query = query.where(models.Message.date >= start_day)
+    if end_day:
+        query = query.where(models.Message.date < end_day + timedelta(days=1))
+    
+    return query.order_by(models.Message.date, models.Message.channel, models.Message.message_id)
+
+def detections_export_query(
+    class_name: str = None,
+    min_confidence: float = None,
+    start_day: date = None,
+    end_day: date = None
+):
+    """Build a plain-column query over detections for streaming export"""
+    query = select(*models.ObjectDetection.__table__.columns)
+    
+    if class_name:
+        query = query.where(models.ObjectDetection.class_name == class_name)
+    if min_confidence:
+        query = query.where(models.ObjectDetection.confidence >= min_confidence)
+    if start_day:
+        query = query.where(models.ObjectDetection.processed_date >= start_day)
+    if end_day:
+        query = query.where(models.ObjectDetection.processed_date < end_day + timedelta(days=1))
+    
+    return query.order_by(models.ObjectDetection.id)
+
+def _empty_stats() -> Dict:
+    return {
+        'total_messages': 0,
+        'messages_by_language': {},
+        'messages_with_media': 0,
+        'word_count_sum': 0,
+        'word_count_n': 0,
+        'refreshed_at': None,
+        'latest_day': None
+    }
+
+async def get_stats(
+    db: AsyncSession,
+    channel: str = None,
+    start_day: date = None,
+    end_day: date = None,
+    group_by: str = None
+) -> List[Dict]:
+    """
+    Aggregate message statistics from the precomputed message_stats_daily table.
+    
+    Returns one dict per channel or per day when group_by is 'channel' or 'day',
+    otherwise a single dict for everything matching the filters.
+    """
+    try:
+        logger.info("Attempting to fetch message statistics from database")
+        stats = models.MessageStatsDaily
+        group_columns = [getattr(stats, group_by)] if group_by else []
+        query = select(
+            *group_columns,
+            stats.language,
+            func.sum(stats.message_count),
+            func.sum(stats.media_count),
+            func.sum(stats.word_count_sum),
+            func.sum(stats.word_count_n),
+            func.max(stats.updated_at),
+            func.max(stats.day)
+        )
+        
+        if channel:
+            query = query.where(stats.channel == channel)
+        if start_day:
+            query = query.where(stats.day >= start_day)
+        if end_day:
+            query = query.where(stats.day <= end_day)
+        
+        query = query.group_by(*group_columns, stats.language).order_by(*group_columns)
+        
+        # Fold the per-language rows into one result per group
+        results = {}
+        rows = await db.execute(query)
+        for row in rows.all():
+            key = row[0] if group_by else None
+            language, messages, media, words, word_n, refreshed_at, latest_day = row[len(group_columns):]
+            result = results.setdefault(key, _empty_stats())
+            result['total_messages'] += int(messages)
+            result['messages_by_language'][language] = int(messages)
+            result['messages_with_media'] += int(media)
+            result['word_count_sum'] += int(words)
+            result['word_count_n'] += int(word_n)
+            result['refreshed_at'] = max(filter(None, [result['refreshed_at'], refreshed_at]), default=None)
+            result['latest_day'] = max(filter(None, [result['latest_day'], latest_day]), default=None)
+        
+        if not group_by and not results:
+            results[None] = _empty_stats()
+        
+        stats_list = []
+        for key, result in results.items():
+            word_n = result.pop('word_count_n')
+            word_sum = result.pop('word_count_sum')
+            result['average_word_count'] = word_sum / word_n if word_n else 0.0
+            if group_by:
+                result[group_by] = key
+            stats_list.append(result)
+        
+        logger.info(f"Successfully fetched {len(stats_list)} statistics rows")
+        return stats_list
+        
+    except Exception as e:
+        logger.error(f"Error fetching statistics: {str(e)}")
         raise
\ No newline at end of file
@@ -1,46 +1,109 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 import os
-from dotenv import load_dotenv
 from urllib.parse import quote_plus
 
-# Load environment variables
-load_dotenv()
+# Engines are created on first use rather than at import, so importing the API
+# (workers, scripts, benchmarks) neither reads .env nor touches the database
+engine = None
+async_engine = None
 
-# Database connection settings
-DB_HOST = os.getenv('DB_HOST', 'localhost')
-DB_PORT = os.getenv('DB_PORT', '5432')
-DB_NAME = os.getenv('DB_NAME', 'medical_data')
-DB_USER = os.getenv('DB_USER', 'postgres')
-DB_PASSWORD = os.getenv('DB_PASSWORD')
+# Create SessionLocal classes, bound to their engines by get_engine() / init_engine()
+SessionLocal = sessionmaker(autocommit=False, autoflush=False)
+AsyncSessionLocal = async_sessionmaker(class_=AsyncSession, autoflush=False, expire_on_commit=False)
 
-if not DB_PASSWORD:
-    raise ValueError("Database password not found in environment variables")
+# Create Base class
+Base = declarative_base()
 
-# URL encode the password to handle special characters
-encoded_password = quote_plus(DB_PASSWORD)
+_environment_loaded = False
 
-# Create database URL
-SQLALCHEMY_DATABASE_URL = f"postgresql://{DB_USER}:{encoded_password}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+def load_environment():
+    """Load environment variables from .env, once per process"""
+    global _environment_loaded
+    if not _environment_loaded:
+        from dotenv import load_dotenv
+        load_dotenv()
+        _environment_loaded = True
 
-# Create engine with echo for debugging
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL,
-    echo=True,  # Set to False in production
-    pool_pre_ping=True
-)
+def database_url(driver="postgresql"):
+    load_environment()
 
-# Create SessionLocal class
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    # Database connection settings
+    db_host = os.getenv('DB_HOST', 'localhost')
+    db_port = os.getenv('DB_PORT', '5432')
+    db_name = os.getenv('DB_NAME', 'medical_data')
+    db_user = os.getenv('DB_USER', 'postgres')
+    db_password = os.getenv('DB_PASSWORD')
 
-# Create Base class
-Base = declarative_base()
+    if not db_password:
+        raise ValueError("Database password not found in environment variables")
+
+    # URL encode the password to handle special characters
+    return f"{driver}://{db_user}:{quote_plus(db_password)}@{db_host}:{db_port}/{db_name}"
+
+def _echo():
+    # SQL statement logging for debugging, off unless DB_ECHO=1
+    return os.getenv('DB_ECHO', '0') == '1'
+
+def get_engine():
+    """Return the synchronous engine, used for schema management"""
+    global engine
+    if engine is None:
+        engine = create_engine(database_url(), echo=_echo(), pool_pre_ping=True)
+        SessionLocal.configure(bind=engine)
+    return engine
+
+def init_engine():
+    """
+    Create the async engine used by the API handlers, so database round-trips
+    don't block the event loop. Runs once at API startup.
+    """
+    global async_engine
+    if async_engine is None:
+        async_engine = create_async_engine(
+            database_url("postgresql+asyncpg"),
+            echo=_echo(),
+            pool_size=int(os.getenv('DB_POOL_SIZE', '10')),
+            max_overflow=int(os.getenv('DB_MAX_OVERFLOW', '20')),
+            pool_pre_ping=True
+        )
+        AsyncSessionLocal.configure(bind=async_engine)
+    return async_engine
+
+async def dispose_engine():
+    global async_engine
+    if async_engine is not None:
+        await async_engine.dispose()
+        async_engine = None
+
+def create_schema():
+    """
+    Create the API tables and the extensions they need.
+
+    This is a one-time setup step (python src/run_api.py --init-db); API workers
+    no longer run it on every start.
+    """
+    from . import models
+
+    engine = get_engine()
+    # The trigram search index needs pg_trgm
+    with engine.begin() as conn:
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+    models.Base.metadata.create_all(bind=engine)
 
 # Dependency
 def get_db():
+    get_engine()
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close() 
\ No newline at end of file
+        db.close()
+
+# Async dependency
+async def get_async_db():
+    init_engine()
+    async with AsyncSessionLocal() as db:
+        yield db
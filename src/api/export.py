@@ -0,0 +1,161 @@
+import io
+import csv
+import json
+import logging
+from datetime import datetime, date
+from sqlalchemy import Integer, BigInteger, Float, Boolean, Date, DateTime
+from .database import AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+MEDIA_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+    'arrow': 'application/vnd.apache.arrow.stream',
+}
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+def _arrow_type(column_type):
+    import pyarrow as pa
+
+    if isinstance(column_type, (Integer, BigInteger)):
+        return pa.int64()
+    if isinstance(column_type, Float):
+        return pa.float64()
+    if isinstance(column_type, Boolean):
+        return pa.bool_()
+    if isinstance(column_type, DateTime):
+        return pa.timestamp('us', tz='UTC')
+    if isinstance(column_type, Date):
+        return pa.date32()
+    return pa.string()
+
+def _arrow_schema(columns, first_batch):
+    """
+    Arrow schema from the declared column types, checked against the first batch.
+
+    A column whose values don't fit its declared type (e.g. a BIGINT message_id in
+    a table loaded by an older pipeline) gets the type inferred from the batch.
+    """
+    import pyarrow as pa
+
+    fields = []
+    for i, column in enumerate(columns):
+        declared = _arrow_type(column.type)
+        values = [row[i] for row in first_batch]
+        try:
+            pa.array(values, type=declared)
+            fields.append(pa.field(column.name, declared))
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            inferred = pa.array(values).type
+            logger.warning(f"Column '{column.name}' holds {inferred} values, exporting as {inferred} instead of {declared}")
+            fields.append(pa.field(column.name, inferred))
+    return pa.schema(fields)
+
+async def _batches(query, batch_size):
+    # The session is opened here rather than through a dependency, because the
+    # response body is produced after the endpoint function has returned
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(query.execution_options(yield_per=batch_size))
+        async for partition in result.partitions(batch_size):
+            yield partition
+
+def _ndjson_encoder(columns, first_batch):
+    names = [c.name for c in columns]
+
+    def encode(batch):
+        lines = [json.dumps(dict(zip(names, row)), default=_json_default) for row in batch]
+        return ("\n".join(lines) + "\n").encode('utf-8') if lines else b""
+
+    return b"", encode, lambda: b""
+
+def _csv_encoder(columns, first_batch):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def drain():
+        data = buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+        return data
+
+    def encode(batch):
+        writer.writerows(batch)
+        return drain()
+
+    writer.writerow([c.name for c in columns])
+    return drain(), encode, lambda: b""
+
+def _arrow_encoder(columns, first_batch):
+    import pyarrow as pa
+
+    schema = _arrow_schema(columns, first_batch)
+    sink = io.BytesIO()
+    writer = pa.ipc.new_stream(sink, schema)
+
+    def drain():
+        data = sink.getvalue()
+        sink.seek(0)
+        sink.truncate()
+        return data
+
+    def encode(batch):
+        arrays = [pa.array([row[i] for row in batch], type=field.type) for i, field in enumerate(schema)]
+        writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=schema))
+        return drain()
+
+    def finish():
+        writer.close()
+        return drain()
+
+    return drain(), encode, finish
+
+ENCODERS = {
+    'ndjson': _ndjson_encoder,
+    'csv': _csv_encoder,
+    'arrow': _arrow_encoder,
+}
+
+async def stream_export(query, fmt, batch_size=5000):
+    """
+    Run an export query and return an async iterator over the encoded rows.
+
+    The first batch is fetched and encoded before this returns, so query errors and
+    column types that can't be encoded surface before the response status is sent.
+    The remaining rows are fetched from a server-side cursor batch_size at a time and
+    encoded without building ORM objects or Pydantic models, so memory use stays
+    constant regardless of how many rows are exported.
+    """
+    if fmt not in ENCODERS:
+        raise ValueError(f"Unsupported export format: {fmt}")
+
+    columns = list(query.selected_columns)
+    batches = _batches(query, batch_size)
+    try:
+        try:
+            first_batch = await batches.__anext__()
+        except StopAsyncIteration:
+            first_batch = []
+        header, encode, finish = ENCODERS[fmt](columns, first_batch)
+        first_chunk = header + encode(first_batch)
+    except Exception:
+        await batches.aclose()
+        raise
+
+    async def body():
+        rows_written = len(first_batch)
+        try:
+            yield first_chunk
+            async for batch in batches:
+                rows_written += len(batch)
+                yield encode(batch)
+            yield finish()
+        finally:
+            await batches.aclose()
+        logger.info(f"Exported {rows_written} rows as {fmt}")
+
+    return body()
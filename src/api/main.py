@@ -1,60 +1,334 @@
-from fastapi import FastAPI, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-from typing import List, Optional
-from . import crud, models, schemas
-from .database import engine, get_db
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional, Literal
+from datetime import date
+from . import crud, schemas
+from .database import get_async_db, AsyncSessionLocal, init_engine, dispose_engine, load_environment
+from .cache import build_response_cache
+from .export import stream_export, MEDIA_TYPES
+from .serialization import RowSerializer, dumps
+from .metrics import MetricsMiddleware, instrument_engine
+from log_utils.logger import setup_logger
+from log_utils.metrics import REGISTRY, OPENMETRICS_CONTENT_TYPE
 import logging
 
-# Set up logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Create database tables
-models.Base.metadata.create_all(bind=engine)
+@asynccontextmanager
+async def lifespan(app):
+    """
+    Per-worker startup: logging, the database engine and the response cache are set
+    up here rather than at import. Tables are not created here; run
+    python src/run_api.py --init-db once.
+    """
+    setup_logger('api')
+    load_environment()
+    engine = init_engine()
+    instrument_engine(engine.sync_engine)
+    # Built after .env is loaded so API_CACHE_* and REDIS_URL set there apply.
+    # Responses are cached until a loader bumps the version of the data they read
+    app.state.response_cache = build_response_cache(AsyncSessionLocal)
+    yield
+    await dispose_engine()
 
 # Create FastAPI app
 app = FastAPI(
     title="Ethiopian Medical Data API",
     description="API for accessing Ethiopian medical data from Telegram channels",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
+# Request, handler and database timings, exposed on /metrics
+app.add_middleware(MetricsMiddleware)
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+# List endpoints encode rows straight to JSON instead of validating a model per row;
+# their response_model still documents the schema
+message_serializer = RowSerializer(schemas.Message)
+search_result_serializer = RowSerializer(schemas.MessageSearchResult)
+detection_serializer = RowSerializer(schemas.ObjectDetection)
+linked_detection_serializer = RowSerializer(schemas.LinkedDetection)
+
 @app.get("/messages/", response_model=List[schemas.Message])
 async def read_messages(
+    request: Request,
     skip: int = 0,
     limit: int = 100,
     channel: Optional[str] = None,
     language: Optional[str] = None,
-    db: Session = Depends(get_db)
+    class_name: Optional[str] = Query(None, description="Only messages with an image containing this detected class"),
+    min_confidence: Optional[float] = Query(None, description="Minimum confidence of that detection"),
+    cursor: Optional[str] = Query(None, description=f"Opaque cursor from the {NEXT_CURSOR_HEADER} header of the previous page"),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Get messages with optional filtering"""
+    """Get messages with optional filtering, ordered by date, channel and message_id"""
     try:
         logger.info("Processing request to /messages/")
-        messages = crud.get_messages(db, skip=skip, limit=limit, channel=channel, language=language)
-        return messages
+        params = dict(
+            skip=skip,
+            limit=limit,
+            channel=channel,
+            language=language,
+            class_name=class_name,
+            min_confidence=min_confidence,
+            cursor=cursor
+        )
+        
+        async def load():
+            messages = await crud.get_messages(db, **params)
+            headers = {}
+            if len(messages) == limit:
+                headers[NEXT_CURSOR_HEADER] = crud.message_cursor(messages[-1])
+            return message_serializer.dumps(messages), headers
+        
+        data_sets = ['messages', 'detections'] if class_name or min_confidence else ['messages']
+        return await request.app.state.response_cache.respond(request, data_sets, params, load)
+    except crud.InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error processing messages request: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/messages/with-detections/", response_model=List[schemas.MessageWithDetections])
+async def read_messages_with_detections(
+    request: Request,
+    skip: int = 0,
+    limit: int = 100,
+    channel: Optional[str] = None,
+    language: Optional[str] = None,
+    class_name: Optional[str] = Query(None, description="Only messages with an image containing this detected class"),
+    min_confidence: Optional[float] = Query(None, description="Minimum confidence of that detection"),
+    cursor: Optional[str] = Query(None, description=f"Opaque cursor from the {NEXT_CURSOR_HEADER} header of the previous page"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get messages with the detections found in their images embedded"""
+    try:
+        logger.info("Processing request to /messages/with-detections/")
+        params = dict(
+            skip=skip,
+            limit=limit,
+            channel=channel,
+            language=language,
+            class_name=class_name,
+            min_confidence=min_confidence,
+            cursor=cursor
+        )
+        
+        async def load():
+            messages = await crud.get_messages(db, **params)
+            detections = await crud.get_message_detections(
+                db,
+                [(m.channel, m.message_id) for m in messages],
+                class_name=class_name,
+                min_confidence=min_confidence
+            )
+            items = message_serializer.to_dicts(messages)
+            for item, message in zip(items, messages):
+                linked = detections.get((message.channel, message.message_id), [])
+                item['detections'] = linked_detection_serializer.to_dicts(linked)
+            headers = {}
+            if len(messages) == limit:
+                headers[NEXT_CURSOR_HEADER] = crud.message_cursor(messages[-1])
+            return dumps(items), headers
+        
+        return await request.app.state.response_cache.respond(request, ['messages', 'detections'], params, load)
+    except crud.InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error processing messages with detections request: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/messages/search", response_model=List[schemas.MessageSearchResult])
+async def search_messages(
+    request: Request,
+    q: str = Query(..., min_length=1, description="Words or phrase to search for, in English or Amharic"),
+    channel: Optional[str] = None,
+    start_day: Optional[date] = None,
+    end_day: Optional[date] = None,
+    skip: int = 0,
+    limit: int = 100,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Search message text, ranked by relevance"""
+    try:
+        logger.info("Processing request to /messages/search")
+        params = dict(
+            q=q,
+            channel=channel,
+            start_day=start_day,
+            end_day=end_day,
+            skip=skip,
+            limit=limit
+        )
+        
+        async def load():
+            results = await crud.search_messages(db, **params)
+            return search_result_serializer.dumps(results), {}
+        
+        return await request.app.state.response_cache.respond(request, ['messages'], params, load)
+    except Exception as e:
+        logger.error(f"Error processing search request: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.get("/detections/", response_model=List[schemas.ObjectDetection])
 async def read_detections(
+    request: Request,
     skip: int = 0,
     limit: int = 100,
     class_name: Optional[str] = None,
     min_confidence: Optional[float] = None,
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None, description=f"Opaque cursor from the {NEXT_CURSOR_HEADER} header of the previous page"),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Get object detections with optional filtering"""
+    """Get object detections with optional filtering, ordered by id"""
     try:
         logger.info("Processing request to /detections/")
-        detections = crud.get_detections(
-            db, 
-            skip=skip, 
-            limit=limit, 
+        params = dict(
+            skip=skip,
+            limit=limit,
             class_name=class_name,
-            min_confidence=min_confidence
+            min_confidence=min_confidence,
+            cursor=cursor
         )
-        return detections
+        
+        async def load():
+            detections = await crud.get_detections(db, **params)
+            headers = {}
+            if len(detections) == limit:
+                headers[NEXT_CURSOR_HEADER] = crud.detection_cursor(detections[-1])
+            return detection_serializer.dumps(detections), headers
+        
+        return await request.app.state.response_cache.respond(request, ['detections'], params, load)
+    except crud.InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error processing detections request: {str(e)}")
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/stats/", response_model=schemas.Stats)
+async def read_stats(
+    request: Request,
+    channel: Optional[str] = None,
+    start_day: Optional[date] = None,
+    end_day: Optional[date] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get overall message statistics from the precomputed daily aggregates"""
+    try:
+        logger.info("Processing request to /stats/")
+        params = dict(channel=channel, start_day=start_day, end_day=end_day)
+        
+        async def load():
+            return schemas.Stats(**(await crud.get_stats(db, **params))[0]), {}
+        
+        return await request.app.state.response_cache.respond(request, ['messages'], params, load)
+    except Exception as e:
+        logger.error(f"Error processing stats request: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/stats/channels/", response_model=List[schemas.ChannelStats])
+async def read_channel_stats(
+    request: Request,
+    start_day: Optional[date] = None,
+    end_day: Optional[date] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get message statistics per channel"""
+    try:
+        logger.info("Processing request to /stats/channels/")
+        params = dict(start_day=start_day, end_day=end_day, group_by='channel')
+        
+        async def load():
+            return [schemas.ChannelStats(**row) for row in await crud.get_stats(db, **params)], {}
+        
+        return await request.app.state.response_cache.respond(request, ['messages'], params, load)
+    except Exception as e:
+        logger.error(f"Error processing channel stats request: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/stats/daily/", response_model=List[schemas.DailyStats])
+async def read_daily_stats(
+    request: Request,
+    channel: Optional[str] = None,
+    start_day: Optional[date] = None,
+    end_day: Optional[date] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get message statistics per day, optionally for a single channel"""
+    try:
+        logger.info("Processing request to /stats/daily/")
+        params = dict(channel=channel, start_day=start_day, end_day=end_day, group_by='day')
+        
+        async def load():
+            return [schemas.DailyStats(**row) for row in await crud.get_stats(db, **params)], {}
+        
+        return await request.app.state.response_cache.respond(request, ['messages'], params, load)
+    except Exception as e:
+        logger.error(f"Error processing daily stats request: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+ExportFormat = Literal['ndjson', 'csv', 'arrow']
+
+async def _export_response(query, fmt, filename):
+    # Awaited before the response starts, so a failing query is still a 500
+    body = await stream_export(query, fmt)
+    return StreamingResponse(
+        body,
+        media_type=MEDIA_TYPES[fmt],
+        headers={'Content-Disposition': f'attachment; filename="{filename}.{fmt}"'}
+    )
+
+@app.get("/export/messages")
+async def export_messages(
+    format: ExportFormat = 'ndjson',
+    channel: Optional[str] = None,
+    start_day: Optional[date] = None,
+    end_day: Optional[date] = None,
+    class_name: Optional[str] = Query(None, description="Only messages with an image containing this detected class"),
+    min_confidence: Optional[float] = Query(None, description="Minimum confidence of that detection")
+):
+    """Stream all matching messages as NDJSON, CSV or Arrow IPC"""
+    try:
+        logger.info("Processing request to /export/messages")
+        query = crud.messages_export_query(
+            channel=channel,
+            start_day=start_day,
+            end_day=end_day,
+            class_name=class_name,
+            min_confidence=min_confidence
+        )
+        return await _export_response(query, format, "messages")
+    except Exception as e:
+        logger.error(f"Error processing messages export: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/export/detections")
+async def export_detections(
+    format: ExportFormat = 'ndjson',
+    class_name: Optional[str] = None,
+    min_confidence: Optional[float] = None,
+    start_day: Optional[date] = None,
+    end_day: Optional[date] = None
+):
+    """Stream all matching object detections as NDJSON, CSV or Arrow IPC"""
+    try:
+        logger.info("Processing request to /export/detections")
+        query = crud.detections_export_query(
+            class_name=class_name,
+            min_confidence=min_confidence,
+            start_day=start_day,
+            end_day=end_day
+        )
+        return await _export_response(query, format, "detections")
+    except Exception as e:
+        logger.error(f"Error processing detections export: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/metrics", include_in_schema=False)
+async def read_metrics():
+    """Request, database and cache metrics of this worker in the OpenMetrics text format"""
+    return Response(content=REGISTRY.render(), media_type=OPENMETRICS_CONTENT_TYPE)
@@ -0,0 +1,60 @@
+import time
+from contextvars import ContextVar
+from sqlalchemy import event
+from log_utils.metrics import histogram, counter
+
+REQUEST_SECONDS = histogram('api_request_seconds', 'Time to handle an API request, including streaming the body', ['route', 'method', 'status'])
+REQUEST_DB_SECONDS = histogram('api_request_db_seconds', 'Database time spent while handling an API request', ['route'])
+DB_QUERY_SECONDS = histogram('api_db_query_seconds', 'Time per database statement issued by the API')
+CACHE_REQUESTS = counter('api_cache_requests', 'Response cache lookups', ['result'])
+
+# Database seconds accumulated by the request being handled in this context
+_request_db_time = ContextVar('request_db_time', default=None)
+
+def instrument_engine(engine):
+    """Time every statement run on the engine (pass async_engine.sync_engine for async engines)"""
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info['query_start'].pop()
+        DB_QUERY_SECONDS.observe(elapsed)
+        db_time = _request_db_time.get()
+        if db_time is not None:
+            db_time[0] += elapsed
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording request and database time per route.
+
+    Routes are labelled by their path template rather than the request URL, so the
+    number of series stays bounded.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        status = [500]
+        db_time = [0.0]
+        token = _request_db_time.set(db_time)
+
+        async def send_with_status(message):
+            if message['type'] == 'http.response.start':
+                status[0] = message['status']
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            _request_db_time.reset(token)
+            route = getattr(scope.get('route'), 'path', 'unmatched')
+            REQUEST_SECONDS.observe(elapsed, route=route, method=scope['method'], status=status[0])
+            REQUEST_DB_SECONDS.observe(db_time[0], route=route)
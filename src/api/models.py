@@ -1,12 +1,29 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, BigInteger, String, Float, Date, DateTime, Boolean, ForeignKey, Index, PrimaryKeyConstraint, text
 from sqlalchemy.orm import relationship
 from .database import Base
 
 class Message(Base):
     __tablename__ = "cleaned_messages"
+    __table_args__ = (
+        # Mirrors database.schema.CREATE_MESSAGES_TABLE; message ids are only unique per channel
+        PrimaryKeyConstraint("channel", "message_id"),
+        # Kept in sync with database.schema.MESSAGE_INDEXES, which the loader applies
+        Index("ix_cleaned_messages_date_channel_message_id", "date", "channel", "message_id"),
+        Index(
+            "ix_cleaned_messages_text_fts",
+            text("to_tsvector('english', coalesce(text, ''))"),
+            postgresql_using="gin"
+        ),
+        Index(
+            "ix_cleaned_messages_text_trgm",
+            "text",
+            postgresql_using="gin",
+            postgresql_ops={"text": "gin_trgm_ops"}
+        ),
+    )
     
-    message_id = Column(String, primary_key=True)
-    channel = Column(String)
+    message_id = Column(String, nullable=False)
+    channel = Column(String, nullable=False)
     date = Column(DateTime)
     text = Column(String)
     has_media = Column(Boolean)
@@ -19,7 +36,8 @@ class ObjectDetection(Base):
     __tablename__ = "object_detections"
     
     id = Column(Integer, primary_key=True, index=True)
-    image_path = Column(String)
+    # Same name as database.schema.ensure_image_path_index, which the detection sink applies
+    image_path = Column(String, index=True)
     class_id = Column(Integer)
     class_name = Column(String)
     confidence = Column(Float)
@@ -27,4 +45,52 @@ class ObjectDetection(Base):
     bbox_y1 = Column(Float)
     bbox_x2 = Column(Float)
     bbox_y2 = Column(Float)
-    processed_date = Column(DateTime) 
\ No newline at end of file
+    processed_date = Column(DateTime) 
+
+class MessageDetection(Base):
+    """
+    Detections linked to the message whose image they were found in, keyed on
+    (channel, message_id) parsed from the image file name. Populated by the
+    detection sink alongside object_detections.
+    """
+    __tablename__ = "message_detections"
+    __table_args__ = (
+        # Kept in sync with database.schema.LINK_INDEXES, which the loader applies
+        Index("ix_message_detections_channel_message_id", "channel", "message_id"),
+        Index("ix_message_detections_class_confidence", "class_name", "confidence", "channel", "message_id"),
+        Index("ix_message_detections_image_path", "image_path"),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    channel = Column(String, nullable=False)
+    message_id = Column(String, nullable=False)
+    image_path = Column(String, nullable=False)
+    class_id = Column(Integer)
+    class_name = Column(String)
+    confidence = Column(Float)
+    bbox_x1 = Column(Float)
+    bbox_y1 = Column(Float)
+    bbox_x2 = Column(Float)
+    bbox_y2 = Column(Float)
+    processed_date = Column(DateTime)
+
+class MessageStatsDaily(Base):
+    """Per-channel, per-day aggregates maintained by database.stats.refresh_message_stats"""
+    __tablename__ = "message_stats_daily"
+    
+    channel = Column(String, primary_key=True)
+    day = Column(Date, primary_key=True)
+    language = Column(String, primary_key=True)
+    message_count = Column(Integer, nullable=False)
+    media_count = Column(Integer, nullable=False)
+    word_count_sum = Column(BigInteger, nullable=False)
+    word_count_n = Column(Integer, nullable=False)
+    updated_at = Column(DateTime, nullable=False)
+
+class DataVersion(Base):
+    """Change counters bumped by the loaders, used to invalidate cached API responses"""
+    __tablename__ = "data_versions"
+    
+    name = Column(String, primary_key=True)
+    version = Column(BigInteger, nullable=False)
+    updated_at = Column(DateTime, nullable=False)
\ No newline at end of file
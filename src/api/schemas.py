@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from datetime import datetime
+from datetime import datetime, date
 from typing import Optional, List
 
 class MessageBase(BaseModel):
@@ -22,6 +22,9 @@ class Message(MessageBase):
     class Config:
         from_attributes = True
 
+class MessageSearchResult(Message):
+    rank: float
+
 class ObjectDetectionBase(BaseModel):
     image_path: str
     class_id: int
@@ -39,8 +42,22 @@ class ObjectDetection(ObjectDetectionBase):
     class Config:
         from_attributes = True
 
+class LinkedDetection(ObjectDetectionBase):
+    processed_date: Optional[datetime] = None
+
+class MessageWithDetections(Message):
+    detections: List[LinkedDetection] = []
+
 class Stats(BaseModel):
     total_messages: int
     messages_by_language: dict
     messages_with_media: int
-    average_word_count: float 
\ No newline at end of file
+    average_word_count: float
+    refreshed_at: Optional[datetime] = None
+    latest_day: Optional[date] = None
+
+class ChannelStats(Stats):
+    channel: str
+
+class DailyStats(Stats):
+    day: date 
\ No newline at end of file
@@ -0,0 +1,50 @@
+import sys
+import time
+import random
+import asyncio
+import argparse
+
+import httpx
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p * len(values)))]
+
+async def client(http, url, deadline, latencies, max_skip):
+    while time.perf_counter() < deadline:
+        # Random offsets keep most requests out of the response cache
+        params = {'skip': random.randint(0, max_skip), 'limit': 100} if max_skip else {'limit': 100}
+        start = time.perf_counter()
+        response = await http.get(url, params=params)
+        response.raise_for_status()
+        latencies.append(time.perf_counter() - start)
+
+async def run_level(url, concurrency, duration, max_skip):
+    latencies = []
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=60) as http:
+        deadline = time.perf_counter() + duration
+        start = time.perf_counter()
+        await asyncio.gather(*(client(http, url, deadline, latencies, max_skip) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    return len(latencies) / elapsed, 1000 * percentile(latencies, 0.99)
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Measure API throughput and p99 latency at increasing client concurrency. "
+                    "Start the server with API_CACHE_TTL=0 to measure the database path only."
+    )
+    parser.add_argument("--url", default="http://localhost:8000/messages/")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32, 64])
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per concurrency level")
+    parser.add_argument("--max-skip", type=int, default=1000, help="Upper bound for random skip values, 0 to disable")
+    args = parser.parse_args()
+
+    print(f"{'clients':>8} {'req/s':>10} {'p99 ms':>10}")
+    for concurrency in args.concurrency:
+        rps, p99 = asyncio.run(run_level(args.url, concurrency, args.duration, args.max_skip))
+        print(f"{concurrency:>8} {rps:>10.1f} {p99:>10.2f}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
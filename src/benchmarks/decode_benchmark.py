@@ -0,0 +1,95 @@
+import sys
+import time
+import argparse
+import tracemalloc
+from pathlib import Path
+
+# Add the src directory to Python path
+project_root = Path(__file__).parent.parent.parent
+sys.path.append(str(project_root / "src"))
+
+from object_detection.detector import decode_image
+
+TARGET_SIZE = (640, 640)
+
+def benchmark_decode(image_files, target_size):
+    """Time full and reduced decoding of each image and track decoded memory"""
+    results = {'full': [], 'reduced': []}
+    for image_path in image_files:
+        for mode, size in (('full', None), ('reduced', target_size)):
+            tracemalloc.start()
+            start = time.perf_counter()
+            img, _ = decode_image(image_path, size)
+            elapsed = time.perf_counter() - start
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            results[mode].append((elapsed, img.nbytes, peak))
+    return results
+
+def box_iou(a, b):
+    x1, y1 = max(a['bbox_x1'], b['bbox_x1']), max(a['bbox_y1'], b['bbox_y1'])
+    x2, y2 = min(a['bbox_x2'], b['bbox_x2']), min(a['bbox_y2'], b['bbox_y2'])
+    inter = max(0.0, x2 - x1) * max(0.0, y2 - y1)
+    area_a = (a['bbox_x2'] - a['bbox_x1']) * (a['bbox_y2'] - a['bbox_y1'])
+    area_b = (b['bbox_x2'] - b['bbox_x1']) * (b['bbox_y2'] - b['bbox_y1'])
+    union = area_a + area_b - inter
+    return inter / union if union > 0 else 0.0
+
+def compare_detections(image_files, iou_threshold=0.5):
+    """Return the share of full-resolution detections reproduced by fast decoding"""
+    from object_detection.detector import ObjectDetector
+
+    detector = ObjectDetector()
+    matched, total = 0, 0
+    for image_path in image_files:
+        detector.fast_decode = False
+        reference = detector.process_image(image_path)
+        detector.fast_decode = True
+        candidates = detector.process_image(image_path)
+
+        total += len(reference)
+        for ref in reference:
+            if any(
+                c['class_id'] == ref['class_id'] and box_iou(c, ref) >= iou_threshold
+                for c in candidates
+            ):
+                matched += 1
+    return matched / total if total else 1.0
+
+def summarize(name, rows):
+    n = len(rows)
+    avg_ms = 1000 * sum(r[0] for r in rows) / n
+    avg_mb = sum(r[1] for r in rows) / n / 2**20
+    peak_mb = max(r[2] for r in rows) / 2**20
+    print(f"{name:>8}: {avg_ms:8.2f} ms/image  {avg_mb:7.2f} MB decoded/image  {peak_mb:7.2f} MB peak")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark full vs reduced-resolution image decoding")
+    parser.add_argument("image_dir", nargs="?", default=str(project_root / "data" / "media"))
+    parser.add_argument("--limit", type=int, default=200, help="Maximum number of images to use")
+    parser.add_argument("--detect", action="store_true", help="Also check that detections do not regress")
+    parser.add_argument("--min-recall", type=float, default=0.95,
+                        help="Minimum share of full-resolution detections that must be reproduced")
+    args = parser.parse_args()
+
+    image_dir = Path(args.image_dir)
+    image_files = sorted(list(image_dir.glob("*.jpg")) + list(image_dir.glob("*.png")))[:args.limit]
+    if not image_files:
+        print(f"No images found in {image_dir}")
+        return 1
+
+    results = benchmark_decode(image_files, TARGET_SIZE)
+    print(f"Decoded {len(image_files)} images from {image_dir}")
+    summarize('full', results['full'])
+    summarize('reduced', results['reduced'])
+
+    if args.detect:
+        recall = compare_detections(image_files)
+        print(f"Detection recall vs full resolution: {recall:.3f}")
+        if recall < args.min_recall:
+            print(f"FAIL: recall below {args.min_recall}")
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,60 @@
+import sys
+import time
+import asyncio
+import argparse
+import statistics
+from pathlib import Path
+
+# Add the src directory to Python path
+project_root = Path(__file__).parent.parent.parent
+sys.path.append(str(project_root / "src"))
+
+from api import crud
+from api.database import AsyncSessionLocal, init_engine
+
+async def time_page(fetch, repeat):
+    """Return the median latency in milliseconds of fetching one page"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await fetch()
+        timings.append(1000 * (time.perf_counter() - start))
+    return statistics.median(timings)
+
+async def run(args):
+    if args.endpoint == 'messages':
+        get_page, make_cursor = crud.get_messages, crud.message_cursor
+    else:
+        get_page, make_cursor = crud.get_detections, crud.detection_cursor
+
+    init_engine()
+    async with AsyncSessionLocal() as db:
+        print(f"{'offset':>10} {'skip ms':>10} {'cursor ms':>10}")
+        for offset in args.offsets:
+            # The row just before the page gives the cursor a client would hold at this depth
+            if offset == 0:
+                cursor = None
+            else:
+                previous = await get_page(db, skip=offset - 1, limit=1)
+                if not previous:
+                    print(f"{offset:>10} table has fewer rows, stopping")
+                    break
+                cursor = make_cursor(previous[0])
+
+            skip_ms = await time_page(lambda: get_page(db, skip=offset, limit=args.limit), args.repeat)
+            cursor_ms = await time_page(lambda: get_page(db, limit=args.limit, cursor=cursor), args.repeat)
+            print(f"{offset:>10} {skip_ms:>10.2f} {cursor_ms:>10.2f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare offset and cursor pagination latency at increasing depth")
+    parser.add_argument("--endpoint", choices=['messages', 'detections'], default='messages')
+    parser.add_argument("--limit", type=int, default=100, help="Page size")
+    parser.add_argument("--offsets", type=int, nargs="+", default=[0, 1000, 10000, 50000, 100000])
+    parser.add_argument("--repeat", type=int, default=5, help="Timed repetitions per page")
+    args = parser.parse_args()
+
+    asyncio.run(run(args))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
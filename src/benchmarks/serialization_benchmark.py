@@ -0,0 +1,86 @@
+import sys
+import json
+import time
+import argparse
+import statistics
+from pathlib import Path
+from datetime import datetime, timedelta
+
+# Add the src directory to Python path
+project_root = Path(__file__).parent.parent.parent
+sys.path.append(str(project_root / "src"))
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import create_engine, text, DateTime, Boolean
+
+from api import schemas
+from api.serialization import RowSerializer
+
+def make_rows(n):
+    """Build n message rows as SQLAlchemy Row objects, without needing Postgres"""
+    engine = create_engine("sqlite://")
+    start = datetime(2025, 1, 1)
+    with engine.connect() as conn:
+        conn.execute(text(
+            "CREATE TABLE cleaned_messages (message_id TEXT, channel TEXT, date TIMESTAMP, text TEXT, "
+            "has_media BOOLEAN, media_path TEXT, word_count INTEGER, contains_url BOOLEAN, language TEXT)"
+        ))
+        conn.execute(
+            text(
+                "INSERT INTO cleaned_messages VALUES "
+                "(:message_id, :channel, :date, :text, :has_media, :media_path, :word_count, :contains_url, :language)"
+            ),
+            [
+                {
+                    'message_id': str(i),
+                    'channel': f"channel_{i % 4}",
+                    'date': (start + timedelta(minutes=i)).isoformat(' '),
+                    'text': f"Sample message text number {i} with some words",
+                    'has_media': i % 2 == 0,
+                    'media_path': f"data/raw/images/channel_{i % 4}_{i}.jpg",
+                    'word_count': 8,
+                    'contains_url': False,
+                    'language': 'english',
+                }
+                for i in range(n)
+            ]
+        )
+        query = text("SELECT * FROM cleaned_messages").columns(
+            date=DateTime, has_media=Boolean, contains_url=Boolean
+        )
+        return conn.execute(query).all()
+
+def pydantic_path(rows):
+    models = [schemas.Message.model_validate(dict(r._mapping)) for r in rows]
+    return json.dumps(jsonable_encoder(models)).encode('utf-8')
+
+def time_it(fn, rows, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(rows)
+        timings.append(1000 * (time.perf_counter() - start))
+    return statistics.median(timings)
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare per-model and fast-path serialization of message rows")
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows)
+    serializer = RowSerializer(schemas.Message)
+
+    # Both paths must produce the same documents
+    assert json.loads(pydantic_path(rows)) == json.loads(serializer.dumps(rows))
+
+    slow = time_it(pydantic_path, rows, args.repeat)
+    fast = time_it(serializer.dumps, rows, args.repeat)
+    per_1k = 1000 / args.rows
+    print(f"pydantic + jsonable_encoder: {slow * per_1k:8.2f} ms per 1k rows")
+    print(f"RowSerializer:               {fast * per_1k:8.2f} ms per 1k rows")
+    print(f"speedup: {slow / fast:.1f}x")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,99 @@
+import os
+import sys
+import time
+import argparse
+import statistics
+import subprocess
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent.parent
+src_dir = project_root / "src"
+
+# Code run in a fresh interpreter per sample: {import} is timed on its own, and the
+# whole process (interpreter start included) is timed by the parent
+SNIPPET = """
+import sys, time
+sys.path.insert(0, {src!r})
+start = time.perf_counter()
+{code}
+print(time.perf_counter() - start)
+"""
+
+API_STARTUP = """
+import asyncio
+import api.main
+async def startup():
+    async with api.main.app.router.lifespan_context(api.main.app):
+        pass
+asyncio.run(startup())
+"""
+
+TARGETS = {
+    'api': "import api.main",
+    # Import plus the worker's lifespan startup (engine creation, no connection)
+    'api_startup': API_STARTUP,
+    'clean_load': "import main",
+    'object_detection': "import object_detection.main",
+    'pipeline': "import run_pipeline",
+    'dbt': "import transformation.dbt_runner",
+    'prepare_images': "import utils.prepare_images",
+}
+
+def run_target(code, env):
+    """Run one cold start; return (timed seconds, process seconds, stderr)"""
+    script = SNIPPET.format(src=str(src_dir), code=code)
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", script],
+        cwd=src_dir, env=env, capture_output=True, text=True
+    )
+    elapsed = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "failed")
+    return float(result.stdout.strip().splitlines()[-1]), elapsed, result.stderr
+
+def slowest_imports(importtime_output, top):
+    """Parse -X importtime output into the second-level imports with the largest cumulative time"""
+    imports = []
+    for line in importtime_output.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # Names are indented two spaces per nesting level; level 1 holds what the
+        # entry module itself imports (fastapi, pandas, torch, ...)
+        level = (len(name) - len(name.lstrip()) - 1) // 2
+        if level == 1:
+            imports.append((int(cumulative), name.strip()))
+    return sorted(imports, reverse=True)[:top]
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure import time and cold start of the API worker and pipeline entry points")
+    parser.add_argument("--targets", nargs="+", choices=list(TARGETS), default=list(TARGETS))
+    parser.add_argument("--repeat", type=int, default=5, help="Fresh interpreters per target")
+    parser.add_argument("--top", type=int, default=5, help="Slowest imports to list per target, 0 to disable")
+    args = parser.parse_args()
+
+    # Importing the API must not need a real database; a placeholder password is
+    # enough for modules that still read it at import
+    env = dict(os.environ)
+    env.setdefault('DB_PASSWORD', 'startup-benchmark')
+
+    print(f"{'target':<18} {'import ms':>10} {'process ms':>11}")
+    for name in args.targets:
+        timings = []
+        try:
+            for _ in range(args.repeat):
+                timings.append(run_target(TARGETS[name], env))
+        except RuntimeError as e:
+            print(f"{name:<18} failed: {e}")
+            continue
+
+        import_ms = 1000 * statistics.median(t for t, _, _ in timings)
+        process_ms = 1000 * statistics.median(p for _, p, _ in timings)
+        print(f"{name:<18} {import_ms:>10.1f} {process_ms:>11.1f}")
+        for cumulative_us, module in slowest_imports(timings[-1][2], args.top):
+            print(f"{'':<18}   {cumulative_us / 1000:>8.1f} ms  {module}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,9 +3,13 @@ import logging
 from pathlib import Path
 import pandas as pd
 from datetime import datetime
+from log_utils.metrics import histogram, counter
 
 logger = logging.getLogger(__name__)
 
+CLEAN_STEP_SECONDS = histogram('clean_step_seconds', 'Time spent in each clean_data step', ['step'])
+CLEANED_ROWS = counter('cleaned_rows', 'Rows returned by clean_data')
+
 class DataCleaner:
     def __init__(self, raw_data_path):
         self.raw_data_path = Path(raw_data_path)
@@ -74,29 +78,38 @@ class DataCleaner:
         """Clean the DataFrame"""
         try:
             # Create a copy to avoid modifying the original
-            cleaned = df.copy()
+            with CLEAN_STEP_SECONDS.time(step='copy'):
+                cleaned = df.copy()
             
             # Convert date strings to datetime
-            cleaned['date'] = pd.to_datetime(cleaned['date'])
+            with CLEAN_STEP_SECONDS.time(step='parse_dates'):
+                cleaned['date'] = pd.to_datetime(cleaned['date'])
             
             # Sort by date
-            cleaned = cleaned.sort_values('date')
+            with CLEAN_STEP_SECONDS.time(step='sort'):
+                cleaned = cleaned.sort_values('date')
             
             # Fill missing values
-            cleaned['text'] = cleaned['text'].fillna('')
-            cleaned['has_media'] = cleaned['has_media'].fillna(False)
-            cleaned['media_path'] = cleaned['media_path'].fillna('')
+            with CLEAN_STEP_SECONDS.time(step='fill_missing'):
+                cleaned['text'] = cleaned['text'].fillna('')
+                cleaned['has_media'] = cleaned['has_media'].fillna(False)
+                cleaned['media_path'] = cleaned['media_path'].fillna('')
             
             # Remove any duplicate messages
-            cleaned = cleaned.drop_duplicates(subset=['message_id'])
+            with CLEAN_STEP_SECONDS.time(step='drop_duplicates'):
+                cleaned = cleaned.drop_duplicates(subset=['channel', 'message_id'])
             
             # Add derived columns
-            cleaned['word_count'] = cleaned['text'].str.split().str.len()
-            cleaned['contains_url'] = cleaned['text'].str.contains('http|www', case=False, na=False)
-            cleaned['language'] = cleaned['text'].apply(
-                lambda x: 'amharic' if any('\u1200' <= c <= '\u137F' for c in str(x)) else 'english'
-            )
-            
+            with CLEAN_STEP_SECONDS.time(step='word_count'):
+                cleaned['word_count'] = cleaned['text'].str.split().str.len()
+            with CLEAN_STEP_SECONDS.time(step='contains_url'):
+                cleaned['contains_url'] = cleaned['text'].str.contains('http|www', case=False, na=False)
+            with CLEAN_STEP_SECONDS.time(step='language'):
+                cleaned['language'] = cleaned['text'].apply(
+                    lambda x: 'amharic' if any('\u1200' <= c <= '\u137F' for c in str(x)) else 'english'
+                )
+            
+            CLEANED_ROWS.inc(len(cleaned))
             logger.info(f"Successfully cleaned data, resulting in {len(cleaned)} rows")
             return cleaned
             
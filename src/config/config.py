@@ -21,6 +21,7 @@ RAW_DIR = DATA_DIR / "raw" / "messages"
 PROCESSED_DIR = DATA_DIR / "processed"
 DBT_PROJECT_DIR = PROJECT_ROOT / "dbt" / "ethiopian_medical_data"
 
-# Create directories if they don't exist
-RAW_DIR.mkdir(parents=True, exist_ok=True)
-PROCESSED_DIR.mkdir(parents=True, exist_ok=True)
\ No newline at end of file
+def ensure_directories():
+    """Create the data directories if they don't exist"""
+    RAW_DIR.mkdir(parents=True, exist_ok=True)
+    PROCESSED_DIR.mkdir(parents=True, exist_ok=True)
@@ -1,12 +1,16 @@
 import os
 from dotenv import load_dotenv
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine, text, inspect
 import pandas as pd
 import logging
 from urllib.parse import quote_plus
+from log_utils.metrics import histogram, counter
 
 logger = logging.getLogger(__name__)
 
+DB_WRITE_SECONDS = histogram('db_write_seconds', 'Time spent writing a DataFrame to the database', ['table', 'operation'])
+DB_ROWS_WRITTEN = counter('db_rows_written', 'Rows written to the database', ['table', 'operation'])
+
 class DatabaseManager:
     def __init__(self):
         # Load environment variables
@@ -77,12 +81,14 @@ class DatabaseManager:
             logger.info(f"Saving DataFrame to table '{table_name}'")
             logger.info(f"DataFrame shape: {df.shape}")
             
-            df.to_sql(
-                table_name,
-                self.engine,
-                if_exists=if_exists,
-                index=False
-            )
+            with DB_WRITE_SECONDS.time(table=table_name, operation='save'):
+                df.to_sql(
+                    table_name,
+                    self.engine,
+                    if_exists=if_exists,
+                    index=False
+                )
+            DB_ROWS_WRITTEN.inc(len(df), table=table_name, operation='save')
             
             # Verify the save
             with self.engine.connect() as conn:
@@ -92,4 +98,137 @@ class DatabaseManager:
             
         except Exception as e:
             logger.error(f"Error saving to database: {str(e)}")
+            raise
+    
+    def replace_rows(self, tables, key_column, keys):
+        """Replace rows matching keys in several tables within a single transaction"""
+        try:
+            if not self.engine:
+                self.connect()
+            
+            keys = list(keys)
+            with self.engine.begin() as conn:
+                inspector = inspect(conn)
+                for table_name, df in tables.items():
+                    with DB_WRITE_SECONDS.time(table=table_name, operation='replace'):
+                        # Delete any rows written by an earlier attempt so re-runs stay idempotent
+                        if keys and inspector.has_table(table_name):
+                            conn.execute(
+                                text(f"DELETE FROM {table_name} WHERE {key_column} = ANY(:keys)"),
+                                {"keys": keys}
+                            )
+                        if not df.empty:
+                            df.to_sql(table_name, conn, if_exists='append', index=False)
+                    DB_ROWS_WRITTEN.inc(len(df), table=table_name, operation='replace')
+            
+            logger.info(f"Replaced rows for {len(keys)} keys in tables {list(tables)}")
+            
+        except Exception as e:
+            logger.error(f"Error replacing rows in database: {str(e)}")
+            raise
+    
+    def read_sql(self, query, params=None):
+        """Run a query and return the result as a DataFrame"""
+        try:
+            if not self.engine:
+                self.connect()
+            
+            with self.engine.connect() as conn:
+                return pd.read_sql(text(query), conn, params=params)
+            
+        except Exception as e:
+            logger.error(f"Error reading from database: {str(e)}")
+            raise
+    
+    def table_exists(self, table_name):
+        """Check whether a table exists in the database"""
+        if not self.engine:
+            self.connect()
+        return inspect(self.engine).has_table(table_name)
+    
+    def create_index(self, table_name, columns, index_name=None, using=None):
+        """Create an index on a table if it does not exist yet; columns may be SQL expressions"""
+        try:
+            if not self.engine:
+                self.connect()
+            
+            index_name = index_name or f"ix_{table_name}_{'_'.join(columns)}"
+            using_clause = f" USING {using}" if using else ""
+            with self.engine.begin() as conn:
+                conn.execute(text(
+                    f"CREATE INDEX IF NOT EXISTS {index_name} ON {table_name}{using_clause} ({', '.join(columns)})"
+                ))
+            logger.info(f"Ensured index '{index_name}' on table '{table_name}'")
+            
+        except Exception as e:
+            logger.error(f"Error creating index: {str(e)}")
+            raise
+    
+    def execute(self, sql, params=None):
+        """Execute a statement in its own transaction"""
+        try:
+            if not self.engine:
+                self.connect()
+            
+            with self.engine.begin() as conn:
+                conn.execute(text(sql), params or {})
+            
+        except Exception as e:
+            logger.error(f"Error executing statement: {str(e)}")
+            raise
+    
+    def upsert_dataframe(self, df, table_name, key_columns):
+        """
+        Insert rows, replacing existing rows with the same key, without touching the
+        rest of the table. Unlike save_dataframe(if_exists='replace') the table and its
+        indexes are kept, so Postgres only maintains the index entries for these rows.
+        """
+        try:
+            if not self.engine:
+                self.connect()
+            
+            logger.info(f"Upserting {len(df)} rows into table '{table_name}'")
+            
+            with DB_WRITE_SECONDS.time(table=table_name, operation='upsert'), self.engine.begin() as conn:
+                if not inspect(conn).has_table(table_name):
+                    df.to_sql(table_name, conn, index=False)
+                else:
+                    staging_table = f"_staging_{table_name}"
+                    columns = ', '.join(df.columns)
+                    key_match = ' AND '.join(f"t.{c} = s.{c}" for c in key_columns)
+                    df.to_sql(staging_table, conn, if_exists='replace', index=False)
+                    conn.execute(text(f"DELETE FROM {table_name} t USING {staging_table} s WHERE {key_match}"))
+                    conn.execute(text(
+                        f"INSERT INTO {table_name} ({columns}) SELECT {columns} FROM {staging_table}"
+                    ))
+                    conn.execute(text(f"DROP TABLE {staging_table}"))
+            DB_ROWS_WRITTEN.inc(len(df), table=table_name, operation='upsert')
+            
+            logger.info(f"Successfully upserted {len(df)} rows into table '{table_name}'")
+            
+        except Exception as e:
+            logger.error(f"Error upserting into database: {str(e)}")
+            raise
+    
+    def bump_data_version(self, name):
+        """Increment the change counter for a data set so API caches pick up new rows"""
+        try:
+            if not self.engine:
+                self.connect()
+            
+            with self.engine.begin() as conn:
+                conn.execute(text(
+                    "CREATE TABLE IF NOT EXISTS data_versions ("
+                    "name VARCHAR PRIMARY KEY, version BIGINT NOT NULL, updated_at TIMESTAMP NOT NULL)"
+                ))
+                conn.execute(text(
+                    "INSERT INTO data_versions (name, version, updated_at) "
+                    "VALUES (:name, 1, now() AT TIME ZONE 'UTC') "
+                    "ON CONFLICT (name) DO UPDATE SET "
+                    "version = data_versions.version + 1, updated_at = now() AT TIME ZONE 'UTC'"
+                ), {"name": name})
+            logger.info(f"Bumped data version for '{name}'")
+            
+        except Exception as e:
+            logger.error(f"Error bumping data version: {str(e)}")
             raise
\ No newline at end of file
@@ -0,0 +1,182 @@
+import logging
+import pandas as pd
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+# cleaned_messages is owned by the loader: api.models.Message mirrors this definition,
+# and the loader upserts on the primary key
+MESSAGE_KEY = ["channel", "message_id"]
+
+CREATE_MESSAGES_TABLE = """
+CREATE TABLE IF NOT EXISTS {table_name} (
+    message_id VARCHAR NOT NULL,
+    channel VARCHAR NOT NULL,
+    date TIMESTAMP, -- UTC, see utc_naive
+    text VARCHAR,
+    has_media BOOLEAN,
+    media_path VARCHAR,
+    word_count INTEGER,
+    contains_url BOOLEAN,
+    language VARCHAR,
+    PRIMARY KEY (channel, message_id)
+)
+"""
+
+def utc_naive(dates):
+    """
+    Convert message dates to naive UTC for the date TIMESTAMP column. Timezone-aware
+    values would be shifted to the server's TimeZone setting when copied into it.
+    """
+    dates = pd.to_datetime(dates)
+    if dates.dt.tz is not None:
+        dates = dates.dt.tz_convert('UTC').dt.tz_localize(None)
+    return dates
+
+PRIMARY_KEY_COLUMNS = """
+SELECT tc.constraint_name, kcu.column_name
+FROM information_schema.table_constraints tc
+JOIN information_schema.key_column_usage kcu
+    ON kcu.constraint_name = tc.constraint_name AND kcu.table_name = tc.table_name
+WHERE tc.table_name = :table_name AND tc.constraint_type = 'PRIMARY KEY'
+"""
+
+COLUMN_TYPE = """
+SELECT data_type FROM information_schema.columns
+WHERE table_name = :table_name AND column_name = :column_name
+"""
+
+def ensure_messages_table(db_manager, table_name='cleaned_messages'):
+    """
+    Create cleaned_messages, or migrate a table created by an older loader or API
+    version to a VARCHAR message_id and a (channel, message_id) primary key.
+
+    Earlier loaders replaced the table through pandas (BIGINT message_id, no key) and
+    earlier API versions created it with a primary key on message_id alone.
+    """
+    if not db_manager.engine:
+        db_manager.connect()
+
+    params = {'table_name': table_name}
+    with db_manager.engine.begin() as conn:
+        conn.execute(text(CREATE_MESSAGES_TABLE.format(table_name=table_name)))
+
+        data_type = conn.execute(text(COLUMN_TYPE), dict(params, column_name='message_id')).scalar()
+        if data_type not in ('character varying', 'text'):
+            logger.info(f"Migrating '{table_name}.message_id' from {data_type} to VARCHAR")
+            conn.execute(text(
+                f"ALTER TABLE {table_name} ALTER COLUMN message_id TYPE VARCHAR USING message_id::text"
+            ))
+
+        primary_key = conn.execute(text(PRIMARY_KEY_COLUMNS), params).all()
+        if sorted(column for _, column in primary_key) != sorted(MESSAGE_KEY):
+            logger.info(f"Migrating primary key of '{table_name}' to ({', '.join(MESSAGE_KEY)})")
+            if primary_key:
+                conn.execute(text(f"ALTER TABLE {table_name} DROP CONSTRAINT {primary_key[0][0]}"))
+            # Rows that can't be keyed are unreachable through the API; keep the last
+            # copy of repeated keys, as the upsert would have
+            conn.execute(text(f"DELETE FROM {table_name} WHERE channel IS NULL OR message_id IS NULL"))
+            conn.execute(text(
+                f"DELETE FROM {table_name} a USING {table_name} b "
+                f"WHERE a.channel = b.channel AND a.message_id = b.message_id AND a.ctid < b.ctid"
+            ))
+            conn.execute(text(f"ALTER TABLE {table_name} ADD PRIMARY KEY ({', '.join(MESSAGE_KEY)})"))
+
+# Indexes the API relies on for cleaned_messages, as (name, method, expressions).
+# They must match the Index definitions on api.models.Message.
+MESSAGE_INDEXES = [
+    # Keyset pagination in /messages/
+    ("ix_cleaned_messages_date_channel_message_id", None, ["date", "channel", "message_id"]),
+    # English full-text search in /messages/search
+    ("ix_cleaned_messages_text_fts", "gin", ["to_tsvector('english', coalesce(text, ''))"]),
+    # Substring and similarity search for Amharic text, which has no stemming dictionary
+    ("ix_cleaned_messages_text_trgm", "gin", ["text gin_trgm_ops"]),
+]
+
+def ensure_message_indexes(db_manager, table_name='cleaned_messages'):
+    """Create the extensions and indexes used by the messages API if they are missing"""
+    db_manager.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for index_name, using, columns in MESSAGE_INDEXES:
+        db_manager.create_index(table_name, columns, index_name=index_name, using=using)
+
+# message_detections, matching api.models.MessageDetection. The detection sink creates
+# it before its first append; pandas would create it without the id column and keys
+CREATE_LINK_TABLE = """
+CREATE TABLE IF NOT EXISTS {table_name} (
+    id SERIAL PRIMARY KEY,
+    channel VARCHAR NOT NULL,
+    message_id VARCHAR NOT NULL,
+    image_path VARCHAR NOT NULL,
+    class_id INTEGER,
+    class_name VARCHAR,
+    confidence FLOAT,
+    bbox_x1 FLOAT,
+    bbox_y1 FLOAT,
+    bbox_x2 FLOAT,
+    bbox_y2 FLOAT,
+    processed_date TIMESTAMP
+)
+"""
+
+# Indexes on message_detections, matching api.models.MessageDetection
+LINK_INDEXES = [
+    # Embedding detections into a page of messages
+    ("ix_message_detections_channel_message_id", None, ["channel", "message_id"]),
+    # Filtering messages by detected class and confidence
+    ("ix_message_detections_class_confidence", None, ["class_name", "confidence", "channel", "message_id"]),
+    # Replacing the rows of re-processed images
+    ("ix_message_detections_image_path", None, ["image_path"]),
+]
+
+def ensure_link_indexes(db_manager, table_name='message_detections'):
+    """Create the indexes used to join messages and detections if they are missing"""
+    for index_name, using, columns in LINK_INDEXES:
+        db_manager.create_index(table_name, columns, index_name=index_name, using=using)
+
+def ensure_link_table(db_manager, table_name='message_detections'):
+    """Create message_detections and its indexes if they are missing"""
+    db_manager.execute(CREATE_LINK_TABLE.format(table_name=table_name))
+    # Tables appended to by pandas before this existed have no id column
+    db_manager.execute(f"ALTER TABLE {table_name} ADD COLUMN IF NOT EXISTS id SERIAL PRIMARY KEY")
+    ensure_link_indexes(db_manager, table_name)
+
+# Tables written by the detection sink, matching api.models.ObjectDetection. Like the
+# link table they are created before the first append, so the API finds the id column
+CREATE_DETECTIONS_TABLE = """
+CREATE TABLE IF NOT EXISTS {table_name} (
+    id SERIAL PRIMARY KEY,
+    image_path VARCHAR,
+    class_id INTEGER,
+    class_name VARCHAR,
+    confidence FLOAT,
+    bbox_x1 FLOAT,
+    bbox_y1 FLOAT,
+    bbox_x2 FLOAT,
+    bbox_y2 FLOAT,
+    processed_date TIMESTAMP
+)
+"""
+
+CREATE_PROCESSED_TABLE = """
+CREATE TABLE IF NOT EXISTS {table_name} (
+    image_path VARCHAR NOT NULL,
+    detection_count INTEGER,
+    processed_date TIMESTAMP
+)
+"""
+
+def ensure_detection_tables(db_manager, table_name='object_detections', processed_table='processed_images'):
+    """Create the detection and processed-image tables and their image_path indexes if they are missing"""
+    db_manager.execute(CREATE_DETECTIONS_TABLE.format(table_name=table_name))
+    # Tables created by pandas in earlier runs have no id column
+    db_manager.execute(f"ALTER TABLE {table_name} ADD COLUMN IF NOT EXISTS id SERIAL PRIMARY KEY")
+    db_manager.execute(CREATE_PROCESSED_TABLE.format(table_name=processed_table))
+    for name in (table_name, processed_table):
+        ensure_image_path_index(db_manager, name)
+
+def ensure_image_path_index(db_manager, table_name):
+    """
+    Index image_path on a detection sink table. The sink deletes and looks up rows
+    by image_path for every batch, which is a sequential scan without it.
+    """
+    db_manager.create_index(table_name, ["image_path"], index_name=f"ix_{table_name}_image_path")
@@ -0,0 +1,93 @@
+import logging
+from datetime import timedelta
+import pandas as pd
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+STATS_TABLE = 'message_stats_daily'
+
+CREATE_STATS_TABLE = f"""
+CREATE TABLE IF NOT EXISTS {STATS_TABLE} (
+    channel VARCHAR NOT NULL,
+    day DATE NOT NULL,
+    language VARCHAR NOT NULL,
+    message_count INTEGER NOT NULL,
+    media_count INTEGER NOT NULL,
+    word_count_sum BIGINT NOT NULL,
+    word_count_n INTEGER NOT NULL,
+    updated_at TIMESTAMP NOT NULL,
+    PRIMARY KEY (channel, day, language)
+)
+"""
+
+# Channels and day window touched by a load; the window is padded by a day on each
+# side so that timezone differences between pandas and the database can't split a day
+AFFECTED_STATS = "channel = ANY(:channels) AND day >= :start AND day < :end"
+AFFECTED_SOURCE = "channel = ANY(:channels) AND date >= :start AND date < :end"
+
+AGGREGATE_SELECT = """
+SELECT
+    channel,
+    CAST(date AS DATE) AS day,
+    COALESCE(language, 'unknown') AS language,
+    COUNT(*) AS message_count,
+    SUM(CASE WHEN has_media THEN 1 ELSE 0 END) AS media_count,
+    COALESCE(SUM(word_count), 0) AS word_count_sum,
+    COUNT(word_count) AS word_count_n,
+    now() AS updated_at
+FROM {source_table}
+WHERE channel IS NOT NULL AND date IS NOT NULL
+"""
+
+def refresh_message_stats(db_manager, new_rows=None, replaced=False, source_table='cleaned_messages'):
+    """
+    Refresh the per-channel, per-day message aggregates served by the /stats/ endpoints.
+
+    With new_rows (the DataFrame that was just loaded) only the channels and days
+    it touches are recomputed, so the cost scales with the batch rather than the table.
+    Set replaced=True when the load replaced the source table, so groups that are no
+    longer present are dropped as well. Without new_rows everything is rebuilt.
+    """
+    try:
+        if not db_manager.engine:
+            db_manager.connect()
+
+        insert = f"INSERT INTO {STATS_TABLE} " + AGGREGATE_SELECT.format(source_table=source_table)
+        group_by = " GROUP BY channel, CAST(date AS DATE), COALESCE(language, 'unknown')"
+
+        with db_manager.engine.begin() as conn:
+            conn.execute(text(CREATE_STATS_TABLE))
+
+            if new_rows is None:
+                conn.execute(text(f"DELETE FROM {STATS_TABLE}"))
+                conn.execute(text(insert + group_by))
+                logger.info(f"Rebuilt table '{STATS_TABLE}'")
+                return
+
+            # Rows without a channel or date have no group in the stats table
+            new_rows = new_rows[new_rows['channel'].notna() & pd.to_datetime(new_rows['date']).notna()]
+            if new_rows.empty:
+                if replaced:
+                    conn.execute(text(f"DELETE FROM {STATS_TABLE}"))
+                logger.info(f"No dated messages loaded, table '{STATS_TABLE}' not refreshed")
+                return
+
+            days = pd.to_datetime(new_rows['date']).dt.date
+            channels = sorted(new_rows['channel'].astype(str).unique())
+            params = {
+                'channels': channels,
+                'start': days.min() - timedelta(days=1),
+                'end': days.max() + timedelta(days=2),
+            }
+
+            if replaced:
+                conn.execute(text(f"DELETE FROM {STATS_TABLE} WHERE NOT ({AFFECTED_STATS})"), params)
+            conn.execute(text(f"DELETE FROM {STATS_TABLE} WHERE {AFFECTED_STATS}"), params)
+            conn.execute(text(insert + f" AND {AFFECTED_SOURCE}" + group_by), params)
+
+        logger.info(f"Refreshed {len(channels)} channels from {params['start']} to {params['end']} in table '{STATS_TABLE}'")
+
+    except Exception as e:
+        logger.error(f"Error refreshing message statistics: {str(e)}")
+        raise
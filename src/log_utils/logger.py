@@ -1,25 +1,54 @@
+import atexit
+import queue
 import logging
+import logging.handlers
 from pathlib import Path
 from datetime import datetime
 
-def setup_logger():
-    """Set up logging configuration"""
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+_listener = None
+
+def setup_logger(name='pipeline', level=logging.INFO):
+    """
+    Set up logging configuration.
+
+    Records are put on an in-memory queue and written to the log file and the
+    console by a background QueueListener, so logging calls never wait on disk
+    or terminal I/O. Calling it again in the same process reuses the first setup.
+    """
+    global _listener
+    if _listener is not None:
+        return logging.getLogger(__name__)
+
     # Create logs directory
     log_dir = Path(__file__).parent.parent.parent / "logs"
     log_dir.mkdir(exist_ok=True)
-    
+
     # Create log file with timestamp
     timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    log_file = log_dir / f"pipeline_{timestamp}.log"
-    
+    log_file = log_dir / f"{name}_{timestamp}.log"
+
+    formatter = logging.Formatter(LOG_FORMAT)
+    handlers = [logging.FileHandler(log_file), logging.StreamHandler()]
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    # The queue handler only merges args and tracebacks into the message; the
+    # listener's handlers apply LOG_FORMAT
+    queue_handler.setFormatter(logging.Formatter('%(message)s'))
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    # Drain queued records before the interpreter exits
+    atexit.register(_listener.stop)
+
     # Configure logging
     logging.basicConfig(
-        level=logging.INFO,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.FileHandler(log_file),
-            logging.StreamHandler()
-        ]
+        level=level,
+        handlers=[queue_handler],
+        force=True
     )
-    
-    return logging.getLogger(__name__)
\ No newline at end of file
+
+    return logging.getLogger(__name__)
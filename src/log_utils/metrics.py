@@ -0,0 +1,242 @@
+import json
+import time
+import bisect
+import threading
+from pathlib import Path
+from datetime import datetime
+
+# Upper bounds in seconds, from a fast database round trip to a slow stage
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+OPENMETRICS_CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+
+def _label_key(labelnames, labels):
+    return tuple(str(labels.get(name, '')) for name in labelnames)
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def _format_labels(labelnames, key, extra=()):
+    pairs = list(zip(labelnames, key)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Counter:
+    """Monotonic counter, optionally split by labels"""
+    type_name = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        for key, value in sorted(values.items()):
+            yield f"{self.name}_total{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+    def snapshot(self):
+        with self._lock:
+            values = dict(self._values)
+        return [dict(zip(self.labelnames, key), value=value) for key, value in sorted(values.items())]
+
+class Histogram:
+    """
+    Distribution of observed values in fixed buckets, optionally split by labels.
+
+    An observation is a bisect and a few additions under a lock, so it is cheap
+    enough to wrap per-image and per-request work.
+    """
+    type_name = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = _label_key(self.labelnames, labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # [bucket counts (last is +Inf), count, sum, min, max]
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0, 0.0, value, value]
+            series[0][index] += 1
+            series[1] += 1
+            series[2] += value
+            if value < series[3]:
+                series[3] = value
+            if value > series[4]:
+                series[4] = value
+
+    def time(self, **labels):
+        return Timer(self, labels)
+
+    def _copy(self):
+        with self._lock:
+            return {key: (list(s[0]), s[1], s[2], s[3], s[4]) for key, s in self._series.items()}
+
+    def samples(self):
+        for key, (counts, count, total, _, _) in sorted(self._copy().items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames, key, [('le', _format_value(float(bound)))])
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, key)} {count}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}"
+
+    def _quantile(self, counts, count, q):
+        # Upper bound of the bucket holding the q-th observation
+        rank = q * count
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+            cumulative += bucket_count
+            if cumulative >= rank:
+                return bound
+        return float('inf')
+
+    def snapshot(self):
+        result = []
+        for key, (counts, count, total, minimum, maximum) in sorted(self._copy().items()):
+            p50 = self._quantile(counts, count, 0.5)
+            p95 = self._quantile(counts, count, 0.95)
+            result.append(dict(
+                zip(self.labelnames, key),
+                count=count,
+                sum=round(total, 6),
+                mean=round(total / count, 6) if count else None,
+                min=round(minimum, 6),
+                max=round(maximum, 6),
+                # Bucket upper bounds, capped at the largest value actually observed
+                p50=round(min(p50, maximum), 6),
+                p95=round(min(p95, maximum), 6),
+            ))
+        return result
+
+class Timer:
+    """Context manager and decorator recording elapsed seconds into a histogram"""
+    __slots__ = ('histogram', 'labels', 'start')
+
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+        self.start = None
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.histogram.observe(time.perf_counter() - self.start, **self.labels)
+        return False
+
+    def __call__(self, func):
+        histogram, labels = self.histogram, self.labels
+
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - start, **labels)
+
+        wrapper.__name__ = func.__name__
+        wrapper.__doc__ = func.__doc__
+        return wrapper
+
+class Registry:
+    """Process-wide collection of metrics, rendered as OpenMetrics or a JSON report"""
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+        self.started_at = datetime.now()
+
+    def _get_or_create(self, cls, name, documentation, labelnames, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, documentation, labelnames, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metric {name} is already registered as a {metric.type_name}")
+            return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def render(self):
+        """Return all metrics in the OpenMetrics text format"""
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda m: m.name)
+        lines = []
+        for metric in metrics:
+            lines.append(f"# TYPE {metric.name} {metric.type_name}")
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.extend(metric.samples())
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self):
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda m: m.name)
+        snapshot = {}
+        for metric in metrics:
+            series = metric.snapshot()
+            if series:
+                snapshot[metric.name] = {'type': metric.type_name, 'series': series}
+        return snapshot
+
+    def write_report(self, name, report_dir=None, extra=None):
+        """
+        Write the metrics collected so far as a JSON profile report and return its path.
+
+        Reports go to logs/profiles/<name>_<timestamp>.json unless report_dir is given.
+        """
+        report_dir = Path(report_dir) if report_dir else Path(__file__).parent.parent.parent / "logs" / "profiles"
+        report_dir.mkdir(parents=True, exist_ok=True)
+        finished_at = datetime.now()
+        report = {
+            'name': name,
+            'started_at': self.started_at.isoformat(),
+            'finished_at': finished_at.isoformat(),
+            'wall_time': round((finished_at - self.started_at).total_seconds(), 3),
+            'metrics': self.snapshot(),
+        }
+        if extra:
+            report.update(extra)
+        path = report_dir / f"{name}_{finished_at.strftime('%Y%m%d_%H%M%S')}.json"
+        with open(path, 'w') as f:
+            json.dump(report, f, indent=2, default=str)
+        return path
+
+REGISTRY = Registry()
+
+def counter(name, documentation, labelnames=()):
+    return REGISTRY.counter(name, documentation, labelnames)
+
+def histogram(name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+    return REGISTRY.histogram(name, documentation, labelnames, buckets)
+
+def write_report(name, report_dir=None, extra=None):
+    return REGISTRY.write_report(name, report_dir, extra)
@@ -0,0 +1,99 @@
+import os
+import sys
+import time
+import logging
+import threading
+from pathlib import Path
+from datetime import datetime
+from contextlib import contextmanager, nullcontext
+
+logger = logging.getLogger(__name__)
+
+# Comma separated stage names to profile, e.g. PROFILE_STAGES=clean_load,detect
+PROFILE_STAGES_ENV = 'PROFILE_STAGES'
+
+class SamplingProfiler:
+    """
+    Statistical profiler for one thread.
+
+    A daemon thread reads the target thread's current frame every `interval`
+    seconds and counts the call stacks it sees. Nothing is hooked into the
+    profiled code, so the overhead is the sampling thread alone. Stacks are written
+    in the folded format read by flamegraph.pl and speedscope.
+    """
+    def __init__(self, thread_id=None, interval=0.005, max_depth=64):
+        self.thread_id = thread_id if thread_id is not None else threading.get_ident()
+        self.interval = interval
+        self.max_depth = max_depth
+        self.stacks = {}
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None and len(stack) < self.max_depth:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})")
+                frame = frame.f_back
+            key = ";".join(reversed(stack))
+            self.stacks[key] = self.stacks.get(key, 0) + 1
+            self.samples += 1
+
+    def write(self, path):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w') as f:
+            for stack, count in sorted(self.stacks.items(), key=lambda item: item[1], reverse=True):
+                f.write(f"{stack} {count}\n")
+        return path
+
+    def top(self, limit=10):
+        """Return the functions most often on top of the stack as (function, share) pairs"""
+        leaves = {}
+        for stack, count in self.stacks.items():
+            leaf = stack.rsplit(";", 1)[-1]
+            leaves[leaf] = leaves.get(leaf, 0) + count
+        ranked = sorted(leaves.items(), key=lambda item: item[1], reverse=True)[:limit]
+        return [(name, count / self.samples) for name, count in ranked] if self.samples else []
+
+def profiled_stages():
+    return {name.strip() for name in os.getenv(PROFILE_STAGES_ENV, '').split(',') if name.strip()}
+
+@contextmanager
+def sampling_profile(name, output_dir=None, interval=0.005):
+    """Profile the calling thread for the duration of the block and write <name>_<timestamp>.folded"""
+    output_dir = Path(output_dir) if output_dir else Path(__file__).parent.parent.parent / "logs" / "profiles"
+    profiler = SamplingProfiler(interval=interval).start()
+    start = time.perf_counter()
+    try:
+        yield profiler
+    finally:
+        profiler.stop()
+        elapsed = time.perf_counter() - start
+        path = profiler.write(output_dir / f"{name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.folded")
+        logger.info(f"Profiled {name}: {profiler.samples} samples over {elapsed:.2f}s written to {path}")
+        for function, share in profiler.top(5):
+            logger.info(f"  {share:6.1%} {function}")
+
+def maybe_profile(name, enabled=None):
+    """Return a sampling_profile block when the stage is opted in, otherwise a no-op block"""
+    if enabled is None:
+        enabled = profiled_stages()
+    if name in enabled:
+        return sampling_profile(name)
+    return nullcontext()
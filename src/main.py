@@ -2,7 +2,10 @@ import os
 from pathlib import Path
 from cleaning.cleaner import DataCleaner
 from database.db_manager import DatabaseManager
+from database.stats import refresh_message_stats
+from database.schema import ensure_messages_table, ensure_message_indexes, utc_naive, MESSAGE_KEY
 from log_utils.logger import setup_logger
+from log_utils.metrics import write_report
 
 def main():
     # Set up logging
@@ -31,16 +34,32 @@ def main():
         logger.info("Step 2: Loading to Database")
         db_manager.connect()
         try:
-            db_manager.save_dataframe(cleaned_df, 'cleaned_messages', if_exists='replace')
+            # Message ids are strings in the API schema and in message_detections
+            cleaned_df['message_id'] = cleaned_df['message_id'].astype(str)
+            # Stored as UTC whatever the server's TimeZone, so stats days don't shift
+            cleaned_df['date'] = utc_naive(cleaned_df['date'])
+            
+            # Upsert rather than replace, so existing rows and their search and
+            # pagination index entries are kept and only new rows are indexed.
+            # The table is created or migrated first so its key matches the upsert key
+            ensure_messages_table(db_manager)
+            db_manager.upsert_dataframe(cleaned_df, 'cleaned_messages', MESSAGE_KEY)
+            ensure_message_indexes(db_manager)
+            refresh_message_stats(db_manager, cleaned_df)
+            db_manager.bump_data_version('messages')
             logger.info("Data loaded to database successfully")
         finally:
             db_manager.disconnect()
         
         logger.info("=== Pipeline Completed Successfully ===")
+        return len(cleaned_df)
         
     except Exception as e:
         logger.error(f"Pipeline failed: {str(e)}")
         raise
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    try:
+        main()
+    finally:
+        write_report('clean_load')
\ No newline at end of file
@@ -0,0 +1,197 @@
+import json
+import logging
+import threading
+from pathlib import Path
+from datetime import datetime
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Hamming distance between 64-bit hashes up to which images count as duplicates
+DEFAULT_MAX_DISTANCE = 6
+
+def phash(img):
+    """Compute a 64-bit DCT perceptual hash of a BGR or grayscale image"""
+    import cv2
+    
+    if img.ndim == 3:
+        img = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    small = cv2.resize(img, (32, 32), interpolation=cv2.INTER_AREA).astype(np.float32)
+    low_freq = cv2.dct(small)[:8, :8].flatten()
+    # Compare against the median of the AC terms so the DC term doesn't dominate
+    bits = low_freq > np.median(low_freq[1:])
+    return int(''.join('1' if b else '0' for b in bits), 2)
+
+def hamming(a, b):
+    """Number of differing bits between two hashes"""
+    return bin(a ^ b).count('1')
+
+class BKTree:
+    """
+    Burkhard-Keller tree for Hamming-radius lookups over integer hashes.
+
+    Each node holds the values stored under its key. Removing a value leaves the
+    node in place to keep routing lookups, so entries can change hash safely.
+    """
+    def __init__(self):
+        self.root = None
+        self.size = 0
+        self._nodes = {}
+
+    def add(self, key, value):
+        self.size += 1
+        node = self._nodes.get(key)
+        if node is not None:
+            node[1].append(value)
+            return
+        node = (key, [value], {})
+        self._nodes[key] = node
+        if self.root is None:
+            self.root = node
+            return
+        current = self.root
+        while True:
+            distance = hamming(key, current[0])
+            child = current[2].get(distance)
+            if child is None:
+                current[2][distance] = node
+                return
+            current = child
+
+    def remove(self, key, value):
+        """Remove a value stored under key; return whether it was found"""
+        node = self._nodes.get(key)
+        if node is None or value not in node[1]:
+            return False
+        node[1].remove(value)
+        self.size -= 1
+        return True
+
+    def search(self, key, radius):
+        """Return (distance, value) pairs within radius, closest first"""
+        results = []
+        stack = [self.root] if self.root is not None else []
+        while stack:
+            node_key, values, children = stack.pop()
+            distance = hamming(key, node_key)
+            if distance <= radius:
+                results.extend((distance, value) for value in values)
+            # Triangle inequality: only subtrees in [d - r, d + r] can contain matches
+            for child_distance, child in children.items():
+                if distance - radius <= child_distance <= distance + radius:
+                    stack.append(child)
+        results.sort(key=lambda r: r[0])
+        return results
+
+class ImageHashIndex:
+    """
+    Near-duplicate index over processed images.
+
+    Stores the perceptual hash, size and detections of every image that went through
+    inference, so that recompressed or resized reposts can reuse those detections.
+    Duplicates are grouped under the first image that was actually inferred.
+    save() may run on the detection sink's writer thread while the detector adds
+    entries, so changes and snapshots go through a lock.
+    """
+    def __init__(self, index_path=None, max_distance=DEFAULT_MAX_DISTANCE):
+        self.index_path = Path(index_path) if index_path else None
+        self.max_distance = max_distance
+        self._tree = BKTree()
+        self._entries = {}
+        self._duplicates = []
+        self._lock = threading.Lock()
+
+        if self.index_path and self.index_path.exists():
+            self.load()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def add(self, image_hash, image_path, shape, detections):
+        """Record an image that went through inference"""
+        image_path = str(image_path)
+        entry = {
+            'image_path': image_path,
+            'hash': image_hash,
+            'shape': [int(shape[0]), int(shape[1])],
+            'detections': [
+                {k: v for k, v in d.items() if k not in ('image_path', 'processed_date')}
+                for d in detections
+            ],
+        }
+        # The tree is keyed by path, so a re-processed image whose hash changed is
+        # moved to its new hash instead of also being found under the stale one
+        with self._lock:
+            previous = self._entries.get(image_path)
+            if previous is not None:
+                self._tree.remove(previous['hash'], image_path)
+            self._tree.add(image_hash, image_path)
+            self._entries[image_path] = entry
+
+    def find(self, image_hash, max_distance=None):
+        """Return (distance, entry) for the closest known image within range, or None"""
+        radius = self.max_distance if max_distance is None else max_distance
+        matches = self._tree.search(image_hash, radius)
+        if not matches:
+            return None
+        distance, image_path = matches[0]
+        return distance, self._entries[image_path]
+
+    def reuse_detections(self, entry, distance, image_path, shape):
+        """Scale a known image's detections to a duplicate image and record the pair"""
+        sy = shape[0] / entry['shape'][0]
+        sx = shape[1] / entry['shape'][1]
+        now = datetime.now()
+        detections = []
+        for d in entry['detections']:
+            detection = dict(d)
+            detection.update({
+                'image_path': str(image_path),
+                'bbox_x1': round(d['bbox_x1'] * sx),
+                'bbox_y1': round(d['bbox_y1'] * sy),
+                'bbox_x2': round(d['bbox_x2'] * sx),
+                'bbox_y2': round(d['bbox_y2'] * sy),
+                'processed_date': now,
+            })
+            detections.append(detection)
+
+        if entry['image_path'] != str(image_path):
+            with self._lock:
+                self._duplicates.append({
+                    'canonical_path': entry['image_path'],
+                    'image_path': str(image_path),
+                    'distance': distance,
+                })
+        return detections
+
+    def duplicate_groups(self):
+        """Return one row per duplicate image with the canonical image it matched"""
+        return pd.DataFrame(self._duplicates, columns=['canonical_path', 'image_path', 'distance'])
+
+    def load(self):
+        """Load a previously saved index"""
+        with open(self.index_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        for entry in data.get('entries', []):
+            entry['hash'] = int(entry['hash'], 16)
+            self._entries[entry['image_path']] = entry
+            self._tree.add(entry['hash'], entry['image_path'])
+        self._duplicates = data.get('duplicates', [])
+        logger.info(f"Loaded {len(self._entries)} image hashes from {self.index_path}")
+
+    def save(self):
+        """Write the index to index_path"""
+        if not self.index_path:
+            return
+        self.index_path.parent.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            data = {
+                'entries': [dict(e, hash=f"{e['hash']:016x}") for e in self._entries.values()],
+                'duplicates': list(self._duplicates),
+            }
+        tmp_path = self.index_path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        tmp_path.replace(self.index_path)
+        logger.info(f"Saved {len(data['entries'])} image hashes to {self.index_path}")
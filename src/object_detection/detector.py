@@ -1,15 +1,65 @@
-import torch
-import cv2
 import logging
 from pathlib import Path
 import pandas as pd
 from datetime import datetime
 import sys
+from .dedup import phash
+from log_utils.metrics import histogram, counter
 
 logger = logging.getLogger(__name__)
 
+DETECTOR_SECONDS = histogram('detector_seconds', 'Time per image in each detection phase', ['phase'])
+DETECTOR_IMAGES = counter('detector_images', 'Images handled by the detector', ['result'])
+
+# torch, cv2 and PIL are imported where they are used, so importing this module (for
+# example from object_detection.main --help or the pipeline) stays cheap
+
+# OpenCV flags for decoding a JPEG at 1/N scale in the DCT domain, largest first
+REDUCED_DECODE_FLAGS = [
+    (8, 'IMREAD_REDUCED_COLOR_8'),
+    (4, 'IMREAD_REDUCED_COLOR_4'),
+    (2, 'IMREAD_REDUCED_COLOR_2'),
+]
+
+# EXIF orientations that rotate the image by 90 degrees on decode
+TRANSPOSED_ORIENTATIONS = (5, 6, 7, 8)
+
+def decode_image(image_path, target_size=None):
+    """
+    Decode an image, optionally at reduced resolution.
+    
+    When target_size (height, width) is given and the file is a JPEG, the largest
+    reduced decode scale whose output still covers target_size is used, so the later
+    letterbox resize only ever shrinks the image. Returns the decoded BGR image and
+    the (height, width) of the image at full resolution.
+    """
+    import cv2
+    
+    image_path = Path(image_path)
+    if target_size is not None and image_path.suffix.lower() in ('.jpg', '.jpeg'):
+        from PIL import Image
+        
+        # Only the header is read here, the pixel data is not decoded
+        with Image.open(image_path) as im:
+            width, height = im.size
+            if im.getexif().get(0x0112) in TRANSPOSED_ORIENTATIONS:
+                width, height = height, width
+        
+        max_factor = max(height / target_size[0], width / target_size[1])
+        for factor, flag in REDUCED_DECODE_FLAGS:
+            if factor <= max_factor:
+                img = cv2.imread(str(image_path), getattr(cv2, flag))
+                if img is None:
+                    raise ValueError(f"Could not load image: {image_path}")
+                return img, (height, width)
+    
+    img = cv2.imread(str(image_path))
+    if img is None:
+        raise ValueError(f"Could not load image: {image_path}")
+    return img, img.shape[:2]
+
 class ObjectDetector:
-    def __init__(self, model_path=None):
+    def __init__(self, model_path=None, fast_decode=False, hash_index=None):
         self.project_root = Path(__file__).parent.parent.parent
         self.yolo_dir = self.project_root / "models" / "yolov5"
         
@@ -19,6 +69,7 @@ class ObjectDetector:
         
         try:
             # Import YOLOv5 modules
+            import torch
             from models.common import DetectMultiBackend
             from utils.general import check_img_size
             
@@ -44,6 +95,8 @@ class ObjectDetector:
             self.conf_thres = 0.25  # Confidence threshold
             self.iou_thres = 0.45   # NMS IOU threshold
             self.imgsz = check_img_size((640, 640), s=self.model.stride)  # Check image size
+            self.fast_decode = fast_decode  # Decode large JPEGs at reduced resolution
+            self.hash_index = hash_index  # Near-duplicate index, see object_detection.dedup
             
             # Move model to device
             self.model.to(self.device)
@@ -59,38 +112,51 @@ class ObjectDetector:
         """Process a single image and return detections"""
         try:
             # Import here to ensure YOLOv5 is in path
+            import torch
             from utils.general import non_max_suppression
             from utils.augmentations import letterbox
             
             # Load and preprocess image
-            img0 = cv2.imread(str(image_path))
-            if img0 is None:
-                raise ValueError(f"Could not load image: {image_path}")
+            with DETECTOR_SECONDS.time(phase='decode'):
+                img0, orig_shape = decode_image(image_path, self.imgsz if self.fast_decode else None)
             
-            # Padded resize
-            img = letterbox(img0, self.imgsz, stride=self.model.stride)[0]
+            # Reuse detections of a near-duplicate image instead of running inference
+            if self.hash_index is not None:
+                image_hash = phash(img0)
+                match = self.hash_index.find(image_hash)
+                if match is not None:
+                    distance, entry = match
+                    logger.debug(f"{Path(image_path).name} matches {Path(entry['image_path']).name} (distance {distance})")
+                    DETECTOR_IMAGES.inc(result='duplicate')
+                    return self.hash_index.reuse_detections(entry, distance, image_path, orig_shape)
             
-            # Convert
-            img = img.transpose((2, 0, 1))[::-1]  # HWC to CHW, BGR to RGB
-            img = torch.from_numpy(img).to(self.device)
-            img = img.float()
-            img /= 255.0  # 0 - 255 to 0.0 - 1.0
-            if len(img.shape) == 3:
-                img = img[None]  # expand for batch dim
+            with DETECTOR_SECONDS.time(phase='preprocess'):
+                # Padded resize
+                img = letterbox(img0, self.imgsz, stride=self.model.stride)[0]
+                
+                # Convert
+                img = img.transpose((2, 0, 1))[::-1]  # HWC to CHW, BGR to RGB
+                img = torch.from_numpy(img).to(self.device)
+                img = img.float()
+                img /= 255.0  # 0 - 255 to 0.0 - 1.0
+                if len(img.shape) == 3:
+                    img = img[None]  # expand for batch dim
             
             # Inference
-            pred = self.model(img)
-            if isinstance(pred, (list, tuple)):
-                pred = pred[0]  # get first element if list/tuple
+            with DETECTOR_SECONDS.time(phase='inference'):
+                pred = self.model(img)
+                if isinstance(pred, (list, tuple)):
+                    pred = pred[0]  # get first element if list/tuple
             
             # NMS
-            pred = non_max_suppression(pred, self.conf_thres, self.iou_thres)
+            with DETECTOR_SECONDS.time(phase='nms'):
+                pred = non_max_suppression(pred, self.conf_thres, self.iou_thres)
             
             # Process detections
             detections = []
             if len(pred[0]):
                 # Rescale boxes from img_size to im0 size
-                pred[0][:, :4] = self._scale_coords(img.shape[2:], pred[0][:, :4], img0.shape).round()
+                pred[0][:, :4] = self._scale_coords(img.shape[2:], pred[0][:, :4], img0.shape, orig_shape).round()
                 
                 # Convert detections to list of dictionaries
                 for *xyxy, conf, cls in pred[0]:
@@ -107,15 +173,21 @@ class ObjectDetector:
                     }
                     detections.append(detection)
             
+            if self.hash_index is not None:
+                self.hash_index.add(image_hash, image_path, orig_shape, detections)
+            
+            DETECTOR_IMAGES.inc(result='inferred')
             return detections
             
         except Exception as e:
+            DETECTOR_IMAGES.inc(result='failed')
             logger.error(f"Error processing image {image_path}: {str(e)}")
             raise
             
-    def _scale_coords(self, img1_shape, coords, img0_shape):
+    def _scale_coords(self, img1_shape, coords, img0_shape, orig_shape=None):
         """
-        Rescale coords (xyxy) from img1_shape to img0_shape
+        Rescale coords (xyxy) from img1_shape to img0_shape, and from there to
+        orig_shape when img0 was decoded at reduced resolution
         """
         gain = min(img1_shape[0] / img0_shape[0], img1_shape[1] / img0_shape[1])  # gain  = old / new
         pad = (img1_shape[1] - img0_shape[1] * gain) / 2, (img1_shape[0] - img0_shape[0] * gain) / 2  # wh padding
@@ -124,6 +196,12 @@ class ObjectDetector:
         coords[:, [1, 3]] -= pad[1]  # y padding
         coords[:, :4] /= gain
         self._clip_coords(coords, img0_shape)
+        
+        if orig_shape is not None and tuple(orig_shape[:2]) != tuple(img0_shape[:2]):
+            # Reduced decodes round dimensions up, so scale each axis separately
+            coords[:, [0, 2]] *= orig_shape[1] / img0_shape[1]  # x
+            coords[:, [1, 3]] *= orig_shape[0] / img0_shape[0]  # y
+            self._clip_coords(coords, orig_shape)
         return coords
         
     def _clip_coords(self, boxes, shape):
@@ -134,8 +212,15 @@ class ObjectDetector:
         boxes[:, [1, 3]] = boxes[:, [1, 3]].clamp(0, shape[0])  # clip y
         return boxes
         
-    def process_directory(self, image_dir):
-        """Process all images in a directory"""
+    def process_directory(self, image_dir, sink=None):
+        """
+        Process all images in a directory.
+        
+        Without a sink all detections are collected and returned as a DataFrame.
+        With a sink (see object_detection.sink) each image's detections are handed
+        to it as soon as they are available, images the sink has already persisted
+        are skipped, and nothing is accumulated in memory.
+        """
         try:
             image_dir = Path(image_dir)
             logger.info(f"Processing images in directory: {image_dir}")
@@ -144,23 +229,41 @@ class ObjectDetector:
             image_dir.mkdir(parents=True, exist_ok=True)
             
             all_detections = []
-            image_files = list(image_dir.glob("*.jpg")) + list(image_dir.glob("*.png"))
+            image_files = sorted(list(image_dir.glob("*.jpg")) + list(image_dir.glob("*.png")))
             
             logger.info(f"Found {len(image_files)} images to process")
             
+            if sink is not None:
+                # Already persisted images are looked up per batch while iterating
+                found = len(image_files)
+                image_files = sink.unprocessed(image_files)
+            
+            processed_count = 0
+            failed_count = 0
             for image_path in image_files:
-                logger.info(f"Processing image: {image_path.name}")
                 try:
                     detections = self.process_image(image_path)
-                    all_detections.extend(detections)
                 except Exception as e:
                     logger.error(f"Error processing {image_path.name}: {str(e)}")
+                    failed_count += 1
                     continue
+                processed_count += 1
+                
+                if sink is not None:
+                    sink.add(image_path, detections)
+                else:
+                    all_detections.extend(detections)
+            
+            if sink is not None:
+                sink.flush()
+                logger.info(f"Skipped {found - processed_count - failed_count} already processed images")
+                logger.info(f"Successfully processed {processed_count} images, {failed_count} failed")
+                return None
             
             # Convert to DataFrame
             if all_detections:
                 df = pd.DataFrame(all_detections)
-                logger.info(f"Successfully processed {len(image_files)} images with {len(df)} detections")
+                logger.info(f"Successfully processed {processed_count} images with {len(df)} detections")
                 return df
             else:
                 logger.warning("No detections found in any images")
@@ -1,5 +1,6 @@
 import os
 import sys
+import argparse
 from pathlib import Path
 
 # Add the src directory to Python path
@@ -8,45 +9,98 @@ sys.path.append(str(project_root / "src"))
 
 from object_detection.setup import YOLOSetup
 from object_detection.detector import ObjectDetector
+from object_detection.sink import DatabaseDetectionSink
+from object_detection.worker import DetectionWorker
+from object_detection.dedup import ImageHashIndex, DEFAULT_MAX_DISTANCE
 from database.db_manager import DatabaseManager
 from log_utils.logger import setup_logger
+from log_utils.metrics import write_report
 
-def main():
+def main(watch=False, fast_decode=False, dedup=False, force_setup=False, max_distance=DEFAULT_MAX_DISTANCE):
     # Set up logging
     logger = setup_logger()
     
     try:
         # Setup paths
         media_dir = project_root / "data" / "media"
+        hash_index_path = project_root / "data" / "processed" / "image_hashes.json"
         
         logger.info("=== Starting Object Detection Pipeline ===")
         
         # Setup YOLO
         logger.info("Setting up YOLO...")
         yolo_setup = YOLOSetup()
-        yolo_setup.setup_yolo()
+        yolo_setup.setup_yolo(force=force_setup)
         
         # Initialize components
-        detector = ObjectDetector()
+        hash_index = ImageHashIndex(hash_index_path, max_distance=max_distance) if dedup else None
+        detector = ObjectDetector(fast_decode=fast_decode, hash_index=hash_index)
         db_manager = DatabaseManager()
         
-        # Process images
-        logger.info("Processing images...")
-        detections_df = detector.process_directory(media_dir)
-        
-        # Save results
-        logger.info("Saving detection results...")
+        # Process images, flushing results to the database as they are produced
         db_manager.connect()
         try:
-            detector.save_detections(detections_df, db_manager)
+            # The hash index is saved with every written batch, so a long-running or
+            # killed worker doesn't lose the hashes of images already stored
+            on_flush = hash_index.save if hash_index is not None else None
+            with DatabaseDetectionSink(db_manager, on_flush=on_flush) as sink:
+                if watch:
+                    logger.info("Starting detection worker...")
+                    # Only the staged copies are watched: raw images reach data/media through
+                    # prepare_images, and detections are keyed by the staged path
+                    worker = DetectionWorker(detector, sink, [media_dir])
+                    worker.run()
+                else:
+                    logger.info("Processing images...")
+                    detector.process_directory(media_dir, sink=sink)
+            
+            if hash_index is not None:
+                duplicates = hash_index.duplicate_groups()
+                logger.info(f"Found {len(duplicates)} near-duplicate images")
+                db_manager.save_dataframe(duplicates, 'image_duplicates', if_exists='replace')
         finally:
+            if hash_index is not None:
+                hash_index.save()
             db_manager.disconnect()
         
         logger.info("=== Object Detection Pipeline Completed Successfully ===")
+        return sink.images_written
         
     except Exception as e:
         logger.error(f"Pipeline failed: {str(e)}")
         raise
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Run object detection on scraped images")
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Keep running and process new images as they arrive"
+    )
+    parser.add_argument(
+        "--fast-decode",
+        action="store_true",
+        help="Decode large JPEGs at reduced resolution before letterboxing"
+    )
+    parser.add_argument(
+        "--dedup",
+        action="store_true",
+        help="Reuse detections of near-duplicate images instead of running inference"
+    )
+    parser.add_argument(
+        "--max-distance",
+        type=int,
+        default=DEFAULT_MAX_DISTANCE,
+        help="Maximum perceptual hash distance (0-64) at which --dedup treats images as duplicates"
+    )
+    parser.add_argument(
+        "--force-setup",
+        action="store_true",
+        help="Reinstall YOLOv5 requirements even if the setup stamp is current"
+    )
+    args = parser.parse_args()
+    try:
+        main(watch=args.watch, fast_decode=args.fast_decode, dedup=args.dedup,
+             force_setup=args.force_setup, max_distance=args.max_distance)
+    finally:
+        write_report('object_detection') 
\ No newline at end of file
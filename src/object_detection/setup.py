@@ -1,5 +1,8 @@
 import subprocess
 import os
+import sys
+import json
+import hashlib
 from pathlib import Path
 import logging
 
@@ -10,15 +13,56 @@ class YOLOSetup:
         self.project_root = Path(__file__).parent.parent.parent
         self.models_dir = self.project_root / "models"
         self.yolo_dir = self.models_dir / "yolov5"
-        
-    def setup_yolo(self):
-        """Set up YOLOv5 and install dependencies"""
+        # Records what the last successful setup installed, see setup_yolo
+        self.stamp_file = self.yolo_dir / ".setup_stamp.json"
+
+    def _git_revision(self):
+        head = self.yolo_dir / ".git" / "HEAD"
+        if not head.exists():
+            return None
+        ref = head.read_text().strip()
+        if ref.startswith("ref: "):
+            ref_file = self.yolo_dir / ".git" / ref[5:]
+            if ref_file.exists():
+                return ref_file.read_text().strip()
+        return ref
+
+    def version_stamp(self):
+        """Identify the installed setup by YOLOv5 revision, requirements and interpreter"""
+        requirements_file = self.yolo_dir / "requirements.txt"
+        requirements = requirements_file.read_bytes() if requirements_file.exists() else b""
+        return {
+            'yolov5_revision': self._git_revision(),
+            'requirements_sha256': hashlib.sha256(requirements).hexdigest(),
+            'python': sys.executable,
+            'python_version': sys.version.split()[0],
+        }
+
+    def is_current(self):
+        if not self.stamp_file.exists():
+            return False
+        try:
+            return json.loads(self.stamp_file.read_text()) == self.version_stamp()
+        except ValueError:
+            return False
+
+    def setup_yolo(self, force=False):
+        """
+        Set up YOLOv5 and install dependencies.
+
+        The pip install is skipped when the version stamp written by the last
+        successful setup still matches, so regular runs start without a subprocess.
+        """
         try:
+            if not force and self.yolo_dir.exists() and self.is_current():
+                logger.info("YOLO environment is up to date, skipping setup")
+                return
+
             logger.info("Setting up YOLO environment...")
-            
+
             # Create models directory
             self.models_dir.mkdir(exist_ok=True)
-            
+
             # Clone YOLOv5 if not already present
             if not self.yolo_dir.exists():
                 logger.info("Cloning YOLOv5 repository...")
@@ -27,16 +71,17 @@ class YOLOSetup:
                     "https://github.com/ultralytics/yolov5.git",
                     str(self.yolo_dir)
                 ], check=True)
-            
-            # Install YOLOv5 requirements
+
+            # Install YOLOv5 requirements into the running interpreter, the one the stamp records
             logger.info("Installing YOLOv5 requirements...")
             requirements_file = self.yolo_dir / "requirements.txt"
             subprocess.run([
-                "pip", "install", "-r", str(requirements_file)
+                sys.executable, "-m", "pip", "install", "-r", str(requirements_file)
             ], check=True)
-            
+
+            self.stamp_file.write_text(json.dumps(self.version_stamp(), indent=2))
             logger.info("YOLO setup completed successfully")
-            
+
         except Exception as e:
             logger.error(f"Error setting up YOLO: {str(e)}")
-            raise 
\ No newline at end of file
+            raise
@@ -0,0 +1,256 @@
+import os
+import logging
+import queue
+import threading
+import time
+import re
+import hashlib
+from pathlib import Path
+from datetime import datetime
+import pandas as pd
+from database.schema import ensure_detection_tables, ensure_link_table
+
+logger = logging.getLogger(__name__)
+
+DETECTION_COLUMNS = [
+    'image_path', 'class_id', 'class_name', 'confidence',
+    'bbox_x1', 'bbox_y1', 'bbox_x2', 'bbox_y2', 'processed_date'
+]
+
+# Scraped images are named {channel}_{message_id}.jpg; images staged from channel
+# subdirectories are {channel}_{YYYYmmdd_HHMMSS}_{message_id}.jpg
+IMAGE_NAME_PATTERN = re.compile(r"^(?P<channel>.+?)(?:_\d{8}_\d{6})?_(?P<message_id>\d+)$")
+
+def parse_message_key(image_path):
+    """Return (channel, message_id) for an image saved by the scraper, or None"""
+    match = IMAGE_NAME_PATTERN.match(Path(image_path).stem)
+    if not match:
+        return None
+    return match.group('channel'), match.group('message_id')
+
+def message_links(df):
+    """Attach channel and message_id to detections whose image name identifies a message"""
+    keys = df['image_path'].map(parse_message_key)
+    linked = df[keys.notna()].copy()
+    linked.insert(0, 'channel', [key[0] for key in keys.dropna()])
+    linked.insert(1, 'message_id', [key[1] for key in keys.dropna()])
+    return linked
+
+class DetectionSink:
+    """
+    Buffers per-image detections and flushes them in batches on a background thread.
+
+    A batch is flushed every `flush_every` images or every `flush_interval` seconds,
+    whichever comes first. Subclasses implement `_write_batch` and `processed_images`;
+    writes must be idempotent per image so that a restarted run can resume safely.
+    `on_flush` is called on the writer thread after each batch was written.
+    """
+    # Image paths checked per processed_images() call when resuming
+    resume_batch_size = 1000
+
+    def __init__(self, flush_every=50, flush_interval=30.0, max_pending=4, on_flush=None):
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.on_flush = on_flush
+        self._buffer = []
+        self._last_flush = time.monotonic()
+        # Bounded queue so inference blocks instead of piling up batches in memory
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._worker = None
+        self._error = None
+        self.images_written = 0
+        self.detections_written = 0
+
+    def start(self):
+        """Start the background writer thread"""
+        if self._worker is None:
+            self._worker = threading.Thread(target=self._run, name="detection-sink", daemon=True)
+            self._worker.start()
+        return self
+
+    def add(self, image_path, detections):
+        """Queue the detections of one processed image"""
+        self._raise_if_failed()
+        self._buffer.append((str(image_path), detections))
+
+        elapsed = time.monotonic() - self._last_flush
+        if len(self._buffer) >= self.flush_every or elapsed >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        """Hand the buffered batch to the writer thread"""
+        self._raise_if_failed()
+        if self._buffer:
+            self.start()
+            self._queue.put(self._buffer)
+            self._buffer = []
+        self._last_flush = time.monotonic()
+
+    def close(self):
+        """Flush remaining detections and wait for the writer to finish"""
+        try:
+            self.flush()
+        finally:
+            if self._worker is not None:
+                self._queue.put(None)
+                self._worker.join()
+                self._worker = None
+        self._raise_if_failed()
+        logger.info(f"Sink wrote {self.detections_written} detections for {self.images_written} images")
+
+    def processed_images(self, image_paths):
+        """Return the subset of image_paths that was already flushed"""
+        raise NotImplementedError
+
+    def unprocessed(self, image_paths):
+        """
+        Yield the image paths that were not flushed yet, checking them in batches
+        of `resume_batch_size` so resuming never loads every processed path.
+        """
+        image_paths = list(image_paths)
+        for start in range(0, len(image_paths), self.resume_batch_size):
+            batch = image_paths[start:start + self.resume_batch_size]
+            processed = self.processed_images([str(path) for path in batch])
+            for path in batch:
+                if str(path) not in processed:
+                    yield path
+
+    def _write_batch(self, image_paths, df):
+        """Persist one batch of detections"""
+        raise NotImplementedError
+
+    def _run(self):
+        while True:
+            batch = self._queue.get()
+            if batch is None:
+                break
+            if self._error is not None:
+                # Drain remaining batches after a failure; they will be redone on restart
+                continue
+            try:
+                image_paths = [image_path for image_path, _ in batch]
+                rows = [detection for _, detections in batch for detection in detections]
+                df = pd.DataFrame(rows, columns=DETECTION_COLUMNS)
+                self._write_batch(image_paths, df)
+                self.images_written += len(image_paths)
+                self.detections_written += len(df)
+                logger.info(f"Flushed {len(df)} detections for {len(image_paths)} images")
+                if self.on_flush is not None:
+                    self.on_flush()
+            except Exception as e:
+                logger.error(f"Error flushing detections: {str(e)}")
+                self._error = e
+
+    def _raise_if_failed(self):
+        if self._error is not None:
+            raise RuntimeError(f"Detection sink failed: {self._error}") from self._error
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            # Still persist what was already inferred before propagating the error
+            try:
+                self.close()
+            except Exception as e:
+                logger.error(f"Error closing detection sink: {str(e)}")
+        return False
+
+class DatabaseDetectionSink(DetectionSink):
+    """Flushes detections to the database together with a processed-image record"""
+    def __init__(self, db_manager, table_name='object_detections',
+                 processed_table='processed_images', link_table='message_detections', **kwargs):
+        super().__init__(**kwargs)
+        self.db_manager = db_manager
+        self.table_name = table_name
+        self.processed_table = processed_table
+        self.link_table = link_table
+        self._tables_ready = False
+
+    def processed_images(self, image_paths):
+        if not image_paths or not self.db_manager.table_exists(self.processed_table):
+            return set()
+        df = self.db_manager.read_sql(
+            f"SELECT image_path FROM {self.processed_table} WHERE image_path = ANY(:paths)",
+            params={"paths": list(image_paths)}
+        )
+        return set(df['image_path'])
+
+    def _write_batch(self, image_paths, df):
+        if not self._tables_ready:
+            # The API selects and orders by the id columns, which pandas would not create
+            ensure_detection_tables(self.db_manager, self.table_name, self.processed_table)
+            ensure_link_table(self.db_manager, self.link_table)
+            self._tables_ready = True
+        
+        counts = df['image_path'].value_counts()
+        processed = pd.DataFrame({
+            'image_path': image_paths,
+            'detection_count': [int(counts.get(path, 0)) for path in image_paths],
+            'processed_date': datetime.now()
+        })
+        # Detections, message links and the processed record commit together, so a
+        # crash never leaves an image marked done without its detections (or vice versa)
+        self.db_manager.replace_rows(
+            {
+                self.table_name: df,
+                self.link_table: message_links(df),
+                self.processed_table: processed
+            },
+            key_column='image_path',
+            keys=image_paths
+        )
+        self.db_manager.bump_data_version('detections')
+
+class ParquetDetectionSink(DetectionSink):
+    """
+    Flushes detections to Parquet part files in `output_dir`.
+
+    Each part is written atomically and then recorded in a manifest; parts missing
+    from the manifest (left by a crash) are removed on start-up.
+    """
+    MANIFEST_NAME = "_processed.tsv"
+
+    def __init__(self, output_dir, **kwargs):
+        super().__init__(**kwargs)
+        self.output_dir = Path(output_dir)
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.manifest_path = self.output_dir / self.MANIFEST_NAME
+        self._remove_orphaned_parts()
+        self._processed = set(self._read_manifest())
+
+    def processed_images(self, image_paths):
+        return self._processed.intersection(image_paths)
+
+    def _read_manifest(self):
+        entries = {}
+        if self.manifest_path.exists():
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    image_path, _, part_name = line.rstrip('\n').partition('\t')
+                    if image_path:
+                        entries[image_path] = part_name
+        return entries
+
+    def _remove_orphaned_parts(self):
+        recorded = set(self._read_manifest().values())
+        for part in self.output_dir.glob("detections_*.parquet"):
+            if part.name not in recorded:
+                logger.warning(f"Removing unrecorded detection part: {part.name}")
+                part.unlink()
+
+    def _write_batch(self, image_paths, df):
+        digest = hashlib.sha1("\n".join(image_paths).encode('utf-8')).hexdigest()[:16]
+        part_name = f"detections_{digest}.parquet"
+        tmp_path = self.output_dir / f".{part_name}.tmp"
+        df.to_parquet(tmp_path, index=False)
+        tmp_path.replace(self.output_dir / part_name)
+
+        with open(self.manifest_path, 'a', encoding='utf-8') as f:
+            f.writelines(f"{path}\t{part_name}\n" for path in image_paths)
+            f.flush()
+            os.fsync(f.fileno())
+        self._processed.update(image_paths)
@@ -0,0 +1,161 @@
+import os
+import signal
+import threading
+import time
+import logging
+from collections import deque
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+# Coarsest directory mtime resolution we expect (FAT); a file created within the same
+# tick as the last listing leaves the mtime unchanged
+MTIME_RESOLUTION = 2.0
+
+class DetectionWorker:
+    """
+    Long-running detection loop that watches directories for new images.
+
+    The model is loaded once by the caller and reused for every image. Directories
+    are polled, but only directories whose mtime changed or is still recent are
+    re-listed, so an idle scan costs one stat per directory. New images are processed in micro-batches of
+    `batch_size` and handed to a detection sink (see object_detection.sink).
+    """
+    def __init__(self, detector, sink, watch_dirs, poll_interval=2.0, batch_size=16,
+                 settle_time=1.0, stats_interval=60.0):
+        self.detector = detector
+        self.sink = sink
+        self.watch_dirs = [Path(d) for d in watch_dirs]
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self.settle_time = settle_time
+        self.stats_interval = stats_interval
+
+        self._stop = threading.Event()
+        self._pending = deque()
+        self._seen = set()
+        self._unsettled = {}
+        self._dir_mtimes = {}
+        self._subdirs = {}
+        self._latencies = deque(maxlen=1000)
+        self._processed = 0
+        self._failed = 0
+
+    def stop(self, *args):
+        """Request a graceful shutdown after the current image"""
+        if not self._stop.is_set():
+            logger.info("Shutdown requested, finishing current batch...")
+        self._stop.set()
+
+    def stats(self):
+        """Return queue depth, throughput counters and end-to-end latency in seconds"""
+        latencies = sorted(self._latencies)
+        return {
+            'queue_depth': len(self._pending),
+            'processed': self._processed,
+            'failed': self._failed,
+            'latency_avg': sum(latencies) / len(latencies) if latencies else None,
+            'latency_p95': latencies[int(0.95 * (len(latencies) - 1))] if latencies else None,
+        }
+
+    def run(self):
+        """Watch directories and process images until stopped"""
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGINT, self.stop)
+            signal.signal(signal.SIGTERM, self.stop)
+
+        logger.info(f"Watching {[str(d) for d in self.watch_dirs]} for new images")
+        last_stats = time.monotonic()
+        try:
+            while not self._stop.is_set():
+                self.scan()
+                if self._pending:
+                    self._process_batch()
+                else:
+                    self._stop.wait(self.poll_interval)
+
+                if time.monotonic() - last_stats >= self.stats_interval:
+                    logger.info(f"Worker stats: {self.stats()}")
+                    last_stats = time.monotonic()
+        finally:
+            self.sink.flush()
+            logger.info(f"Worker stopped: {self.stats()}")
+
+    def scan(self):
+        """Queue images that appeared since the last scan"""
+        now = time.time()
+        for watch_dir in self.watch_dirs:
+            if watch_dir.exists():
+                self._scan_dir(watch_dir, now)
+
+        # Files that were still being written on an earlier scan
+        for path in list(self._unsettled):
+            self._consider(path, now)
+
+    def _scan_dir(self, directory, now):
+        try:
+            mtime = directory.stat().st_mtime
+        except FileNotFoundError:
+            return
+
+        # Recently modified directories are listed again even when their mtime is
+        # unchanged, until it is older than the timestamp resolution and settle time
+        recent = now - mtime <= max(self.settle_time, MTIME_RESOLUTION)
+        if recent or self._dir_mtimes.get(directory) != mtime:
+            self._dir_mtimes[directory] = mtime
+            subdirs = []
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(Path(entry.path))
+                    elif entry.name.lower().endswith(IMAGE_EXTENSIONS):
+                        self._consider(Path(entry.path), now)
+            self._subdirs[directory] = subdirs
+
+        for subdir in self._subdirs.get(directory, []):
+            self._scan_dir(subdir, now)
+
+    def _consider(self, path, now):
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            self._unsettled.pop(path, None)
+            return
+
+        key = (stat.st_dev, stat.st_ino)
+        if key in self._seen:
+            self._unsettled.pop(path, None)
+            return
+
+        # Give writers time to finish before reading a freshly created file
+        if now - stat.st_mtime < self.settle_time:
+            self._unsettled[path] = stat.st_mtime
+            return
+
+        self._unsettled.pop(path, None)
+        self._seen.add(key)
+        # ctime catches copies that preserve an old mtime (shutil.copy2)
+        self._pending.append((path, max(stat.st_mtime, stat.st_ctime)))
+
+    def _process_batch(self):
+        batch = [self._pending.popleft() for _ in range(min(self.batch_size, len(self._pending)))]
+        # Images persisted by an earlier run are skipped; checked per batch instead of
+        # loading every processed path at start-up
+        processed = self.sink.processed_images([str(path) for path, _ in batch])
+        for image_path, arrived in batch:
+            if self._stop.is_set():
+                break
+            if str(image_path) in processed:
+                continue
+            try:
+                detections = self.detector.process_image(image_path)
+            except Exception as e:
+                logger.error(f"Error processing {image_path.name}: {str(e)}")
+                self._failed += 1
+                continue
+            self.sink.add(image_path, detections)
+            self._processed += 1
+            self._latencies.append(time.time() - arrived)
+        self.sink.flush()
@@ -0,0 +1,324 @@
+import os
+import json
+import time
+import uuid
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from log_utils.metrics import histogram, counter
+from log_utils.profiler import maybe_profile, profiled_stages
+
+logger = logging.getLogger(__name__)
+
+STAGE_SECONDS = histogram('pipeline_stage_seconds', 'Wall time of pipeline stages that ran', ['stage'])
+STAGE_RUNS = counter('pipeline_stage_runs', 'Pipeline stage outcomes', ['stage', 'status'])
+
+# Inputs and outputs with this prefix name database tables or other resources that
+# have no file to fingerprint; they only create edges between stages
+RESOURCE_PREFIX = "db:"
+
+def is_resource(name):
+    return str(name).startswith(RESOURCE_PREFIX)
+
+class FileHasher:
+    """
+    Content fingerprints of files and directory trees.
+
+    File digests are cached by (size, mtime) so a directory of unchanged images is
+    fingerprinted from a stat() per file rather than by reading every byte again.
+    Whoever else reads the cache dict must hold the same lock, see Pipeline.
+    """
+    def __init__(self, cache=None, lock=None):
+        self.cache = cache if cache is not None else {}
+        self._lock = lock if lock is not None else threading.Lock()
+
+    def file_digest(self, path):
+        stat = path.stat()
+        key = str(path)
+        with self._lock:
+            cached = self.cache.get(key)
+        if cached is not None and cached[0] == stat.st_size and cached[1] == stat.st_mtime_ns:
+            return cached[2]
+
+        digest = hashlib.sha1()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+        value = digest.hexdigest()
+        with self._lock:
+            self.cache[key] = [stat.st_size, stat.st_mtime_ns, value]
+        return value
+
+    def fingerprint(self, path):
+        """Fingerprint a file or every file below a directory; missing paths hash as empty"""
+        path = Path(path)
+        digest = hashlib.sha256()
+        if path.is_file():
+            digest.update(self.file_digest(path).encode())
+        elif path.is_dir():
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                for name in sorted(files):
+                    file_path = Path(root) / name
+                    digest.update(str(file_path.relative_to(path)).encode())
+                    digest.update(self.file_digest(file_path).encode())
+        return digest.hexdigest()
+
+class Stage:
+    """
+    One step of the pipeline.
+
+    func is called with the set of upstream stage names that ran in this run
+    and returns the number of items it processed (or None). Stages that declare no
+    file or stage inputs, like the scraper, are never skipped as unchanged.
+    """
+    def __init__(self, name, func, inputs=(), outputs=(), params=None):
+        self.name = name
+        self.func = func
+        self.inputs = [str(i) if is_resource(i) else Path(i) for i in inputs]
+        self.outputs = [str(o) if is_resource(o) else Path(o) for o in outputs]
+        self.params = params or {}
+        self.deps = set()
+
+class Pipeline:
+    """
+    Runs stages as a DAG built from their declared inputs and outputs.
+
+    A stage depends on every stage producing one of its inputs (or a directory
+    containing it). Ready stages run concurrently on a thread pool. A stage is
+    skipped when the fingerprint of its inputs, its upstream fingerprints and its
+    params matches the last successful run and its file outputs still exist.
+    State is saved after every stage, so after a failure the next run starts again
+    at the failed stage; with resume=True even stages without inputs that completed
+    in the failed run are skipped. Stages named in profile (by default the
+    PROFILE_STAGES environment variable) run under the sampling profiler.
+    """
+    def __init__(self, stages, state_path, max_workers=4, profile=None):
+        self.stages = {stage.name: stage for stage in stages}
+        self.state_path = Path(state_path)
+        self.max_workers = max_workers
+        self.profile = set(profile) if profile is not None else profiled_stages()
+        self.state = self._load_state()
+        self._lock = threading.Lock()
+        # The hasher fills state['file_hashes'] while other stages save the state,
+        # so both go through one lock
+        self.hasher = FileHasher(self.state.setdefault('file_hashes', {}), self._lock)
+        self._link()
+
+    def _link(self):
+        for stage in self.stages.values():
+            for other in self.stages.values():
+                if other is stage:
+                    continue
+                if any(self._produces(output, input_) for output in other.outputs for input_ in stage.inputs):
+                    stage.deps.add(other.name)
+        self.order = self._toposort()
+
+    @staticmethod
+    def _produces(output, input_):
+        if is_resource(output) or is_resource(input_):
+            return output == input_
+        return input_ == output or output in input_.parents
+
+    def _toposort(self):
+        order, visiting, visited = [], set(), set()
+
+        def visit(name):
+            if name in visited:
+                return
+            if name in visiting:
+                raise ValueError(f"Pipeline has a cycle through stage {name}")
+            visiting.add(name)
+            for dep in sorted(self.stages[name].deps):
+                visit(dep)
+            visiting.discard(name)
+            visited.add(name)
+            order.append(name)
+
+        for name in self.stages:
+            visit(name)
+        return order
+
+    def _load_state(self):
+        if self.state_path.exists():
+            try:
+                with open(self.state_path) as f:
+                    return json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Could not read pipeline state, starting fresh: {str(e)}")
+        return {'stages': {}}
+
+    def _save_state(self):
+        # Called with self._lock held
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.state_path.with_suffix('.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(self.state, f, indent=2)
+        tmp_path.replace(self.state_path)
+
+    def fingerprint(self, stage, fingerprints):
+        if not stage.inputs:
+            return None
+        digest = hashlib.sha256()
+        digest.update(stage.name.encode())
+        digest.update(json.dumps(stage.params, sort_keys=True, default=str).encode())
+        for input_ in stage.inputs:
+            digest.update(str(input_).encode())
+            if not is_resource(input_):
+                digest.update(self.hasher.fingerprint(input_).encode())
+        for dep in sorted(stage.deps):
+            digest.update(str(fingerprints.get(dep)).encode())
+        return digest.hexdigest()
+
+    def _is_current(self, stage, fingerprint, resume):
+        previous = self.state['stages'].get(stage.name)
+        if previous is None or previous.get('status') != 'done':
+            return False
+        if any(not is_resource(o) and not o.exists() for o in stage.outputs):
+            return False
+        if resume and previous.get('run_id') == self.state.get('last_run_id'):
+            return True
+        return fingerprint is not None and previous.get('fingerprint') == fingerprint
+
+    def _execute(self, stage, fingerprints, run_id, resume, force):
+        started = time.perf_counter()
+        fingerprint = self.fingerprint(stage, fingerprints)
+        fingerprint_time = time.perf_counter() - started
+
+        if stage.name not in force and self._is_current(stage, fingerprint, resume):
+            logger.info(f"Stage {stage.name}: unchanged, skipping")
+            STAGE_RUNS.inc(stage=stage.name, status='skipped')
+            previous = self.state['stages'][stage.name]
+            return 'skipped', previous.get('fingerprint'), None
+
+        # Upstream stages that ran in this run, including earlier attempts of a resumed run
+        with self._lock:
+            changed = {
+                dep for dep in stage.deps
+                if self.state['stages'].get(dep, {}).get('run_id') == run_id
+                and self.state['stages'][dep].get('status') == 'done'
+            }
+        logger.info(f"Stage {stage.name}: running")
+        with self._lock:
+            self.state['stages'][stage.name] = {
+                'status': 'running',
+                'run_id': run_id,
+                'started_at': datetime.utcnow().isoformat(),
+            }
+            self._save_state()
+
+        start = time.perf_counter()
+        try:
+            with maybe_profile(stage.name, self.profile):
+                items = stage.func(changed)
+        except Exception:
+            wall_time = time.perf_counter() - start
+            STAGE_RUNS.inc(stage=stage.name, status='failed')
+            with self._lock:
+                self.state['stages'][stage.name].update(status='failed', wall_time=round(wall_time, 3))
+                self._save_state()
+            raise
+        wall_time = time.perf_counter() - start
+        STAGE_SECONDS.observe(wall_time, stage=stage.name)
+        STAGE_RUNS.inc(stage=stage.name, status='done')
+
+        # Outputs of this stage may be inputs of the next, so hash state is saved too
+        record = {
+            'status': 'done',
+            'run_id': run_id,
+            'fingerprint': fingerprint,
+            'finished_at': datetime.utcnow().isoformat(),
+            'wall_time': round(wall_time, 3),
+            'fingerprint_time': round(fingerprint_time, 3),
+            'items': items,
+            'throughput': round(items / wall_time, 2) if items and wall_time > 0 else None,
+        }
+        with self._lock:
+            self.state['stages'][stage.name].update(record)
+            self._save_state()
+        logger.info(f"Stage {stage.name}: done in {wall_time:.2f}s, {items if items is not None else '-'} items")
+        return 'done', fingerprint, record
+
+    def run(self, resume=False, force=(), skip=()):
+        """
+        Run every stage whose inputs changed and return {stage name: status}.
+
+        Stages named in skip are treated as complete without running. When a stage
+        fails its dependents are not started, independent branches still finish,
+        and the first error is raised once the pool is drained.
+        """
+        force = set(force)
+        # Resuming continues the id of a run that failed or was interrupted, so the
+        # stages it completed are recognised by _is_current
+        resumable = self.state.get('last_run_id') and self.state.get('last_run_status') != 'done'
+        run_id = self.state['last_run_id'] if resume and resumable else uuid.uuid4().hex
+        with self._lock:
+            self.state['last_run_id'] = run_id
+            self.state['last_run_status'] = 'running'
+            self._save_state()
+
+        statuses = {name: 'skipped' for name in skip}
+        fingerprints = {name: self.state['stages'].get(name, {}).get('fingerprint') for name in skip}
+        errors = []
+        pending = [name for name in self.order if name not in statuses]
+        run_start = time.perf_counter()
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {}
+            while pending or futures:
+                for name in list(pending):
+                    deps = self.stages[name].deps
+                    if any(statuses.get(dep) in ('failed', 'blocked') for dep in deps):
+                        statuses[name] = 'blocked'
+                        pending.remove(name)
+                        logger.warning(f"Stage {name}: not run because an upstream stage failed")
+                    elif all(dep in statuses for dep in deps):
+                        pending.remove(name)
+                        future = executor.submit(
+                            self._execute, self.stages[name], dict(fingerprints), run_id, resume, force
+                        )
+                        futures[future] = name
+
+                if not futures:
+                    continue
+                finished, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    name = futures.pop(future)
+                    try:
+                        status, fingerprint, _ = future.result()
+                    except Exception as e:
+                        logger.error(f"Stage {name} failed: {str(e)}")
+                        statuses[name] = 'failed'
+                        errors.append(e)
+                        continue
+                    statuses[name] = status
+                    fingerprints[name] = fingerprint
+
+        wall_time = time.perf_counter() - run_start
+        with self._lock:
+            self.state['last_run_status'] = 'failed' if errors else 'done'
+            self.state['last_run_wall_time'] = round(wall_time, 3)
+            self._save_state()
+        self._log_summary(statuses, wall_time)
+        if errors:
+            raise errors[0]
+        return statuses
+
+    def _log_summary(self, statuses, wall_time):
+        logger.info(f"Pipeline finished in {wall_time:.2f}s")
+        logger.info(f"{'stage':<20} {'status':<8} {'wall s':>8} {'items':>8} {'items/s':>10}")
+        for name in self.order:
+            status = statuses.get(name, 'pending')
+            record = self.state['stages'].get(name, {}) if status in ('done', 'failed') else {}
+            wall = record.get('wall_time')
+            items = record.get('items')
+            throughput = record.get('throughput')
+            logger.info(
+                f"{name:<20} {status:<8} "
+                f"{wall if wall is not None else '-':>8} "
+                f"{items if items is not None else '-':>8} "
+                f"{throughput if throughput is not None else '-':>10}"
+            )
@@ -0,0 +1,79 @@
+import asyncio
+import logging
+import importlib.util
+from pathlib import Path
+
+from .dag import Stage
+
+logger = logging.getLogger(__name__)
+
+# Sources read by the dbt models, refreshed when the stage loading them ran
+DBT_SOURCES = {
+    'clean_load': 'raw.cleaned_messages',
+    'detect': 'raw.message_detections',
+}
+
+def build_stages(project_root, link='hardlink', workers=8, fast_decode=False, dedup=False, dbt_full_refresh=False):
+    """Return the stages of the end-to-end pipeline with their inputs and outputs"""
+    project_root = Path(project_root)
+    data_dir = project_root / "data"
+    raw_messages_dir = data_dir / "raw" / "messages"
+    raw_images_dir = data_dir / "raw" / "images"
+    media_dir = data_dir / "media"
+    dbt_project_dir = project_root / "dbt" / "ethiopian_medical_data"
+
+    def scrape(changed):
+        from scraping.telegram_scraper import TelegramScraper
+
+        async def run():
+            scraper = TelegramScraper()
+            await scraper.initialize()
+            try:
+                await scraper.scrape_all_channels()
+            finally:
+                await scraper.client.disconnect()
+
+        asyncio.run(run())
+        return None
+
+    def clean_load(changed):
+        from main import main as clean_and_load
+        return clean_and_load()
+
+    def prepare_images(changed):
+        # Loaded by path: importing src/utils as the package "utils" would shadow the
+        # YOLOv5 utils package the detect stage imports in this same process
+        spec = importlib.util.spec_from_file_location(
+            "prepare_images", Path(__file__).parent.parent / "utils" / "prepare_images.py"
+        )
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        counts = module.stage_images(raw_images_dir, media_dir, link=link, workers=workers)
+        return sum(counts.values())
+
+    def detect(changed):
+        from object_detection.main import main as detect_objects
+        return detect_objects(fast_decode=fast_decode, dedup=dedup)
+
+    def transform(changed):
+        from transformation.dbt_runner import DBTRunner
+        runner = DBTRunner(dbt_project_dir)
+        timings = runner.run_transformation(
+            incremental=True,
+            changed_sources=[DBT_SOURCES[name] for name in sorted(changed) if name in DBT_SOURCES],
+            full_refresh=dbt_full_refresh
+        )
+        return len(timings)
+
+    return [
+        Stage('scrape', scrape, outputs=[raw_messages_dir, raw_images_dir]),
+        Stage('clean_load', clean_load, inputs=[raw_messages_dir], outputs=["db:cleaned_messages"]),
+        Stage('prepare_images', prepare_images, inputs=[raw_images_dir], outputs=[media_dir],
+              params={'link': link}),
+        Stage('detect', detect, inputs=[media_dir], outputs=["db:message_detections"],
+              params={'fast_decode': fast_decode, 'dedup': dedup}),
+        Stage('dbt', transform,
+              inputs=["db:cleaned_messages", "db:message_detections",
+                      dbt_project_dir / "models", dbt_project_dir / "dbt_project.yml"],
+              outputs=["db:marts"]),
+    ]
@@ -1,5 +1,17 @@
+import argparse
 import uvicorn
-from api.main import app
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Run the API server")
+    parser.add_argument("--init-db", action="store_true",
+                        help="Create the database tables and extensions, then exit (run once per database)")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+
+    if args.init_db:
+        from api.database import create_schema
+        create_schema()
+    else:
+        from api.main import app
+        uvicorn.run(app, host=args.host, port=args.port)
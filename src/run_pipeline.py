@@ -0,0 +1,68 @@
+import os
+import sys
+import argparse
+from pathlib import Path
+
+from log_utils.logger import setup_logger
+from log_utils.metrics import write_report
+from pipeline.dag import Pipeline
+from pipeline.stages import build_stages
+
+def main():
+    project_root = Path(__file__).parent.parent
+    parser = argparse.ArgumentParser(
+        description="Run scraping, cleaning and loading, image staging, object detection and dbt as one pipeline"
+    )
+    parser.add_argument("--resume", action="store_true",
+                        help="Continue the last failed run, skipping the stages it completed")
+    parser.add_argument("--force", action="append", default=[], metavar="STAGE",
+                        help="Run a stage even if its inputs are unchanged (repeatable)")
+    parser.add_argument("--skip", action="append", default=[], metavar="STAGE",
+                        help="Treat a stage as complete without running it, e.g. scrape (repeatable)")
+    parser.add_argument("--workers", type=int, default=4, help="Stages run concurrently")
+    parser.add_argument("--link", choices=['hardlink', 'reflink', 'symlink', 'copy'], default='hardlink',
+                        help="How images are staged into the media directory")
+    parser.add_argument("--fast-decode", action="store_true", help="Decode large JPEGs at reduced resolution")
+    parser.add_argument("--dedup", action="store_true", help="Reuse detections of near-duplicate images")
+    parser.add_argument("--dbt-full-refresh", action="store_true", help="Rebuild incremental dbt models")
+    parser.add_argument("--profile", action="append", default=None, metavar="STAGE",
+                        help="Run a stage under the sampling profiler (repeatable, default from PROFILE_STAGES)")
+    args = parser.parse_args()
+
+    logger = setup_logger()
+
+    # The scraper writes to paths relative to the working directory
+    os.chdir(project_root)
+
+    stages = build_stages(
+        project_root,
+        link=args.link,
+        fast_decode=args.fast_decode,
+        dedup=args.dedup,
+        dbt_full_refresh=args.dbt_full_refresh
+    )
+    pipeline = Pipeline(
+        stages,
+        project_root / "data" / "processed" / "pipeline_state.json",
+        max_workers=args.workers,
+        profile=args.profile
+    )
+
+    unknown = set(args.force + args.skip + (args.profile or [])) - set(pipeline.stages)
+    if unknown:
+        parser.error(f"Unknown stages: {', '.join(sorted(unknown))}")
+
+    try:
+        pipeline.run(resume=args.resume, force=args.force, skip=args.skip)
+    except Exception as e:
+        logger.error(f"Pipeline failed, rerun with --resume to continue: {str(e)}")
+        return 1
+    finally:
+        run_id = pipeline.state.get('last_run_id')
+        stages = {name: record for name, record in pipeline.state['stages'].items() if record.get('run_id') == run_id}
+        report = write_report('pipeline', extra={'run_id': run_id, 'stages': stages})
+        logger.info(f"Profile report written to {report}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,6 +6,12 @@ import asyncio
 from typing import List, Dict
 import json
 from pathlib import Path
+from log_utils.metrics import histogram, counter
+
+SCRAPE_PAGE_SECONDS = histogram('scrape_page_seconds', 'Time to fetch a page of channel messages', ['channel'])
+SCRAPE_MESSAGES = counter('scrape_messages', 'Messages fetched from Telegram', ['channel'])
+MEDIA_DOWNLOAD_SECONDS = histogram('media_download_seconds', 'Time to download one media file', ['channel'])
+MEDIA_DOWNLOADS = counter('media_downloads', 'Media downloads attempted', ['channel', 'status'])
 
 class TelegramScraper:
     def __init__(self, session_name: str = "medical_scraper"):
@@ -42,8 +48,10 @@ class TelegramScraper:
         }
         
         try:
-            entity = await self.client.get_entity(channel)
-            messages = await self.client.get_messages(entity, limit=limit)
+            with SCRAPE_PAGE_SECONDS.time(channel=channel):
+                entity = await self.client.get_entity(channel)
+                messages = await self.client.get_messages(entity, limit=limit)
+            SCRAPE_MESSAGES.inc(len(messages), channel=channel)
             
             for message in messages:
                 # Extract message data
@@ -59,7 +67,13 @@ class TelegramScraper:
                 if message.media:
                     if hasattr(message.media, 'photo'):
                         path = f"data/raw/images/{channel}_{message.id}.jpg"
-                        await message.download_media(path)
+                        try:
+                            with MEDIA_DOWNLOAD_SECONDS.time(channel=channel):
+                                await message.download_media(path)
+                        except Exception:
+                            MEDIA_DOWNLOADS.inc(channel=channel, status='failed')
+                            raise
+                        MEDIA_DOWNLOADS.inc(channel=channel, status='ok')
                         channel_data["images"].append(path)
                         
             return channel_data
@@ -98,9 +112,12 @@ class TelegramScraper:
                 filename = f"{timestamp}_{message.id}.jpg"
                 path = channel_dir / filename
                 
-                await self.client.download_media(message, str(path))
+                with MEDIA_DOWNLOAD_SECONDS.time(channel=channel_name):
+                    await self.client.download_media(message, str(path))
+                MEDIA_DOWNLOADS.inc(channel=channel_name, status='ok')
                 return str(path)
             except Exception as e:
+                MEDIA_DOWNLOADS.inc(channel=channel_name, status='failed')
                 logging.error(f"Error downloading media: {str(e)}")
                 return None
         return None
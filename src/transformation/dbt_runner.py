@@ -1,52 +1,243 @@
 import os
+import sys
+import json
+import shlex
+import shutil
+import hashlib
+import argparse
 import subprocess
 import logging
 from pathlib import Path
 
+# Add the src directory to Python path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from log_utils.metrics import histogram
+
+DBT_MODEL_SECONDS = histogram('dbt_model_seconds', 'Execution time of dbt models', ['model'])
+
+PACKAGE_FILES = ("packages.yml", "dependencies.yml", "package-lock.yml")
+
+def default_profiles_dir(project_dir):
+    """Where dbt looks for profiles.yml: DBT_PROFILES_DIR, the project directory, then ~/.dbt"""
+    if os.getenv('DBT_PROFILES_DIR'):
+        return Path(os.getenv('DBT_PROFILES_DIR'))
+    if (Path(project_dir) / "profiles.yml").exists():
+        return Path(project_dir)
+    return Path.home() / ".dbt"
+
 class DBTRunner:
-    def __init__(self, project_dir):
-        self.project_dir = Path(project_dir)
+    def __init__(self, project_dir, state_dir=None, in_process=True, profiles_dir=None):
+        # Absolute paths: the in-process runner resolves them against the caller's cwd
+        self.project_dir = Path(project_dir).resolve()
+        self.profiles_dir = Path(profiles_dir or default_profiles_dir(self.project_dir)).resolve()
+        self.target_dir = self.project_dir / "target"
+        # Manifest of the last successful run, compared against to select modified models
+        self.state_dir = Path(state_dir).resolve() if state_dir else self.project_dir / ".dbt_state"
+        self.in_process = in_process
+        self.model_timings = {}
         self.logger = logging.getLogger(__name__)
-        
+        self._runner = None
+
+    def _dbt_runner(self):
+        """Return the programmatic dbt runner, or None when dbt-core is too old or missing"""
+        if self._runner is None and self.in_process:
+            try:
+                from dbt.cli.main import dbtRunner
+            except ImportError:
+                self.logger.info("dbt programmatic runner not available, falling back to the dbt CLI")
+                self.in_process = False
+                return None
+            self._runner = dbtRunner()
+        return self._runner
+
+    def invoke(self, args):
+        """
+        Run a dbt command given as an argument list.
+
+        Commands run in-process through dbtRunner when available, which saves the
+        interpreter start and dbt import on every step; otherwise the dbt CLI is used.
+        """
+        paths = ["--project-dir", str(self.project_dir), "--profiles-dir", str(self.profiles_dir)]
+        runner = self._dbt_runner()
+        if runner is not None:
+            result = runner.invoke(args + paths)
+            if not result.success:
+                if result.exception is not None:
+                    self.logger.error(f"DBT command failed: {str(result.exception)}")
+                raise Exception(f"DBT command failed: {' '.join(args)}")
+            self.logger.info(f"DBT command successful: {' '.join(args)}")
+            return result.result
+
+        result = subprocess.run(
+            ["dbt"] + args + paths,
+            cwd=self.project_dir,
+            capture_output=True,
+            text=True
+        )
+        if result.returncode != 0:
+            self.logger.error(f"DBT command failed: {result.stderr}")
+            raise Exception(f"DBT command failed: {' '.join(args)}")
+
+        self.logger.info(f"DBT command successful: {' '.join(args)}")
+        return result.stdout
+
     def run_dbt_command(self, command):
         """Run a DBT command"""
         try:
-            result = subprocess.run(
-                f"dbt {command}",
-                shell=True,
-                cwd=self.project_dir,
-                capture_output=True,
-                text=True
-            )
-            
-            if result.returncode != 0:
-                self.logger.error(f"DBT command failed: {result.stderr}")
-                raise Exception(f"DBT command failed: {command}")
-                
-            self.logger.info(f"DBT command successful: {command}")
-            return result.stdout
-            
+            return self.invoke(shlex.split(command))
         except Exception as e:
             self.logger.error(f"Error running DBT command: {str(e)}")
             raise
-            
-    def run_transformation(self):
-        """Run the complete DBT transformation pipeline"""
+
+    def _packages_hash(self):
+        digest = hashlib.sha256()
+        found = False
+        for name in PACKAGE_FILES:
+            path = self.project_dir / name
+            if path.exists():
+                digest.update(name.encode())
+                digest.update(path.read_bytes())
+                found = True
+        return digest.hexdigest() if found else None
+
+    def install_deps(self, force=False):
+        """Run dbt deps only when the package files changed since the last install"""
+        packages_hash = self._packages_hash()
+        if packages_hash is None:
+            self.logger.info("No dbt packages declared, skipping deps")
+            return False
+
+        stamp = self.state_dir / "deps.sha256"
+        installed = (self.project_dir / "dbt_packages").exists()
+        if not force and installed and stamp.exists() and stamp.read_text().strip() == packages_hash:
+            self.logger.info("dbt packages unchanged, skipping deps")
+            return False
+
+        self.run_dbt_command("deps")
+        self.state_dir.mkdir(parents=True, exist_ok=True)
+        stamp.write_text(packages_hash)
+        return True
+
+    def has_state(self):
+        """Check that the saved manifest exists and can be compared against"""
+        manifest = self.state_dir / "manifest.json"
+        if not manifest.exists():
+            return False
+        try:
+            with open(manifest) as f:
+                return "nodes" in json.load(f)
+        except ValueError:
+            self.logger.warning(f"Saved dbt state {manifest} is unreadable, ignoring it")
+            return False
+
+    def save_state(self):
+        """Keep the manifest of this run as the comparison state for the next one"""
+        manifest = self.target_dir / "manifest.json"
+        if not manifest.exists():
+            self.logger.warning("No manifest.json to save as dbt state")
+            return
+        self.state_dir.mkdir(parents=True, exist_ok=True)
+        # Copy then rename so an interrupted copy never replaces a good state
+        tmp_path = self.state_dir / "manifest.json.tmp"
+        shutil.copyfile(manifest, tmp_path)
+        tmp_path.replace(self.state_dir / "manifest.json")
+
+    def selectors(self, changed_sources=()):
+        """
+        Build the node selection for an incremental run.
+
+        Models whose code or config differ from the saved manifest are selected with
+        state:modified+, and models downstream of sources that received new rows with
+        source:<name>+. Returns None when there is no saved state to compare against.
+        """
+        if not self.has_state():
+            return None
+        return ["state:modified+"] + [f"source:{name}+" for name in changed_sources]
+
+    def load_timings(self):
+        """Read per-node execution times from the last run_results.json"""
+        run_results = self.target_dir / "run_results.json"
+        if not run_results.exists():
+            return {}
+        with open(run_results) as f:
+            results = json.load(f).get("results", [])
+        return {r["unique_id"]: round(r.get("execution_time") or 0.0, 3) for r in results}
+
+    def _log_timings(self, timings, top=10):
+        slowest = sorted(timings.items(), key=lambda item: item[1], reverse=True)[:top]
+        for unique_id, seconds in slowest:
+            self.logger.info(f"  {unique_id}: {seconds:.2f}s")
+
+    def run_transformation(self, incremental=False, changed_sources=(), full_refresh=False):
+        """
+        Run the DBT transformation pipeline.
+
+        With incremental=True only modified models and models downstream of
+        changed_sources (e.g. "raw.cleaned_messages") are run and tested, and docs
+        are not regenerated. Without saved state the first incremental run builds
+        everything. Returns the per-model execution times of the run step.
+        """
         try:
             # Install dependencies
-            self.run_dbt_command("deps")
-            
+            self.install_deps()
+
+            selection = []
+            if incremental:
+                selectors = self.selectors(changed_sources)
+                if selectors is None:
+                    self.logger.info("No saved dbt state, running all models")
+                else:
+                    selection = ["--select"] + selectors + ["--state", str(self.state_dir)]
+
             # Run the models
-            self.run_dbt_command("run")
-            
+            run_args = ["run"] + selection
+            if full_refresh:
+                run_args.append("--full-refresh")
+            self.invoke(run_args)
+            self.model_timings = self.load_timings()
+            for unique_id, seconds in self.model_timings.items():
+                DBT_MODEL_SECONDS.observe(seconds, model=unique_id)
+            self.logger.info(f"Ran {len(self.model_timings)} models")
+            self._log_timings(self.model_timings)
+
             # Run tests
-            self.run_dbt_command("test")
-            
+            self.invoke(["test"] + selection)
+
             # Generate documentation
-            self.run_dbt_command("docs generate")
-            
+            if not incremental:
+                self.run_dbt_command("docs generate")
+
+            self.save_state()
             self.logger.info("DBT transformation pipeline completed successfully")
-            
+            return self.model_timings
+
         except Exception as e:
             self.logger.error(f"DBT transformation pipeline failed: {str(e)}")
-            raise 
\ No newline at end of file
+            raise
+
+def main():
+    project_root = Path(__file__).parent.parent.parent
+    parser = argparse.ArgumentParser(description="Run the dbt transformations")
+    parser.add_argument("--project-dir", default=str(project_root / "dbt" / "ethiopian_medical_data"))
+    parser.add_argument("--profiles-dir", help="Directory containing profiles.yml (default: DBT_PROFILES_DIR, "
+                                               "the project directory, then ~/.dbt)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Run only models modified since the last run or downstream of --source")
+    parser.add_argument("--source", action="append", default=[],
+                        help="Source that received new rows, e.g. raw.cleaned_messages (repeatable)")
+    parser.add_argument("--full-refresh", action="store_true", help="Rebuild incremental models from scratch")
+    parser.add_argument("--subprocess", action="store_true", help="Use the dbt CLI instead of the in-process runner")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    runner = DBTRunner(args.project_dir, in_process=not args.subprocess, profiles_dir=args.profiles_dir)
+    runner.run_transformation(
+        incremental=args.incremental,
+        changed_sources=args.source,
+        full_refresh=args.full_refresh
+    )
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
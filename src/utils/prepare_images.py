@@ -1,11 +1,77 @@
+import os
+import errno
 import shutil
+import argparse
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 import logging
 
 logger = logging.getLogger(__name__)
 
-def setup_image_directories():
-    """Set up image directories and move images from raw to media"""
+IMAGE_EXTENSIONS = ('.jpg', '.png')
+
+# Linux ioctl for copy-on-write clones (btrfs, xfs, ...)
+FICLONE = 0x40049409
+
+def find_images(raw_dir):
+    """Yield (source, staged name) for images in raw_dir and its channel subdirectories"""
+    for root, _, files in os.walk(raw_dir):
+        root = Path(root)
+        # Prefix files from channel subdirectories with the channel name to keep names unique
+        prefix = "_".join(root.relative_to(raw_dir).parts)
+        for name in files:
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                yield root / name, f"{prefix}_{name}" if prefix else name
+
+def is_staged(src, dest):
+    """Check whether dest already holds src, by inode or by size and mtime"""
+    try:
+        dest_stat = dest.stat()
+    except FileNotFoundError:
+        return False
+    src_stat = src.stat()
+    if (src_stat.st_dev, src_stat.st_ino) == (dest_stat.st_dev, dest_stat.st_ino):
+        return True
+    return src_stat.st_size == dest_stat.st_size and int(src_stat.st_mtime) == int(dest_stat.st_mtime)
+
+def _reflink(src, dest):
+    import fcntl
+    with open(src, 'rb') as fsrc, open(dest, 'wb') as fdest:
+        fcntl.ioctl(fdest.fileno(), FICLONE, fsrc.fileno())
+    shutil.copystat(src, dest)
+
+def stage_file(src, dest, link='hardlink'):
+    """Stage src at dest without copying data where the filesystem allows it"""
+    if dest.exists() or dest.is_symlink():
+        dest.unlink()
+    try:
+        if link == 'hardlink':
+            os.link(src, dest)
+            return link
+        if link == 'symlink':
+            dest.symlink_to(src.resolve())
+            return link
+        if link == 'reflink':
+            _reflink(src, dest)
+            return link
+    except (OSError, ImportError) as e:
+        # Cross-device links and filesystems without clone support fall back to a copy
+        if isinstance(e, OSError) and e.errno not in (errno.EXDEV, errno.EPERM, errno.EOPNOTSUPP,
+                                                      errno.ENOTTY, errno.EINVAL, errno.EMLINK):
+            raise
+        if dest.exists():
+            dest.unlink()
+    shutil.copy2(src, dest)
+    return 'copy'
+
+def setup_image_directories(incremental=False, link='hardlink', workers=8):
+    """
+    Set up image directories and move images from raw to media.
+
+    By default every image is copied on every run. With incremental=True images
+    already staged are skipped, channel subdirectories are included, new images are
+    linked instead of copied (see stage_file) and staging runs on `workers` threads.
+    """
     try:
         # Setup paths
         project_root = Path(__file__).parent.parent.parent
@@ -15,6 +81,9 @@ def setup_image_directories():
         # Create media directory if it doesn't exist
         media_dir.mkdir(parents=True, exist_ok=True)
         
+        if incremental:
+            return stage_images(raw_dir, media_dir, link=link, workers=workers)
+        
         # Get all images from raw directory
         image_files = list(raw_dir.glob("*.jpg")) + list(raw_dir.glob("*.png"))
         logger.info(f"Found {len(image_files)} images in raw directory")
@@ -31,6 +100,30 @@ def setup_image_directories():
         logger.error(f"Error preparing images: {str(e)}")
         raise
 
+def stage_images(raw_dir, media_dir, link='hardlink', workers=8):
+    """Incrementally stage images from raw_dir into media_dir and return counts per action"""
+    raw_dir = Path(raw_dir)
+    media_dir = Path(media_dir)
+    if not raw_dir.exists():
+        logger.warning(f"Raw image directory not found: {raw_dir}")
+        return {}
+    media_dir.mkdir(parents=True, exist_ok=True)
+
+    def stage(item):
+        src, name = item
+        dest = media_dir / name
+        if is_staged(src, dest):
+            return 'skipped'
+        return stage_file(src, dest, link=link)
+
+    counts = {}
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for action in executor.map(stage, find_images(raw_dir)):
+            counts[action] = counts.get(action, 0) + 1
+
+    logger.info(f"Staged images into {media_dir}: {counts}")
+    return counts
+
 if __name__ == "__main__":
     # Setup basic logging
     logging.basicConfig(
@@ -38,4 +131,12 @@ if __name__ == "__main__":
         format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
     )
     
-    setup_image_directories() 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Stage raw images into the media directory")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Skip staged images, include channel subdirectories and link instead of copy")
+    parser.add_argument("--link", choices=['hardlink', 'reflink', 'symlink', 'copy'], default='hardlink',
+                        help="How new images are staged in incremental mode")
+    parser.add_argument("--workers", type=int, default=8, help="Number of staging threads")
+    args = parser.parse_args()
+
+    setup_image_directories(incremental=args.incremental, link=args.link, workers=args.workers)
\ No newline at end of file
@@ -0,0 +1,39 @@
+import sys
+import asyncio
+from pathlib import Path
+
+import pytest
+
+# Modules import each other relative to src/, as the entry points set up at run time
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+
+@pytest.fixture
+def sqlite_db():
+    """
+    Return run(tables, rows, fn): create the given API tables in a fresh in-memory
+    SQLite database, insert rows ({table: [dict, ...]}), and await fn(session).
+    Postgres-only indexes are not created.
+    """
+    pytest.importorskip("aiosqlite")
+    from sqlalchemy import insert
+    from sqlalchemy.schema import CreateTable
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+    def run(tables, rows, fn):
+        async def main():
+            engine = create_async_engine("sqlite+aiosqlite://")
+            try:
+                async with engine.begin() as conn:
+                    for table in tables:
+                        await conn.execute(CreateTable(table))
+                    for table, values in rows.items():
+                        if values:
+                            await conn.execute(insert(table), values)
+                async with async_sessionmaker(engine, expire_on_commit=False)() as session:
+                    return await fn(session)
+            finally:
+                await engine.dispose()
+        return asyncio.run(main())
+
+    return run
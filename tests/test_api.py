@@ -0,0 +1,145 @@
+from datetime import datetime
+
+import pytest
+
+pytest.importorskip("aiosqlite")
+pytest.importorskip("httpx")
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, insert
+from sqlalchemy.pool import NullPool
+from sqlalchemy.schema import CreateTable
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+from api import crud, models
+import api.main as api_main
+from api.main import app
+from api.database import get_async_db
+
+
+def message(i, channel='chemed'):
+    return {
+        'message_id': str(i), 'channel': channel, 'date': datetime(2024, 1, 1, i),
+        'text': f'paracetamol {i}', 'has_media': True, 'media_path': f'data/media/{channel}_{i}.jpg',
+        'word_count': 2, 'contains_url': False, 'language': 'english',
+    }
+
+
+def detection(i, channel='chemed'):
+    return {
+        'id': i, 'image_path': f'data/media/{channel}_{i}.jpg', 'class_id': 39, 'class_name': 'bottle',
+        'confidence': 0.5 + i / 100, 'bbox_x1': 1.0, 'bbox_y1': 2.0, 'bbox_x2': 3.0, 'bbox_y2': 4.0,
+        'processed_date': datetime(2024, 1, 2),
+    }
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    """API client backed by a SQLite file; the real engine is created at startup but never connected"""
+    monkeypatch.setenv('DB_PASSWORD', 'test')
+    monkeypatch.setenv('API_CACHE_VERSION_CHECK_INTERVAL', '3600')
+    # Startup would otherwise write log files into the repository's logs/ directory
+    monkeypatch.setattr(api_main, 'setup_logger', lambda name: None)
+    url = f"sqlite:///{tmp_path / 'api.db'}"
+
+    sync_engine = create_engine(url)
+    with sync_engine.begin() as conn:
+        for table in (models.Message.__table__, models.ObjectDetection.__table__,
+                      models.MessageDetection.__table__, models.MessageStatsDaily.__table__):
+            conn.execute(CreateTable(table))
+        conn.execute(insert(models.Message.__table__), [message(i) for i in range(1, 6)])
+        conn.execute(insert(models.ObjectDetection.__table__), [detection(i) for i in range(1, 4)])
+        conn.execute(insert(models.MessageDetection.__table__), [
+            dict(detection(i), channel='chemed', message_id=str(i)) for i in (1, 2)
+        ])
+    sync_engine.dispose()
+
+    # NullPool: every request opens its connection on the client's own event loop
+    engine = create_async_engine(url.replace("sqlite", "sqlite+aiosqlite"), poolclass=NullPool)
+    sessions = async_sessionmaker(engine, expire_on_commit=False)
+
+    async def override():
+        async with sessions() as db:
+            yield db
+
+    app.dependency_overrides[get_async_db] = override
+    try:
+        with TestClient(app) as test_client:
+            yield test_client
+    finally:
+        app.dependency_overrides.clear()
+
+
+def test_messages_page_and_cursor(client):
+    first = client.get("/messages/", params={'limit': 2})
+    assert first.status_code == 200
+    assert [m['message_id'] for m in first.json()] == ['1', '2']
+
+    second = client.get("/messages/", params={'limit': 2, 'cursor': first.headers['x-next-cursor']})
+    assert [m['message_id'] for m in second.json()] == ['3', '4']
+
+    last = client.get("/messages/", params={'limit': 2, 'cursor': second.headers['x-next-cursor']})
+    assert [m['message_id'] for m in last.json()] == ['5']
+    assert 'x-next-cursor' not in last.headers
+
+
+def test_invalid_cursor_is_a_client_error(client):
+    response = client.get("/messages/", params={'cursor': 'e30'})
+    assert response.status_code == 400
+
+    # A cursor taken from a row without a date
+    response = client.get("/messages/", params={'cursor': crud.encode_cursor([None, 'chemed', '1'])})
+    assert response.status_code == 400
+
+
+def test_bad_rows_are_a_server_error(client, tmp_path):
+    # Pydantic's ValidationError is a ValueError, but not the client's fault
+    engine = create_engine(f"sqlite:///{tmp_path / 'api.db'}")
+    with engine.begin() as conn:
+        conn.execute(insert(models.Message.__table__), [dict(message(0), date=None)])
+    engine.dispose()
+
+    assert client.get("/messages/").status_code == 500
+
+
+def test_messages_filtered_by_detection(client):
+    response = client.get("/messages/", params={'class_name': 'bottle', 'min_confidence': 0.515})
+    assert [m['message_id'] for m in response.json()] == ['2']
+
+
+def test_messages_with_detections(client):
+    response = client.get("/messages/with-detections/", params={'limit': 3})
+    items = response.json()
+    assert [len(m['detections']) for m in items] == [1, 1, 0]
+    assert items[0]['detections'][0]['class_name'] == 'bottle'
+
+
+def test_detections(client):
+    response = client.get("/detections/", params={'min_confidence': 0.52})
+    assert [d['id'] for d in response.json()] == [2, 3]
+
+
+def test_conditional_request(client):
+    first = client.get("/detections/")
+    again = client.get("/detections/", headers={'If-None-Match': first.headers['etag']})
+    assert again.status_code == 304
+
+
+def test_stats_without_aggregates(client):
+    assert client.get("/stats/").json()['total_messages'] == 0
+
+
+def test_metrics_endpoint(client):
+    client.get("/detections/")
+    response = client.get("/metrics")
+    assert response.headers['content-type'].startswith('application/openmetrics-text')
+    assert 'api_request_seconds_count{route="/detections/",method="GET",status="200"}' in response.text
+
+
+def test_response_cache_is_configured_at_startup(client, monkeypatch):
+    # Settings applied after import, as .env would be, must reach the cache
+    monkeypatch.setenv('API_CACHE_SIZE', '7')
+    with TestClient(app) as fresh:
+        cache = fresh.app.state.response_cache
+        assert cache.backend.maxsize == 7
+        assert cache.versions.check_interval == 3600
@@ -0,0 +1,129 @@
+import asyncio
+from datetime import datetime
+
+from starlette.requests import Request
+
+from api.cache import DataVersionTracker, LRUCache, ResponseCache
+
+
+class FakeResult:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def all(self):
+        return self.rows
+
+
+class FakeVersionsSession:
+    """Session factory serving a mutable data_versions table"""
+    def __init__(self):
+        self.rows = {'messages': (1, datetime(2024, 1, 1, 12, 0, 0, 500))}
+        self.queries = 0
+
+    def __call__(self):
+        return self
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, statement):
+        self.queries += 1
+        return FakeResult([(name, version, updated) for name, (version, updated) in self.rows.items()])
+
+
+def request(path="/messages/", **headers):
+    return Request({
+        'type': 'http', 'method': 'GET', 'path': path, 'query_string': b'',
+        'headers': [(k.replace('_', '-').encode(), v.encode()) for k, v in headers.items()],
+    })
+
+
+def make_cache(session):
+    return ResponseCache(LRUCache(), DataVersionTracker(session, check_interval=0))
+
+
+def test_hit_miss_and_not_modified():
+    session = FakeVersionsSession()
+    cache = make_cache(session)
+    loads = []
+
+    async def load():
+        loads.append(1)
+        return b'[{"id": 1}]', {'X-Next-Cursor': 'abc'}
+
+    async def scenario():
+        first = await cache.respond(request(), ['messages'], {'limit': 10, 'channel': None}, load)
+        second = await cache.respond(request(), ['messages'], {'channel': None, 'limit': 10}, load)
+        revalidated = await cache.respond(request(if_none_match=first.headers['etag']), ['messages'], {'limit': 10}, load)
+        since = await cache.respond(request(if_modified_since=first.headers['last-modified']), ['messages'], {'limit': 10}, load)
+        return first, second, revalidated, since
+
+    first, second, revalidated, since = asyncio.run(scenario())
+
+    assert len(loads) == 1
+    assert first.body == second.body == b'[{"id": 1}]'
+    assert second.headers['x-next-cursor'] == 'abc'
+    assert first.headers['etag'] == second.headers['etag']
+    assert first.headers['last-modified'] == 'Mon, 01 Jan 2024 12:00:00 GMT'
+    assert revalidated.status_code == since.status_code == 304
+
+
+def test_version_bump_invalidates():
+    session = FakeVersionsSession()
+    cache = make_cache(session)
+    payloads = iter([b'[1]', b'[1, 2]'])
+
+    async def load():
+        return next(payloads), {}
+
+    async def scenario():
+        first = await cache.respond(request(), ['messages'], {}, load)
+        session.rows['messages'] = (2, datetime(2024, 1, 2))
+        stale = await cache.respond(request(if_none_match=first.headers['etag']), ['messages'], {}, load)
+        return first, stale
+
+    first, stale = asyncio.run(scenario())
+
+    assert stale.status_code == 200
+    assert stale.body == b'[1, 2]'
+    assert stale.headers['etag'] != first.headers['etag']
+
+
+def test_unrelated_data_sets_share_entries():
+    session = FakeVersionsSession()
+    cache = make_cache(session)
+
+    async def load():
+        return {'total_messages': 3}, {}
+
+    async def scenario():
+        first = await cache.respond(request("/detections/"), ['detections'], {}, load)
+        session.rows['messages'] = (5, datetime(2024, 1, 3))
+        second = await cache.respond(request("/detections/"), ['detections'], {}, load)
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert first.headers['etag'] == second.headers['etag']
+    assert 'last-modified' not in first.headers
+    assert first.body == b'{"total_messages": 3}'
+
+
+def test_lru_cache_evicts_and_expires():
+    async def scenario():
+        cache = LRUCache(maxsize=2, ttl=60)
+        await cache.set('a', 1)
+        await cache.set('b', 2)
+        await cache.get('a')
+        await cache.set('c', 3)
+        kept = [await cache.get(k) for k in 'abc']
+
+        expired = LRUCache(ttl=-1)
+        await expired.set('a', 1)
+        return kept, await expired.get('a')
+
+    kept, expired = asyncio.run(scenario())
+    assert kept == [1, None, 3]
+    assert expired is None
@@ -0,0 +1,84 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from transformation.dbt_runner import DBTRunner
+
+
+class FakeDbtRunner:
+    """Records invocations and writes the artifacts dbt would leave in target/"""
+    def __init__(self, target_dir):
+        self.target_dir = target_dir
+        self.calls = []
+
+    def invoke(self, args):
+        self.calls.append(args)
+        self.target_dir.mkdir(exist_ok=True)
+        (self.target_dir / "manifest.json").write_text(json.dumps({"nodes": {}}))
+        if args[0] == "run":
+            (self.target_dir / "run_results.json").write_text(json.dumps({
+                "results": [{"unique_id": "model.x.fct_messages", "execution_time": 1.25}]
+            }))
+        return SimpleNamespace(success=True, exception=None, result=None)
+
+
+@pytest.fixture
+def runner(tmp_path, monkeypatch):
+    project = tmp_path / "project"
+    project.mkdir()
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv('DBT_PROFILES_DIR', raising=False)
+    dbt = DBTRunner("project")
+    dbt._runner = FakeDbtRunner(project / "target")
+    return dbt
+
+
+def commands(runner):
+    return [call[:call.index("--project-dir")] for call in runner._runner.calls]
+
+
+def test_paths_are_absolute(runner, tmp_path):
+    runner.invoke(["run"])
+    args = runner._runner.calls[0]
+    assert args[args.index("--project-dir") + 1] == str(tmp_path / "project")
+    profiles_dir = args[args.index("--profiles-dir") + 1]
+    assert profiles_dir.startswith("/") and profiles_dir.endswith(".dbt")
+
+
+def test_profiles_in_project_dir_are_used(tmp_path, monkeypatch):
+    monkeypatch.delenv('DBT_PROFILES_DIR', raising=False)
+    (tmp_path / "profiles.yml").write_text("")
+    assert DBTRunner(tmp_path).profiles_dir == tmp_path
+    monkeypatch.setenv('DBT_PROFILES_DIR', str(tmp_path / "elsewhere"))
+    assert DBTRunner(tmp_path).profiles_dir == tmp_path / "elsewhere"
+
+
+def test_first_incremental_run_is_a_full_run(runner):
+    timings = runner.run_transformation(incremental=True, changed_sources=["raw.cleaned_messages"])
+
+    assert commands(runner) == [["run"], ["test"]]
+    assert timings == {"model.x.fct_messages": 1.25}
+    assert runner.has_state()
+
+
+def test_incremental_run_selects_modified_and_changed_sources(runner):
+    runner.run_transformation()
+    runner._runner.calls.clear()
+    runner.run_transformation(incremental=True, changed_sources=["raw.message_detections"])
+
+    selection = ["--select", "state:modified+", "source:raw.message_detections+", "--state", str(runner.state_dir)]
+    assert commands(runner) == [["run"] + selection, ["test"] + selection]
+
+
+def test_unreadable_state_falls_back_to_full_run(runner):
+    runner.state_dir.mkdir()
+    (runner.state_dir / "manifest.json").write_text("{truncated")
+
+    runner.run_transformation(incremental=True)
+    assert commands(runner) == [["run"], ["test"]]
+
+
+def test_full_run_generates_docs(runner):
+    runner.run_transformation(full_refresh=True)
+    assert commands(runner) == [["run", "--full-refresh"], ["test"], ["docs", "generate"]]
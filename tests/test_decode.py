@@ -0,0 +1,46 @@
+import pytest
+
+cv2 = pytest.importorskip("cv2")
+Image = pytest.importorskip("PIL.Image")
+
+from object_detection.detector import decode_image
+
+
+def write_jpeg(path, width, height, orientation=None):
+    image = Image.new("RGB", (width, height), (200, 30, 30))
+    exif = Image.Exif()
+    if orientation is not None:
+        exif[0x0112] = orientation
+    image.save(path, "JPEG", exif=exif.tobytes())
+    return path
+
+
+def test_full_decode_without_target(tmp_path):
+    img, orig_shape = decode_image(write_jpeg(tmp_path / "a.jpg", 1600, 1200))
+    assert img.shape[:2] == (1200, 1600)
+    assert orig_shape == (1200, 1600)
+
+
+def test_reduced_decode_still_covers_target(tmp_path):
+    img, orig_shape = decode_image(write_jpeg(tmp_path / "a.jpg", 1600, 1200), (640, 640))
+    # 1600 / 640 = 2.5, so the 1/2 scale is the largest that is not smaller than the target
+    assert img.shape[:2] == (600, 800)
+    assert orig_shape == (1200, 1600)
+
+
+def test_small_images_are_decoded_at_full_resolution(tmp_path):
+    img, orig_shape = decode_image(write_jpeg(tmp_path / "a.jpg", 800, 600), (640, 640))
+    assert img.shape[:2] == (600, 800)
+    assert orig_shape == (600, 800)
+
+
+def test_exif_rotation_swaps_original_shape(tmp_path):
+    _, orig_shape = decode_image(write_jpeg(tmp_path / "a.jpg", 1600, 1200, orientation=6), (640, 640))
+    assert orig_shape == (1600, 1200)
+
+
+def test_png_ignores_target(tmp_path):
+    path = tmp_path / "a.png"
+    Image.new("RGB", (1600, 1200)).save(path)
+    img, orig_shape = decode_image(path, (640, 640))
+    assert img.shape[:2] == orig_shape == (1200, 1600)
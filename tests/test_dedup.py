@@ -0,0 +1,115 @@
+import random
+import threading
+
+import pytest
+
+from object_detection.dedup import BKTree, ImageHashIndex, hamming, phash
+from object_detection.sink import DetectionSink
+
+
+def detection(x1=10, y1=20, x2=30, y2=40):
+    return {'class_id': 0, 'class_name': 'pill', 'confidence': 0.8,
+            'bbox_x1': x1, 'bbox_y1': y1, 'bbox_x2': x2, 'bbox_y2': y2}
+
+
+def test_bktree_search_matches_linear_scan():
+    rng = random.Random(0)
+    keys = [rng.getrandbits(64) for _ in range(500)]
+    tree = BKTree()
+    for i, key in enumerate(keys):
+        tree.add(key, i)
+
+    query = keys[0] ^ 0b1011
+    expected = sorted((hamming(query, key), i) for i, key in enumerate(keys) if hamming(query, key) <= 8)
+    assert sorted(tree.search(query, 8)) == expected
+
+
+def test_bktree_remove_keeps_routing():
+    tree = BKTree()
+    for key in (0b0000, 0b0001, 0b0011, 0b0111):
+        tree.add(key, key)
+    assert tree.remove(0b0001, 0b0001)
+    assert not tree.remove(0b0001, 0b0001)
+
+    assert [value for _, value in tree.search(0b0011, 1)] == [0b0011, 0b0111]
+    assert tree.size == 3
+
+
+def test_find_returns_closest_entry():
+    index = ImageHashIndex(max_distance=3)
+    index.add(0b1111_0000, 'a.jpg', (100, 100), [detection()])
+    index.add(0b0000_1111, 'b.jpg', (100, 100), [])
+
+    distance, entry = index.find(0b1111_0001)
+    assert (distance, entry['image_path']) == (1, 'a.jpg')
+    assert index.find(0b0101_0101) is None
+
+
+def test_readding_path_moves_it_to_new_hash():
+    index = ImageHashIndex(max_distance=2)
+    index.add(0xFF00, 'a.jpg', (100, 100), [detection()])
+    index.add(0x00FF, 'a.jpg', (100, 100), [])
+
+    assert index.find(0xFF00) is None
+    distance, entry = index.find(0x00FF)
+    assert distance == 0 and entry['detections'] == []
+    assert len(index) == 1
+
+
+def test_reused_detections_are_scaled_and_recorded():
+    index = ImageHashIndex()
+    index.add(0xABCD, 'a.jpg', (100, 200), [detection()])
+    distance, entry = index.find(0xABCD)
+
+    detections = index.reuse_detections(entry, distance, 'b.jpg', (200, 400))
+
+    assert detections[0]['image_path'] == 'b.jpg'
+    assert (detections[0]['bbox_x1'], detections[0]['bbox_y2']) == (20, 80)
+    assert index.duplicate_groups().to_dict('records') == [
+        {'canonical_path': 'a.jpg', 'image_path': 'b.jpg', 'distance': 0}
+    ]
+
+
+def test_save_and_load_round_trip(tmp_path):
+    path = tmp_path / "hashes.json"
+    index = ImageHashIndex(path)
+    index.add(0x1234, 'a.jpg', (10, 10), [detection()])
+    index.add(0x5678, 'a.jpg', (10, 10), [detection()])
+    index.save()
+
+    loaded = ImageHashIndex(path)
+    assert len(loaded) == 1
+    assert loaded.find(0x1234, max_distance=0) is None
+    assert loaded.find(0x5678)[1]['image_path'] == 'a.jpg'
+
+
+def test_phash_tolerates_resizing():
+    cv2 = pytest.importorskip("cv2")
+    np = pytest.importorskip("numpy")
+    rng = np.random.default_rng(0)
+    img = cv2.GaussianBlur(rng.integers(0, 255, (256, 256, 3), dtype=np.uint8), (15, 15), 0)
+    resized = cv2.resize(img, (128, 128), interpolation=cv2.INTER_AREA)
+
+    assert hamming(phash(img), phash(resized)) <= 6
+
+
+
+def test_index_is_saved_after_each_written_batch(tmp_path):
+    path = tmp_path / "hashes.json"
+    index = ImageHashIndex(path)
+    saved = threading.Event()
+
+    def on_flush():
+        index.save()
+        saved.set()
+
+    class RecordingSink(DetectionSink):
+        def _write_batch(self, image_paths, df):
+            pass
+
+    with RecordingSink(flush_every=1, on_flush=on_flush) as sink:
+        index.add(0b1010, 'a.jpg', (10, 10), [detection()])
+        sink.add('a.jpg', [])
+        # Saved as soon as the batch is written, while the sink keeps running
+        assert saved.wait(5)
+        assert len(ImageHashIndex(path)) == 1
@@ -0,0 +1,84 @@
+import io
+import csv
+import json
+import asyncio
+from datetime import datetime
+
+import pytest
+
+from api import crud, export
+
+
+def message_row(message_id):
+    return (message_id, 'chemed', datetime(2024, 1, 1, 8, 30), 'hello', True, 'a.jpg', 1, False, 'english')
+
+
+@pytest.fixture
+def batches(monkeypatch):
+    """Serve export batches from a list instead of a database cursor"""
+    served = []
+
+    def serve(batch_list):
+        async def fake_batches(query, batch_size):
+            for batch in batch_list:
+                served.append(len(batch))
+                yield batch
+        monkeypatch.setattr(export, '_batches', fake_batches)
+        return served
+
+    return serve
+
+
+def collect(query, fmt):
+    async def run():
+        body = await export.stream_export(query, fmt)
+        return b"".join([chunk async for chunk in body])
+    return asyncio.run(run())
+
+
+def test_ndjson(batches):
+    batches([[message_row('1'), message_row('2')], [message_row('3')]])
+    lines = collect(crud.messages_export_query(), 'ndjson').decode().splitlines()
+
+    assert [json.loads(line)['message_id'] for line in lines] == ['1', '2', '3']
+    assert json.loads(lines[0])['date'] == '2024-01-01T08:30:00'
+
+
+def test_csv_has_one_header(batches):
+    batches([[message_row('1')], [message_row('2')]])
+    rows = list(csv.reader(io.StringIO(collect(crud.messages_export_query(), 'csv').decode())))
+
+    assert rows[0][:2] == ['message_id', 'channel']
+    assert [row[0] for row in rows[1:]] == ['1', '2']
+
+
+def test_empty_export(batches):
+    batches([])
+    assert collect(crud.messages_export_query(), 'ndjson') == b""
+    assert collect(crud.messages_export_query(), 'csv').decode().startswith('message_id,channel')
+
+
+def test_arrow_uses_actual_column_types(batches):
+    pa = pytest.importorskip("pyarrow")
+    # message_id is declared VARCHAR but an older table may hold BIGINT values
+    batches([[message_row(1), message_row(2)], [message_row(3)]])
+    table = pa.ipc.open_stream(collect(crud.messages_export_query(), 'arrow')).read_all()
+
+    assert table.schema.field('message_id').type == pa.int64()
+    assert table.schema.field('date').type == pa.timestamp('us', tz='UTC')
+    assert table.column('message_id').to_pylist() == [1, 2, 3]
+
+
+def test_first_batch_errors_surface_before_streaming(monkeypatch):
+    async def failing_batches(query, batch_size):
+        raise RuntimeError("relation does not exist")
+        yield
+
+    monkeypatch.setattr(export, '_batches', failing_batches)
+    with pytest.raises(RuntimeError, match="relation does not exist"):
+        asyncio.run(export.stream_export(crud.messages_export_query(), 'ndjson'))
+
+
+def test_unknown_format():
+    with pytest.raises(ValueError):
+        asyncio.run(export.stream_export(crud.messages_export_query(), 'xml'))
@@ -0,0 +1,99 @@
+import json
+
+import pytest
+
+from log_utils.metrics import Registry
+
+
+def test_counter_and_histogram_render_as_openmetrics():
+    registry = Registry()
+    downloads = registry.counter('downloads', 'Downloads', ['status'])
+    seconds = registry.histogram('step_seconds', 'Step time', ['step'], buckets=(0.1, 1.0))
+    downloads.inc(status='ok')
+    downloads.inc(2, status='failed')
+    seconds.observe(0.05, step='parse')
+    seconds.observe(0.5, step='parse')
+    seconds.observe(5.0, step='parse')
+
+    lines = registry.render().splitlines()
+    assert lines[:2] == ['# TYPE downloads counter', '# HELP downloads Downloads']
+    assert 'downloads_total{status="failed"} 2' in lines
+    assert 'step_seconds_bucket{step="parse",le="0.1"} 1' in lines
+    assert 'step_seconds_bucket{step="parse",le="1.0"} 2' in lines
+    assert 'step_seconds_bucket{step="parse",le="+Inf"} 3' in lines
+    assert 'step_seconds_count{step="parse"} 3' in lines
+    assert lines[-1] == '# EOF'
+
+
+def test_histogram_snapshot():
+    registry = Registry()
+    seconds = registry.histogram('stage_seconds', 'Stage time', buckets=(0.1, 1.0, 10.0))
+    for value in (0.05, 0.2, 0.3, 2.0):
+        seconds.observe(value)
+
+    (series,) = registry.snapshot()['stage_seconds']['series']
+    assert series['count'] == 4
+    assert series['p50'] == 1.0
+    # Capped at the largest observation rather than the bucket bound
+    assert series['p95'] == 2.0
+    assert series['min'] == 0.05
+
+
+def test_timer_as_decorator():
+    registry = Registry()
+    seconds = registry.histogram('call_seconds', 'Call time')
+
+    @seconds.time()
+    def work():
+        return 42
+
+    assert work() == 42
+    assert work.__name__ == 'work'
+    assert registry.snapshot()['call_seconds']['series'][0]['count'] == 1
+
+
+def test_metrics_are_registered_once():
+    registry = Registry()
+    assert registry.counter('rows', 'Rows') is registry.counter('rows', 'Rows')
+    with pytest.raises(ValueError):
+        registry.histogram('rows', 'Rows')
+
+
+def test_write_report(tmp_path):
+    registry = Registry()
+    registry.counter('rows', 'Rows').inc(3)
+    path = registry.write_report('clean_load', report_dir=tmp_path, extra={'run_id': 'abc'})
+
+    report = json.loads(path.read_text())
+    assert report['name'] == 'clean_load'
+    assert report['run_id'] == 'abc'
+    assert report['metrics']['rows']['series'] == [{'value': 3}]
+
+
+def test_failed_media_download_is_counted():
+    pytest.importorskip('telethon')
+    import asyncio
+    from datetime import datetime
+    from types import SimpleNamespace
+
+    from scraping.telegram_scraper import MEDIA_DOWNLOADS, TelegramScraper
+
+    async def fail(path):
+        raise ConnectionError('dropped')
+
+    message = SimpleNamespace(id=7, date=datetime(2024, 1, 1), text='x',
+                              media=SimpleNamespace(photo=object()), download_media=fail)
+
+    async def get_entity(channel):
+        return channel
+
+    async def get_messages(entity, limit):
+        return [message]
+
+    scraper = TelegramScraper.__new__(TelegramScraper)
+    scraper.client = SimpleNamespace(get_entity=get_entity, get_messages=get_messages)
+    before = MEDIA_DOWNLOADS._values.get(('test_channel', 'failed'), 0)
+    data = asyncio.run(scraper.scrape_channel('test_channel'))
+
+    assert data['images'] == []
+    assert MEDIA_DOWNLOADS._values[('test_channel', 'failed')] == before + 1
@@ -0,0 +1,79 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from api import crud, models
+
+
+def message(i, channel='chemed'):
+    return {
+        'message_id': str(i), 'channel': channel,
+        # Several messages share a timestamp so the tie-breaking columns matter
+        'date': datetime(2024, 1, 1) + timedelta(hours=i // 3),
+        'text': f'message {i}', 'has_media': False, 'media_path': None,
+        'word_count': 2, 'contains_url': False, 'language': 'english',
+    }
+
+
+def detection(i):
+    return {
+        'id': i, 'image_path': f'{i}.jpg', 'class_id': 0, 'class_name': 'pill', 'confidence': i / 100,
+        'bbox_x1': 0.0, 'bbox_y1': 0.0, 'bbox_x2': 1.0, 'bbox_y2': 1.0, 'processed_date': datetime(2024, 1, 1),
+    }
+
+
+def test_cursor_round_trip():
+    values = [datetime(2024, 1, 2, 3, 4, 5), 'chemed', '42']
+    cursor = crud.encode_cursor(values)
+    assert '=' not in cursor
+    assert crud.decode_cursor(cursor) == ['2024-01-02T03:04:05', 'chemed', '42']
+
+
+@pytest.mark.parametrize("cursor", ["not base64!", "e30"])
+def test_invalid_cursor(cursor):
+    with pytest.raises(crud.InvalidCursor, match="Invalid cursor"):
+        crud.decode_cursor(cursor)
+
+
+@pytest.mark.parametrize("values", [[None, 'chemed', '1'], ['2024-01-01', 'chemed'], ['yesterday', 'chemed', '1']])
+def test_message_cursor_must_hold_a_sort_key(values):
+    with pytest.raises(crud.InvalidCursor):
+        crud._message_key(crud.encode_cursor(values))
+
+
+def test_detection_cursor_must_hold_an_id():
+    with pytest.raises(crud.InvalidCursor):
+        crud._detection_key(crud.encode_cursor(['x']))
+
+
+def test_message_pages_follow_cursor(sqlite_db):
+    rows = [message(i, 'chemed' if i % 2 else 'lobelia') for i in range(20)]
+
+    async def fetch_all(db):
+        expected = await crud.get_messages(db, limit=100)
+        pages, cursor = [], None
+        while True:
+            page = await crud.get_messages(db, limit=3, cursor=cursor)
+            pages.append(page)
+            if len(page) < 3:
+                return expected, pages
+            cursor = crud.message_cursor(page[-1])
+
+    expected, pages = sqlite_db([models.Message.__table__], {models.Message.__table__: rows}, fetch_all)
+
+    keys = [(m.date, m.channel, m.message_id) for page in pages for m in page]
+    assert keys == [(m.date, m.channel, m.message_id) for m in expected]
+    assert len(keys) == len(set(keys)) == 20
+
+
+def test_detection_pages_follow_cursor(sqlite_db):
+    async def fetch(db):
+        first = await crud.get_detections(db, limit=4, min_confidence=0.02)
+        second = await crud.get_detections(db, limit=4, min_confidence=0.02, cursor=crud.detection_cursor(first[-1]))
+        return first, second
+
+    table = models.ObjectDetection.__table__
+    first, second = sqlite_db([table], {table: [detection(i) for i in range(1, 11)]}, fetch)
+
+    assert [d.id for d in first] == [2, 3, 4, 5]
+    assert [d.id for d in second] == [6, 7, 8, 9]
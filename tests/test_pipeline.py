@@ -0,0 +1,135 @@
+import pytest
+
+from pipeline.dag import FileHasher, Pipeline, Stage
+
+
+class Calls:
+    def __init__(self):
+        self.log = []
+        self.fail = set()
+
+    def stage(self, name, output=None, items=1):
+        def func(changed):
+            self.log.append((name, sorted(changed)))
+            if name in self.fail:
+                raise RuntimeError(f"{name} failed")
+            if output is not None:
+                output.mkdir(parents=True, exist_ok=True)
+                (output / f"{name}.txt").write_text("x")
+            return items
+        return func
+
+
+@pytest.fixture
+def dirs(tmp_path):
+    raw, staged = tmp_path / "raw", tmp_path / "staged"
+    raw.mkdir()
+    (raw / "a.jpg").write_bytes(b"a")
+    return tmp_path, raw, staged
+
+
+def build(tmp_path, raw, staged, calls, params=None):
+    stages = [
+        Stage('scrape', calls.stage('scrape'), outputs=[raw]),
+        Stage('stage', calls.stage('stage', staged), inputs=[raw], outputs=[staged], params=params),
+        Stage('detect', calls.stage('detect'), inputs=[staged], outputs=["db:detections"]),
+        Stage('load', calls.stage('load'), inputs=[raw], outputs=["db:messages"]),
+        Stage('dbt', calls.stage('dbt'), inputs=["db:detections", "db:messages"]),
+    ]
+    return Pipeline(stages, tmp_path / "state.json", max_workers=2, profile=())
+
+
+def test_dependencies_follow_inputs_and_outputs(dirs):
+    pipeline = build(*dirs, Calls())
+    assert pipeline.stages['detect'].deps == {'stage'}
+    assert pipeline.stages['dbt'].deps == {'detect', 'load'}
+    assert pipeline.order.index('scrape') < pipeline.order.index('stage') < pipeline.order.index('detect')
+
+
+def test_unchanged_stages_are_skipped(dirs):
+    calls = Calls()
+    build(*dirs, calls).run(skip=['scrape'])
+    assert sorted(name for name, _ in calls.log) == ['dbt', 'detect', 'load', 'stage']
+    assert dict(calls.log)['dbt'] == ['detect', 'load']
+
+    calls.log.clear()
+    statuses = build(*dirs, calls).run(skip=['scrape'])
+    assert calls.log == []
+    assert set(statuses.values()) == {'skipped'}
+
+
+def test_changed_input_reruns_downstream_only(dirs):
+    tmp_path, raw, staged = dirs
+    calls = Calls()
+    build(*dirs, calls).run(skip=['scrape'])
+
+    calls.log.clear()
+    (staged / "b.jpg").write_bytes(b"b")
+    build(*dirs, calls).run(skip=['scrape'])
+    assert calls.log == [('detect', []), ('dbt', ['detect'])]
+
+
+def test_params_are_part_of_the_fingerprint(dirs):
+    calls = Calls()
+    build(*dirs, calls, params={'link': 'hardlink'}).run(skip=['scrape'])
+    calls.log.clear()
+    build(*dirs, calls, params={'link': 'copy'}).run(skip=['scrape'])
+    assert [name for name, _ in calls.log][0] == 'stage'
+
+
+def test_failure_blocks_dependents_and_resume_continues(dirs):
+    calls = Calls()
+    calls.fail = {'detect'}
+    with pytest.raises(RuntimeError, match="detect failed"):
+        build(*dirs, calls).run()
+    assert 'dbt' not in dict(calls.log)
+
+    calls.log.clear()
+    calls.fail = set()
+    statuses = build(*dirs, calls).run(resume=True)
+    # scrape has no inputs and completed in the failed run, so resuming skips it;
+    # stages that ran before the failure still count as changed for their dependents
+    assert calls.log == [('detect', ['stage']), ('dbt', ['detect', 'load'])]
+    assert statuses['scrape'] == statuses['stage'] == 'skipped'
+
+    calls.log.clear()
+    build(*dirs, calls).run(resume=True)
+    assert [name for name, _ in calls.log] == ['scrape']
+
+
+def test_cycles_are_rejected(tmp_path):
+    stages = [
+        Stage('a', lambda changed: None, inputs=[tmp_path / "b"], outputs=[tmp_path / "a"]),
+        Stage('b', lambda changed: None, inputs=[tmp_path / "a"], outputs=[tmp_path / "b"]),
+    ]
+    with pytest.raises(ValueError, match="cycle"):
+        Pipeline(stages, tmp_path / "state.json")
+
+
+def test_file_digests_are_cached_by_size_and_mtime(tmp_path):
+    path = tmp_path / "a.bin"
+    path.write_bytes(b"abc")
+    hasher = FileHasher()
+    first = hasher.fingerprint(tmp_path)
+
+    hasher.cache[str(path)][2] = "cached"
+    assert hasher.fingerprint(tmp_path) != first
+
+    path.write_bytes(b"abcd")
+    assert hasher.file_digest(path) != "cached"
+
+
+def test_state_saves_while_hashing_concurrently(tmp_path):
+    images = tmp_path / "images"
+    images.mkdir()
+    for i in range(2000):
+        (images / f"{i}.jpg").write_bytes(b"x%d" % i)
+    calls = Calls()
+    # Stages without inputs save state while detect is still filling the hash cache
+    stages = [Stage('detect', calls.stage('detect'), inputs=[images])]
+    stages += [Stage(f'load{i}', calls.stage(f'load{i}')) for i in range(40)]
+
+    statuses = Pipeline(stages, tmp_path / "state.json", max_workers=8, profile=()).run()
+
+    assert set(statuses.values()) == {'done'}
+    assert len(Pipeline(stages, tmp_path / "state.json").state['file_hashes']) == 2000
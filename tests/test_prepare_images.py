@@ -0,0 +1,49 @@
+import os
+
+from utils.prepare_images import find_images, is_staged, stage_file, stage_images
+
+
+def make_raw(tmp_path):
+    raw = tmp_path / "raw"
+    (raw / "chemed").mkdir(parents=True)
+    (raw / "top_1.jpg").write_bytes(b"a")
+    (raw / "chemed" / "chemed_2.png").write_bytes(b"b")
+    (raw / "chemed" / "notes.txt").write_text("ignored")
+    return raw
+
+
+def test_channel_subdirectories_are_prefixed(tmp_path):
+    raw = make_raw(tmp_path)
+    names = sorted(name for _, name in find_images(raw))
+    assert names == ["chemed_chemed_2.png", "top_1.jpg"]
+
+
+def test_staging_is_incremental(tmp_path):
+    raw, media = make_raw(tmp_path), tmp_path / "media"
+
+    assert stage_images(raw, media, link='hardlink', workers=2) == {'hardlink': 2}
+    assert stage_images(raw, media, link='hardlink', workers=2) == {'skipped': 2}
+    assert os.stat(media / "top_1.jpg").st_ino == os.stat(raw / "top_1.jpg").st_ino
+
+
+def test_copies_are_recognised_as_staged(tmp_path):
+    raw, media = make_raw(tmp_path), tmp_path / "media"
+    stage_images(raw, media, link='copy', workers=1)
+
+    assert is_staged(raw / "top_1.jpg", media / "top_1.jpg")
+    (raw / "top_1.jpg").write_bytes(b"changed")
+    assert not is_staged(raw / "top_1.jpg", media / "top_1.jpg")
+
+
+def test_symlink_replaces_existing_file(tmp_path):
+    src = tmp_path / "a.jpg"
+    src.write_bytes(b"a")
+    dest = tmp_path / "b.jpg"
+    dest.write_bytes(b"old")
+
+    assert stage_file(src, dest, link='symlink') == 'symlink'
+    assert dest.is_symlink() and dest.read_bytes() == b"a"
+
+
+def test_missing_raw_directory(tmp_path):
+    assert stage_images(tmp_path / "missing", tmp_path / "media") == {}
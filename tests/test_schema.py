@@ -0,0 +1,92 @@
+from contextlib import contextmanager
+
+import pandas as pd
+
+from cleaning.cleaner import DataCleaner
+from database.schema import MESSAGE_KEY, ensure_messages_table, utc_naive
+
+
+class FakeResult:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def scalar(self):
+        return self.rows[0][0] if self.rows else None
+
+    def all(self):
+        return self.rows
+
+
+class FakeMessagesTable:
+    """Answers the catalog queries of ensure_messages_table for a given table shape"""
+    def __init__(self, message_id_type, primary_key):
+        self.engine = self
+        self.message_id_type = message_id_type
+        self.primary_key = primary_key
+        self.statements = []
+
+    @contextmanager
+    def begin(self):
+        yield self
+
+    def execute(self, statement, params=None):
+        sql = " ".join(str(statement).split())
+        if 'information_schema.columns' in sql:
+            return FakeResult([(self.message_id_type,)])
+        if 'information_schema.table_constraints' in sql:
+            return FakeResult([('cleaned_messages_pkey', column) for column in self.primary_key])
+        self.statements.append(sql)
+        return FakeResult([])
+
+
+def alterations(db):
+    return [sql for sql in db.statements if not sql.startswith('CREATE TABLE IF NOT EXISTS')]
+
+
+def test_current_table_is_left_alone():
+    db = FakeMessagesTable('character varying', ['channel', 'message_id'])
+    ensure_messages_table(db)
+    assert alterations(db) == []
+    assert 'PRIMARY KEY (channel, message_id)' in db.statements[0]
+
+
+def test_legacy_pandas_table_is_migrated():
+    db = FakeMessagesTable('bigint', [])
+    ensure_messages_table(db)
+
+    statements = alterations(db)
+    assert statements[0] == ("ALTER TABLE cleaned_messages ALTER COLUMN message_id TYPE VARCHAR "
+                             "USING message_id::text")
+    assert not any('DROP CONSTRAINT' in sql for sql in statements)
+    assert statements[-1] == "ALTER TABLE cleaned_messages ADD PRIMARY KEY (channel, message_id)"
+
+
+def test_message_id_primary_key_is_widened():
+    db = FakeMessagesTable('character varying', ['message_id'])
+    ensure_messages_table(db)
+
+    statements = alterations(db)
+    assert statements[0] == "ALTER TABLE cleaned_messages DROP CONSTRAINT cleaned_messages_pkey"
+    assert any(sql.startswith('DELETE FROM cleaned_messages a USING') for sql in statements)
+    assert statements[-1] == f"ALTER TABLE cleaned_messages ADD PRIMARY KEY ({', '.join(MESSAGE_KEY)})"
+
+
+def test_message_ids_repeated_across_channels_are_kept(tmp_path):
+    df = pd.DataFrame({
+        'channel': ['chemed', 'lobelia', 'chemed'],
+        'message_id': [7, 7, 7],
+        'date': ['2024-01-01T10:00:00+00:00', '2024-01-01T11:00:00+00:00', '2024-01-01T12:00:00+00:00'],
+        'text': ['a', 'b', 'a'],
+        'has_media': [False, False, False],
+        'media_path': ['', '', ''],
+    })
+    cleaned = DataCleaner(tmp_path).clean_data(df)
+    assert sorted(cleaned['channel']) == ['chemed', 'lobelia']
+
+
+def test_dates_are_stored_as_naive_utc():
+    aware = pd.Series(pd.to_datetime(['2024-01-02T01:30:00+03:00', '2024-01-02T03:30:00+03:00']))
+    assert list(utc_naive(aware)) == [pd.Timestamp('2024-01-01 22:30'), pd.Timestamp('2024-01-02 00:30')]
+
+    naive = pd.Series([pd.Timestamp('2024-01-01 12:00'), pd.NaT])
+    assert utc_naive(naive).equals(naive)
@@ -0,0 +1,74 @@
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from pydantic import ValidationError
+
+from api import schemas, serialization
+from api.serialization import RowSerializer
+
+
+class FakeRow:
+    def __init__(self, **values):
+        self._mapping = values
+
+
+def message(**overrides):
+    values = {
+        'message_id': '1', 'channel': 'chemed', 'date': datetime(2024, 1, 1, 8, 30),
+        'text': 'ፓራሲታሞል in stock', 'has_media': True, 'media_path': None,
+        'word_count': None, 'contains_url': None, 'language': 'amharic',
+    }
+    values.update(overrides)
+    return FakeRow(**values)
+
+
+DATES = [
+    datetime(2024, 1, 1, 8, 30),
+    datetime(2024, 1, 1, 8, 30, 0, 500),
+    datetime(2024, 1, 1, 8, 30, 0, 120000, tzinfo=timezone.utc),
+    datetime(2024, 1, 1, 8, 30, tzinfo=timezone(timedelta(hours=3))),
+]
+
+
+@pytest.fixture(params=['orjson', 'json'])
+def encoder(request, monkeypatch):
+    if request.param == 'orjson':
+        pytest.importorskip("orjson")
+    else:
+        monkeypatch.setattr(serialization, 'orjson', None)
+    return request.param
+
+
+def pydantic_json(schema, rows):
+    return "[" + ",".join(schema.model_validate(row._mapping).model_dump_json() for row in rows) + "]"
+
+
+def test_messages_match_pydantic(encoder):
+    rows = [message(message_id=str(i), date=d) for i, d in enumerate(DATES)]
+    encoded = RowSerializer(schemas.Message).dumps(rows).decode('utf-8')
+    assert encoded == pydantic_json(schemas.Message, rows)
+
+
+def test_detections_match_pydantic(encoder):
+    rows = [FakeRow(
+        id=1, image_path='a.jpg', class_id=0, class_name='pill', confidence=0.5,
+        bbox_x1=1, bbox_y1=2.5, bbox_x2=3, bbox_y2=4, processed_date=DATES[2]
+    )]
+    encoded = RowSerializer(schemas.ObjectDetection).dumps(rows)
+    assert json.loads(encoded) == json.loads(pydantic_json(schemas.ObjectDetection, rows))
+    assert json.loads(encoded)[0]['processed_date'] == '2024-01-01T08:30:00.120000Z'
+    assert json.loads(encoded)[0]['bbox_x1'] == 1.0
+
+
+def test_numeric_ids_are_coerced():
+    rows = [message(message_id=42)]
+    assert json.loads(RowSerializer(schemas.Message).dumps(rows))[0]['message_id'] == '42'
+
+
+def test_null_in_required_field_fails_like_pydantic():
+    serializer = RowSerializer(schemas.Message)
+    with pytest.raises(ValidationError):
+        serializer.dumps([message(text=None)])
+    with pytest.raises(ValidationError):
+        schemas.Message.model_validate(message(text=None)._mapping)
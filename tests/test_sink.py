@@ -0,0 +1,157 @@
+import pandas as pd
+import pytest
+
+from object_detection.sink import DatabaseDetectionSink, DetectionSink, message_links, parse_message_key
+
+
+class FakeDatabaseManager:
+    """In-memory stand-in for DatabaseManager covering what the sink uses"""
+    def __init__(self):
+        self.tables = {}
+        self.indexes = []
+        self.versions = {}
+        self.queries = []
+        self.statements = []
+
+    def execute(self, sql, params=None):
+        self.statements.append(" ".join(sql.split()))
+
+    def table_exists(self, table_name):
+        return table_name in self.tables
+
+    def replace_rows(self, tables, key_column, keys):
+        self.statements.append('replace')
+        keys = set(keys)
+        for table_name, df in tables.items():
+            existing = self.tables.get(table_name)
+            if existing is not None:
+                existing = existing[~existing[key_column].isin(keys)]
+            if not df.empty:
+                existing = df if existing is None else pd.concat([existing, df], ignore_index=True)
+            if existing is not None:
+                self.tables[table_name] = existing.reset_index(drop=True)
+
+    def read_sql(self, query, params=None):
+        self.queries.append((query, params))
+        df = self.tables['processed_images']
+        return df[df['image_path'].isin(params['paths'])][['image_path']]
+
+    def create_index(self, table_name, columns, index_name=None, using=None):
+        self.indexes.append(index_name)
+
+    def bump_data_version(self, name):
+        self.versions[name] = self.versions.get(name, 0) + 1
+
+
+def detection(image_path, class_name='pill'):
+    return {
+        'image_path': image_path, 'class_id': 0, 'class_name': class_name, 'confidence': 0.9,
+        'bbox_x1': 0.0, 'bbox_y1': 0.0, 'bbox_x2': 1.0, 'bbox_y2': 1.0,
+        'processed_date': pd.Timestamp('2024-01-01')
+    }
+
+
+def test_parse_message_key():
+    assert parse_message_key('data/media/chemed_1234.jpg') == ('chemed', '1234')
+    assert parse_message_key('x/lobelia4cosmetics_20240101_120000_77.jpg') == ('lobelia4cosmetics', '77')
+    assert parse_message_key('photo.jpg') is None
+
+
+def test_message_links_skips_unparsed_names():
+    df = pd.DataFrame([detection('a/chemed_1.jpg'), detection('a/photo.jpg')])
+    links = message_links(df)
+    assert list(links['channel']) == ['chemed']
+    assert list(links['message_id']) == ['1']
+
+
+def test_replace_is_idempotent_per_image():
+    db = FakeDatabaseManager()
+    for _ in range(2):
+        with DatabaseDetectionSink(db, flush_every=10) as sink:
+            sink.add('m/chemed_1.jpg', [detection('m/chemed_1.jpg'), detection('m/chemed_1.jpg', 'syringe')])
+            sink.add('m/chemed_2.jpg', [])
+
+    assert len(db.tables['object_detections']) == 2
+    assert len(db.tables['message_detections']) == 2
+    processed = db.tables['processed_images'].set_index('image_path')['detection_count']
+    assert processed.to_dict() == {'m/chemed_1.jpg': 2, 'm/chemed_2.jpg': 0}
+    assert db.versions['detections'] == 2
+
+
+def test_image_path_indexes_created_once():
+    db = FakeDatabaseManager()
+    with DatabaseDetectionSink(db, flush_every=1) as sink:
+        sink.add('m/chemed_1.jpg', [detection('m/chemed_1.jpg')])
+        sink.add('m/chemed_2.jpg', [detection('m/chemed_2.jpg')])
+
+    assert sorted(name for name in db.indexes if name.endswith('_image_path')) == [
+        'ix_message_detections_image_path',
+        'ix_object_detections_image_path',
+        'ix_processed_images_image_path',
+    ]
+
+
+def test_resume_checks_processed_images_per_batch():
+    db = FakeDatabaseManager()
+    with DatabaseDetectionSink(db) as sink:
+        for i in range(0, 10, 2):
+            sink.add(f'm/chemed_{i}.jpg', [])
+
+    sink = DatabaseDetectionSink(db)
+    sink.resume_batch_size = 4
+    remaining = list(sink.unprocessed(f'm/chemed_{i}.jpg' for i in range(10)))
+
+    assert remaining == [f'm/chemed_{i}.jpg' for i in range(1, 10, 2)]
+    assert [len(params['paths']) for _, params in db.queries] == [4, 4, 2]
+
+
+def test_write_failure_surfaces_on_close():
+    class FailingSink(DetectionSink):
+        def _write_batch(self, image_paths, df):
+            raise IOError("disk full")
+
+    sink = FailingSink(flush_every=1).start()
+    sink.add('a.jpg', [])
+    with pytest.raises(RuntimeError, match="disk full"):
+        sink.close()
+
+
+def test_tables_are_created_before_first_append():
+    db = FakeDatabaseManager()
+    with DatabaseDetectionSink(db, flush_every=1) as sink:
+        sink.add('m/chemed_1.jpg', [detection('m/chemed_1.jpg')])
+        sink.add('m/chemed_2.jpg', [detection('m/chemed_2.jpg')])
+
+    first_replace = db.statements.index('replace')
+    setup = db.statements[:first_replace]
+    for table_name in ('object_detections', 'message_detections'):
+        assert f'CREATE TABLE IF NOT EXISTS {table_name} ( id SERIAL PRIMARY KEY' in ' '.join(setup)
+        assert f'ALTER TABLE {table_name} ADD COLUMN IF NOT EXISTS id SERIAL PRIMARY KEY' in setup
+    assert any(sql.startswith('CREATE TABLE IF NOT EXISTS processed_images') for sql in setup)
+    assert db.statements.count('replace') == 2
+    assert 'ix_message_detections_class_confidence' in db.indexes
+
+
+def test_process_directory_counts_only_successful_images(tmp_path, caplog):
+    from object_detection.detector import ObjectDetector
+
+    for name in ('chemed_1.jpg', 'chemed_2.jpg', 'chemed_3.jpg'):
+        (tmp_path / name).write_bytes(b'x')
+
+    def process_image(image_path):
+        if image_path.name == 'chemed_3.jpg':
+            raise ValueError("Could not load image")
+        return [detection(str(image_path))]
+
+    detector = ObjectDetector.__new__(ObjectDetector)
+    detector.process_image = process_image
+    db = FakeDatabaseManager()
+    with DatabaseDetectionSink(db, flush_every=1) as sink:
+        sink.add(str(tmp_path / 'chemed_1.jpg'), [])
+    caplog.set_level('INFO', logger='object_detection.detector')
+
+    with DatabaseDetectionSink(db) as sink:
+        detector.process_directory(tmp_path, sink=sink)
+
+    assert "Skipped 1 already processed images" in caplog.text
+    assert "Successfully processed 1 images, 1 failed" in caplog.text
@@ -0,0 +1,80 @@
+from contextlib import contextmanager
+from datetime import date, datetime
+
+import pandas as pd
+
+from api import crud, models
+from database.stats import STATS_TABLE, refresh_message_stats
+
+
+class RecordingDatabaseManager:
+    """Records the statements refresh_message_stats runs instead of executing them"""
+    def __init__(self):
+        self.engine = self
+        self.statements = []
+
+    @contextmanager
+    def begin(self):
+        yield self
+
+    def execute(self, statement, params=None):
+        self.statements.append((str(statement), params))
+
+
+def deletes_and_inserts(db):
+    return [(sql.split()[0], params) for sql, params in db.statements if not sql.lstrip().startswith('CREATE')]
+
+
+def test_refresh_is_limited_to_loaded_channels_and_days():
+    db = RecordingDatabaseManager()
+    rows = pd.DataFrame({
+        'channel': ['chemed', 'lobelia', None, 'tikvah'],
+        'date': [pd.Timestamp('2024-01-05 10:00'), pd.Timestamp('2024-01-07 23:00'),
+                 pd.Timestamp('2024-02-01'), pd.NaT],
+    })
+
+    refresh_message_stats(db, rows)
+
+    (delete, params), (insert, _) = deletes_and_inserts(db)
+    assert (delete, insert) == ('DELETE', 'INSERT')
+    assert params == {'channels': ['chemed', 'lobelia'], 'start': date(2024, 1, 4), 'end': date(2024, 1, 9)}
+    assert 'channel IS NOT NULL AND date IS NOT NULL' in db.statements[-1][0]
+
+
+def test_empty_load_returns_early():
+    db = RecordingDatabaseManager()
+    refresh_message_stats(db, pd.DataFrame({'channel': ['chemed'], 'date': [None]}))
+    assert deletes_and_inserts(db) == []
+
+    refresh_message_stats(db, pd.DataFrame(columns=['channel', 'date']), replaced=True)
+    assert deletes_and_inserts(db) == [('DELETE', None)]
+
+
+def stats_row(channel, day, language, messages, media=0, words=0):
+    return {
+        'channel': channel, 'day': day, 'language': language, 'message_count': messages,
+        'media_count': media, 'word_count_sum': words, 'word_count_n': messages,
+        'updated_at': datetime(2024, 1, 10),
+    }
+
+
+def test_stats_are_folded_per_group(sqlite_db):
+    table = models.MessageStatsDaily.__table__
+    rows = [
+        stats_row('chemed', date(2024, 1, 1), 'english', 2, media=1, words=10),
+        stats_row('chemed', date(2024, 1, 2), 'amharic', 1, words=5),
+        stats_row('lobelia', date(2024, 1, 2), 'english', 3, media=3, words=3),
+    ]
+
+    async def fetch(db):
+        return (await crud.get_stats(db), await crud.get_stats(db, group_by='channel'),
+                await crud.get_stats(db, channel='missing'))
+
+    overall, per_channel, missing = sqlite_db([table], {table: rows}, fetch)
+
+    assert overall[0]['total_messages'] == 6
+    assert overall[0]['messages_by_language'] == {'english': 5, 'amharic': 1}
+    assert overall[0]['average_word_count'] == 3.0
+    assert overall[0]['latest_day'] == date(2024, 1, 2)
+    assert [(s['channel'], s['messages_with_media']) for s in per_channel] == [('chemed', 1), ('lobelia', 3)]
+    assert missing[0]['total_messages'] == 0
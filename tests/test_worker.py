@@ -0,0 +1,106 @@
+import os
+import time
+
+from object_detection.worker import DetectionWorker
+
+
+class FakeDetector:
+    def __init__(self):
+        self.seen = []
+
+    def process_image(self, image_path):
+        self.seen.append(image_path.name)
+        return []
+
+
+class FakeSink:
+    def __init__(self, processed=()):
+        self.processed = set(processed)
+        self.added = []
+
+    def processed_images(self, image_paths):
+        return self.processed.intersection(image_paths)
+
+    def add(self, image_path, detections):
+        self.added.append(str(image_path))
+
+    def flush(self):
+        pass
+
+
+def make_worker(tmp_path, sink, detector):
+    return DetectionWorker(detector, sink, [tmp_path], settle_time=0)
+
+
+def test_new_images_are_processed_once(tmp_path):
+    (tmp_path / "chemed_1.jpg").write_bytes(b"x")
+    (tmp_path / "notes.txt").write_text("ignored")
+    detector, sink = FakeDetector(), FakeSink()
+    worker = make_worker(tmp_path, sink, detector)
+
+    worker.scan()
+    worker._process_batch()
+    worker.scan()
+
+    assert detector.seen == ["chemed_1.jpg"]
+    assert worker.stats()['queue_depth'] == 0
+
+    (tmp_path / "chemed_2.jpg").write_bytes(b"x")
+    worker.scan()
+    worker._process_batch()
+    assert detector.seen == ["chemed_1.jpg", "chemed_2.jpg"]
+
+
+def test_images_persisted_by_earlier_run_are_skipped(tmp_path):
+    for i in range(3):
+        (tmp_path / f"chemed_{i}.jpg").write_bytes(b"x")
+    detector = FakeDetector()
+    sink = FakeSink(processed=[str(tmp_path / "chemed_1.jpg")])
+    worker = make_worker(tmp_path, sink, detector)
+
+    worker.scan()
+    worker._process_batch()
+
+    assert sorted(detector.seen) == ["chemed_0.jpg", "chemed_2.jpg"]
+    assert worker.stats()['processed'] == 2
+
+
+def test_subdirectories_are_watched(tmp_path):
+    (tmp_path / "chemed").mkdir()
+    (tmp_path / "chemed" / "chemed_1.png").write_bytes(b"x")
+    detector = FakeDetector()
+    worker = make_worker(tmp_path, FakeSink(), detector)
+
+    worker.scan()
+    worker._process_batch()
+
+    assert detector.seen == ["chemed_1.png"]
+
+
+def test_recent_directory_is_relisted_within_one_timestamp_tick(tmp_path):
+    detector = FakeDetector()
+    worker = make_worker(tmp_path, FakeSink(), detector)
+    mtime = time.time()
+    os.utime(tmp_path, (mtime, mtime))
+    worker.scan()
+
+    # Created in the same tick as the last listing: the directory mtime is unchanged
+    (tmp_path / "chemed_1.jpg").write_bytes(b"x")
+    os.utime(tmp_path, (mtime, mtime))
+    worker.scan()
+    worker._process_batch()
+
+    assert detector.seen == ["chemed_1.jpg"]
+
+
+def test_idle_directory_is_not_relisted(tmp_path):
+    detector = FakeDetector()
+    worker = make_worker(tmp_path, FakeSink(), detector)
+    os.utime(tmp_path, (0, 0))
+    worker.scan()
+
+    (tmp_path / "chemed_1.jpg").write_bytes(b"x")
+    os.utime(tmp_path, (0, 0))
+    worker.scan()
+
+    assert worker.stats()['queue_depth'] == 0